@@ -1,180 +1,17 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import pandas as pd
-from datetime import datetime, timedelta
 import os
+import queue
+import threading
 
-# ---------------------------
-# Helper Functions
-# ---------------------------
-def parse_datetime(dt_str):
-    """Parse a datetime string in the format: YYYY-MM-DD HH:MM:SS"""
-    try:
-        return datetime.strptime(dt_str.strip(), '%Y-%m-%d %H:%M:%S')
-    except Exception:
-        raise ValueError(f"Invalid datetime format: {dt_str}. Expected format: YYYY-MM-DD HH:MM:SS")
-
-def merge_intervals(intervals):
-    """Merge overlapping intervals (list of (start, end) datetime tuples)."""
-    if not intervals:
-        return []
-    intervals.sort(key=lambda x: x[0])
-    merged = [intervals[0]]
-    for current in intervals[1:]:
-        last = merged[-1]
-        if current[0] <= last[1]:
-            merged[-1] = (last[0], max(last[1], current[1]))
-        else:
-            merged.append(current)
-    return merged
-
-def compute_total_duration(intervals):
-    """Return total duration in minutes from a list of (start, end) intervals."""
-    total = timedelta()
-    for start, end in intervals:
-        total += (end - start)
-    return total.total_seconds() / 60
-
-def intersect_interval(interval, period):
-    """Return the overlapping portion of an interval with a given period."""
-    start, end = interval
-    p_start, p_end = period
-    new_start = max(start, p_start)
-    new_end = min(end, p_end)
-    if new_start < new_end:
-        return (new_start, new_end)
-    return None
-
-def get_global_times(file_path):
-    """
-    Read the CSV file (skip the first three rows) and compute for each participant
-    the overall (raw) minimum Join Time and maximum Leave Time.
-    Returns a dict mapping lower-case name to (global_join, global_leave).
-    """
-    try:
-        df = pd.read_csv(file_path, skiprows=3)
-        df.columns = df.columns.str.strip()
-    except Exception as e:
-        raise ValueError(f"Error reading file '{file_path}' for global times: {e}")
-
-    if "Name" in df.columns:
-        name_col = "Name"
-    elif "Name (Original Name)" in df.columns:
-        name_col = "Name (Original Name)"
-    else:
-        raise ValueError(f"CSV file '{file_path}' must contain a 'Name' or 'Name (Original Name)' column for global times.")
-    try:
-        df["Join Time"] = pd.to_datetime(df["Join Time"])
-        df["Leave Time"] = pd.to_datetime(df["Leave Time"])
-    except Exception as e:
-        raise ValueError(f"Error converting join/leave times in '{file_path}' for global times: {e}")
-    df["Name_lower"] = df[name_col].str.lower()
-    global_times = {}
-    for name_lower, group in df.groupby("Name_lower"):
-        global_join = group["Join Time"].min()
-        global_leave = group["Leave Time"].max()
-        global_times[name_lower] = (global_join, global_leave)
-    return global_times
-
-def get_total_durations(file_path):
-    """
-    Read the CSV file (skipping the first three rows) and return a dict mapping lower-case name
-    to total duration (in minutes) by summing the 'Duration' column.
-    This ensures that the 'Duration' in the generated Attendance sheet reflects the raw CSV totals.
-    """
-    try:
-        df = pd.read_csv(file_path, skiprows=3)
-        df.columns = df.columns.str.strip()
-        # Determine the name column
-        if "Name" in df.columns:
-            name_col = "Name"
-        elif "Name (Original Name)" in df.columns:
-            name_col = "Name (Original Name)"
-        else:
-            raise ValueError(f"CSV file '{file_path}' must contain a 'Name' or 'Name (Original Name)' column.")
-        if "Duration" not in df.columns:
-            raise ValueError(f"CSV file '{file_path}' must contain a 'Duration' column to compute total duration.")
-        # Ensure Duration is numeric
-        df["Duration"] = pd.to_numeric(df["Duration"], errors="coerce")
-        df["Name_lower"] = df[name_col].str.lower()
-        durations = df.groupby("Name_lower")["Duration"].sum().to_dict()
-        return durations
-    except Exception as e:
-        raise ValueError(f"Error computing total durations from '{file_path}': {e}")
-
-def process_csv_session(file_path, session_start, session_end, time_required):
-    """
-    Process one CSV file for a single session.
-    Reads CSV with skiprows=3 (header on row 4) and expects:
-      - Name: "Name (Original Name)" or "Name"
-      - Email: "User Email" or "Email"
-      - "Join Time" and "Leave Time"
-    For each participant:
-      - Merges overlapping intervals.
-      - Considers only portions overlapping the session period.
-      - Computes session duration (from overlapping portions).
-      - Determines status ("P" if duration >= time_required, else "A").
-    Returns a dict mapping lower-case name to:
-      {
-         "Name": original name,
-         "Email": email,
-         "session_min_join": earliest join from overlapping portion,
-         "raw_max_leave": maximum leave from overlapping portion,
-         "session_duration": total minutes attended in session,
-         "status": "P" or "A"
-      }
-    """
-    try:
-        df = pd.read_csv(file_path, skiprows=3)
-        df.columns = df.columns.str.strip()
-    except Exception as e:
-        raise ValueError(f"Error reading file '{file_path}': {e}")
-    if "Name" in df.columns:
-        name_col = "Name"
-    elif "Name (Original Name)" in df.columns:
-        name_col = "Name (Original Name)"
-    else:
-        raise ValueError(f"CSV file '{file_path}' must contain a 'Name' or 'Name (Original Name)' column.")
-    if "Email" in df.columns:
-        email_col = "Email"
-    elif "User Email" in df.columns:
-        email_col = "User Email"
-    else:
-        raise ValueError(f"CSV file '{file_path}' must contain an 'Email' or 'User Email' column.")
-    for col in ["Join Time", "Leave Time"]:
-        if col not in df.columns:
-            raise ValueError(f"CSV file '{file_path}' must contain a '{col}' column.")
-    try:
-        df["Join Time"] = pd.to_datetime(df["Join Time"])
-        df["Leave Time"] = pd.to_datetime(df["Leave Time"])
-    except Exception as e:
-        raise ValueError(f"Error converting join/leave times in '{file_path}': {e}")
-    df["Name_lower"] = df[name_col].str.lower()
-    session_results = {}
-    for name_lower, group in df.groupby("Name_lower"):
-        original_name = group.iloc[0][name_col]
-        email = group.iloc[0][email_col]
-        intervals = [(row["Join Time"], row["Leave Time"]) for _, row in group.iterrows()]
-        merged = merge_intervals(intervals)
-        session_intervals = [intersect_interval(interval, (session_start, session_end))
-                             for interval in merged if intersect_interval(interval, (session_start, session_end)) is not None]
-        session_intervals = merge_intervals(session_intervals)
-        session_duration = compute_total_duration(session_intervals)
-        if session_intervals:
-            session_min_join = min(i[0] for i in session_intervals)
-            raw_max_leave = max(i[1] for i in session_intervals)
-            status = "P" if session_duration >= time_required else "A"
-        else:
-            continue
-        session_results[name_lower] = {
-            "Name": original_name,
-            "Email": email,
-            "session_min_join": session_min_join,
-            "raw_max_leave": raw_max_leave,
-            "session_duration": session_duration,
-            "status": status
-        }
-    return session_results
+from attendance_core import (DEFAULT_WORKERS, NO_PROFILE, PROFILE_LOG, RAW_SHEET_MODES, REPORT_WRITERS,
+                             STREAM_CHUNKSIZE, TIMELINE_RESOLUTION, GenerationCancelled, StageProfile,
+                             ThresholdPreview, build_attendance, forget_log, format_stage_profile,
+                             format_write_stats, parse_datetime, process_files, process_register, store_attendance,
+                             suggest_sessions, warm_up, write_report)
+
+# Placeholder in AttendanceApp.previews while a file's ThresholdPreview is being built.
+PREVIEW_LOADING = "loading"
 
 # ---------------------------
 # Main Application Class with Compact & Advanced UI
@@ -183,8 +20,6 @@ class AttendanceApp:
     def __init__(self, master):
         self.master = master
         master.title("Advanced Zoom Attendance Generator")
-        master.geometry("800x600")
-        master.resizable(False, False)
         self.mode = tk.StringVar(value="single")  # "single" or "multiple"
 
         style = ttk.Style()
@@ -193,6 +28,7 @@ class AttendanceApp:
         # Main container frame
         self.main_frame = ttk.Frame(master, padding="5")
         self.main_frame.grid(row=0, column=0, sticky="nsew")
+        self.main_frame.columnconfigure(0, weight=1)
         master.columnconfigure(0, weight=1)
         master.rowconfigure(0, weight=1)
 
@@ -226,66 +62,175 @@ class AttendanceApp:
         ttk.Label(self.header_frame, text="Session Start", width=20, anchor="center", font=('Segoe UI', 9, 'bold')).grid(row=0, column=1, padx=3)
         ttk.Label(self.header_frame, text="Session End", width=20, anchor="center", font=('Segoe UI', 9, 'bold')).grid(row=0, column=2, padx=3)
         ttk.Label(self.header_frame, text="Time Required (min)", width=18, anchor="center", font=('Segoe UI', 9, 'bold')).grid(row=0, column=3, padx=3)
+        ttk.Label(self.header_frame, text="Preview", width=16, anchor="center",
+                  font=('Segoe UI', 9, 'bold')).grid(row=0, column=4, padx=3)
         self.sessions_container = ttk.Frame(self.sessions_outer)
         self.sessions_container.grid(row=1, column=0, sticky="ew", padx=3, pady=2)
         self.session_rows = []
+        # Live present/absent previews per (file path, merge identities): a ThresholdPreview,
+        # LOADING, or an error message. Logs are loaded on background threads and reported via a queue.
+        self.previews = {}
+        self.preview_queue = queue.Queue()
+        self.preview_polling = False
+        self.warming_up = False
+
+        # Row 3: Add Session / Detect Sessions Buttons (enabled in both modes)
+        session_buttons = ttk.Frame(self.main_frame)
+        session_buttons.grid(row=3, column=0, sticky="w", padx=10, pady=2)
+        self.add_session_button = ttk.Button(session_buttons, text="Add Session", command=self.add_session)
+        self.add_session_button.grid(row=0, column=0)
+        self.detect_sessions_button = ttk.Button(session_buttons, text="Detect Sessions",
+                                                 command=self.detect_sessions)
+        self.detect_sessions_button.grid(row=0, column=1, padx=5)
 
-        # Row 3: Add Session Button (enabled in both modes)
-        self.add_session_button = ttk.Button(self.main_frame, text="Add Session", command=self.add_session)
-        self.add_session_button.grid(row=3, column=0, sticky="w", padx=10, pady=2)
+        # Row 4: Output Options
+        options_frame = ttk.LabelFrame(self.main_frame, text="Output Options", padding="5")
+        options_frame.grid(row=4, column=0, sticky="ew", padx=5, pady=2)
+        ttk.Label(options_frame, text="Format").grid(row=0, column=0, padx=3)
+        self.output_format = tk.StringVar(value="xlsx")
+        ttk.Combobox(options_frame, textvariable=self.output_format, values=list(REPORT_WRITERS),
+                     state="readonly", width=11).grid(row=0, column=1, padx=3)
+        ttk.Label(options_frame, text="Raw log sheet").grid(row=0, column=2, padx=3)
+        self.raw_sheet = tk.StringVar(value="copy")
+        ttk.Combobox(options_frame, textvariable=self.raw_sheet, values=list(RAW_SHEET_MODES),
+                     state="readonly", width=9).grid(row=0, column=3, padx=3)
+        self.low_memory = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Low memory (stream large logs)",
+                        variable=self.low_memory,
+                        command=self.update_previews).grid(row=0, column=4, padx=3)
+        self.workers_label = ttk.Label(options_frame, text="Workers")
+        self.workers_label.grid(row=0, column=5, padx=3)
+        self.workers_var = tk.StringVar(value=str(DEFAULT_WORKERS))
+        self.workers_spinbox = ttk.Spinbox(options_frame, from_=1, to=64, width=4, textvariable=self.workers_var)
+        self.workers_spinbox.grid(row=0, column=6, padx=3)
+        self.show_timings = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Show stage timings",
+                        variable=self.show_timings).grid(row=1, column=0, columnspan=3, sticky="w", padx=3)
+        self.consolidated = tk.BooleanVar(value=False)
+        self.consolidated_check = ttk.Checkbutton(options_frame, text="Consolidated register (one file for all logs)",
+                                                  variable=self.consolidated)
+        self.consolidated_check.grid(row=1, column=3, columnspan=4, sticky="w", padx=3)
+        self.merge_identities = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Merge renamed participants (same email or similar name)",
+                        variable=self.merge_identities,
+                        command=self.update_previews).grid(row=2, column=0, columnspan=3, sticky="w", padx=3)
+        self.incremental = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Growing log (read only rows added since last run)",
+                        variable=self.incremental,
+                        command=self.update_raw_sheet).grid(row=2, column=3, columnspan=4, sticky="w", padx=3)
+        self.save_to_database = tk.BooleanVar(value=False)
+        self.database_path = None
+        self.database_check = ttk.Checkbutton(options_frame, text="Save to database", variable=self.save_to_database,
+                                              command=self.choose_database)
+        self.database_check.grid(row=3, column=0, columnspan=3, sticky="w", padx=3)
+        self.timeline = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text=f"Timeline sheet (participants present every {TIMELINE_RESOLUTION})",
+                        variable=self.timeline).grid(row=3, column=3, columnspan=4, sticky="w", padx=3)
 
-        # Row 4: Generate Button
+        # Row 5: Generate Button
         generate_frame = ttk.Frame(self.main_frame, padding="5")
-        generate_frame.grid(row=4, column=0, sticky="e", padx=5, pady=2)
+        generate_frame.grid(row=5, column=0, sticky="e", padx=5, pady=2)
         self.generate_button = ttk.Button(generate_frame, text="Generate Attendance", command=self.generate_attendance)
         self.generate_button.grid(row=0, column=0, padx=5)
 
-        # Row 5: Watermark
+        # Row 6: Progress of the running job
+        progress_frame = ttk.Frame(self.main_frame, padding="5")
+        progress_frame.grid(row=6, column=0, sticky="ew", padx=5, pady=2)
+        self.progress_bar = ttk.Progressbar(progress_frame, orient="horizontal", length=560, mode="determinate", maximum=1.0)
+        self.progress_bar.grid(row=0, column=0, padx=5)
+        self.cancel_button = ttk.Button(progress_frame, text="Cancel", command=self.cancel_job, state="disabled")
+        self.cancel_button.grid(row=0, column=1, padx=5)
+        self.progress_label = ttk.Label(progress_frame, text="", foreground="gray")
+        self.progress_label.grid(row=1, column=0, columnspan=2, sticky="w", padx=5)
+        self.cancel_event = None
+        self.job_queue = None
+
+        # Row 7: Watermark
         self.watermark = ttk.Label(self.main_frame, text="App created by Satendra Goswami", foreground="gray", font=('Segoe UI', 8))
-        self.watermark.grid(row=5, column=0, pady=3)
+        self.watermark.grid(row=7, column=0, pady=3)
 
         self.switch_mode()
+        self.fit_to_content()
+
+    def fit_to_content(self):
+        """Keep the window at least as large as its content, which grows with every session row."""
+        self.master.update_idletasks()
+        self.master.minsize(self.master.winfo_reqwidth(), self.master.winfo_reqheight())
+
+    def choose_database(self):
+        """Ask for the SQLite file results are saved to when "Save to database" is ticked."""
+        if not self.save_to_database.get():
+            return
+        database = filedialog.asksaveasfilename(initialfile=os.path.basename(self.database_path or "attendance.sqlite3"),
+                                                defaultextension=".sqlite3", confirmoverwrite=False,
+                                                filetypes=[("SQLite databases", "*.sqlite3 *.db")],
+                                                title="Save Attendance to Database")
+        if not database:
+            self.save_to_database.set(False)
+            return
+        self.database_path = database
+        self.database_check.config(text=f"Save to database ({os.path.basename(database)})")
 
     def switch_mode(self):
         mode = self.mode.get()
         if mode == "single":
             self.file_select_button.config(text="Select CSV File")
             self.selected_files_label.config(text="(Only one file allowed)")
+            self.workers_spinbox.config(state="disabled")
+            self.consolidated_check.config(state="disabled")
             self.selected_file = None
             self.selected_files = []
             for child in self.sessions_container.winfo_children():
                 child.destroy()
             self.session_rows = []
+            self.previews = {}
         else:
             self.file_select_button.config(text="Select CSV Files")
             self.selected_files_label.config(text="No files selected")
+            self.workers_spinbox.config(state="normal")
+            self.consolidated_check.config(state="normal")
             self.selected_files = []
             self.selected_file = None
             for child in self.sessions_container.winfo_children():
                 child.destroy()
             self.session_rows = []
+            self.previews = {}
+
+    def start_warm_up(self):
+        """
+        Import pandas and the Excel engine on a background thread, once. The core module
+        defers them so this window opens at once; a file selection is the cue they are needed.
+        """
+        if not self.warming_up:
+            self.warming_up = True
+            threading.Thread(target=warm_up, daemon=True).start()
 
     def select_files(self):
         mode = self.mode.get()
         if mode == "single":
             file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")], title="Select Zoom Log CSV File")
             if file_path:
+                self.start_warm_up()
                 self.selected_file = file_path
                 self.selected_files_label.config(text=os.path.basename(file_path))
                 for child in self.sessions_container.winfo_children():
                     child.destroy()
                 self.session_rows = []
+                self.previews = {}
         else:
             files = filedialog.askopenfilenames(filetypes=[("CSV files", "*.csv")], title="Select Zoom Log CSV Files")
             if files:
+                self.start_warm_up()
                 self.selected_files = list(files)
                 self.file_mapping = {os.path.basename(f): f for f in self.selected_files}
                 self.selected_files_label.config(text=f"{len(self.selected_files)} file(s) selected")
                 for child in self.sessions_container.winfo_children():
                     child.destroy()
                 self.session_rows = []
+                self.previews = {}
 
-    def add_session(self):
+    def add_session(self, file_path=None, start=None, end=None):
+        """Add a session row, prefilled with a file (multiple mode) and window when given."""
         row_frame = ttk.Frame(self.sessions_container)
         row_frame.grid(sticky="ew", padx=3, pady=2)
         if self.mode.get() == "single":
@@ -295,9 +240,13 @@ class AttendanceApp:
             session_dict = {"file_path": self.selected_file}
         else:
             file_options = list(self.file_mapping.keys())
-            file_var = tk.StringVar(value=file_options[0] if file_options else "")
+            if file_path is not None:
+                file_var = tk.StringVar(value=os.path.basename(file_path))
+            else:
+                file_var = tk.StringVar(value=file_options[0] if file_options else "")
             file_widget = ttk.Combobox(row_frame, textvariable=file_var, values=file_options, state="readonly", width=20)
             file_widget.grid(row=0, column=0, padx=3)
+            file_widget.bind("<<ComboboxSelected>>", lambda event: self.update_previews())
             session_dict = {"file_var": file_var}
         start_entry = ttk.Entry(row_frame, width=20)
         start_entry.grid(row=0, column=1, padx=3)
@@ -305,15 +254,206 @@ class AttendanceApp:
         end_entry.grid(row=0, column=2, padx=3)
         time_req_entry = ttk.Entry(row_frame, width=18)
         time_req_entry.grid(row=0, column=3, padx=3)
+        preview_label = ttk.Label(row_frame, text="", width=16, anchor="center", foreground="gray")
+        preview_label.grid(row=0, column=4, padx=3)
+        if start is not None:
+            start_entry.insert(0, start.strftime("%Y-%m-%d %H:%M:%S"))
+            end_entry.insert(0, end.strftime("%Y-%m-%d %H:%M:%S"))
+        for entry in (start_entry, end_entry, time_req_entry):
+            entry.bind("<KeyRelease>", lambda event: self.update_previews())
         session_dict.update({
             "start_entry": start_entry,
             "end_entry": end_entry,
-            "time_required_entry": time_req_entry
+            "time_required_entry": time_req_entry,
+            "preview_label": preview_label
         })
         self.session_rows.append(session_dict)
+        self.update_previews()
+        self.fit_to_content()
+
+    def detect_sessions(self):
+        """
+        Add a session row for every window in which most participants were present
+        (see suggest_sessions), for each selected log. The logs are read on a background
+        thread; only Time Required is left to fill in.
+        """
+        if self.mode.get() == "single":
+            files = [self.selected_file] if self.selected_file else []
+        else:
+            files = list(self.selected_files)
+        if not files:
+            messagebox.showerror("Error", "Please select a CSV file first.")
+            return
+        self.start_warm_up()
+        self.detect_sessions_button.config(state="disabled")
+        merge_identities = self.merge_identities.get()
+        results = queue.Queue()
+
+        def run():
+            found = []
+            for file_path in files:
+                try:
+                    found.append((file_path, suggest_sessions(file_path, merge_identities=merge_identities), None))
+                except Exception as e:
+                    found.append((file_path, [], str(e)))
+            results.put(found)
+        threading.Thread(target=run, daemon=True).start()
+        self.master.after(100, self.poll_detected_sessions, results)
+
+    def poll_detected_sessions(self, results):
+        try:
+            found = results.get_nowait()
+        except queue.Empty:
+            self.master.after(100, self.poll_detected_sessions, results)
+            return
+        self.detect_sessions_button.config(state="normal")
+        selected = [self.selected_file] if self.mode.get() == "single" else self.selected_files
+        problems = []
+        for file_path, windows, error in found:
+            # Skip logs deselected while detecting.
+            if file_path not in selected:
+                continue
+            if error is not None:
+                problems.append(f"{os.path.basename(file_path)}: {error}")
+            elif not windows:
+                problems.append(f"{os.path.basename(file_path)}: no sustained attendance found")
+            for start, end in windows:
+                self.add_session(file_path, start, end)
+        if problems:
+            messagebox.showwarning("Detect Sessions", "\n".join(problems))
+
+    def update_raw_sheet(self):
+        # Copying the whole log into Sheet1 would undo the point of a growing-log refresh.
+        if self.incremental.get() and self.raw_sheet.get() == "copy":
+            self.raw_sheet.set("reference")
+
+    # ---------------------------
+    # Threshold Preview
+    # ---------------------------
+    def session_file_path(self, sess):
+        if self.mode.get() == "single":
+            return sess["file_path"]
+        return self.file_mapping.get(sess["file_var"].get())
+
+    def update_previews(self):
+        """
+        Show live present/absent counts next to every session row, grouped by file.
+        Editing a window re-evaluates that file's windows; editing only a threshold is a
+        binary search per row (see ThresholdPreview). Logs not loaded yet are loaded in
+        the background and the rows show "Loading..." meanwhile. Previews need the whole
+        log in memory, so they are off in Low memory mode, and the logs of files no
+        longer selected are dropped.
+        """
+        rows_by_file = self.preview_rows_by_file()
+        for key in [key for key in self.previews if key[0] not in rows_by_file]:
+            del self.previews[key]
+            forget_log(key[0])
+        merge_identities = self.merge_identities.get()
+        for file_path, rows in rows_by_file.items():
+            preview = self.file_preview(file_path, merge_identities)
+            if isinstance(preview, ThresholdPreview):
+                self.show_counts(preview, rows)
+            else:
+                text = "Loading..." if preview == PREVIEW_LOADING else "Preview n/a"
+                for sess in rows:
+                    sess["preview_label"].config(text=text)
+
+    def preview_rows_by_file(self):
+        """Group the session rows that get a preview by file; label the others."""
+        rows_by_file = {}
+        low_memory = self.low_memory.get()
+        for sess in self.session_rows:
+            file_path = self.session_file_path(sess)
+            if file_path and not low_memory:
+                rows_by_file.setdefault(file_path, []).append(sess)
+            else:
+                sess["preview_label"].config(text="Preview off" if file_path else "")
+        return rows_by_file
+
+    def file_preview(self, file_path, merge_identities):
+        """Return the ThresholdPreview of file_path, PREVIEW_LOADING (starting the load) or an error."""
+        key = (file_path, merge_identities)
+        if key not in self.previews:
+            self.previews[key] = PREVIEW_LOADING
+            self.load_preview(file_path, merge_identities)
+        return self.previews[key]
+
+    def show_counts(self, preview, rows):
+        """Evaluate the valid windows of a file's rows and show each row's present/absent counts."""
+        windows, valid_rows = [], []
+        for sess in rows:
+            try:
+                s_dt = parse_datetime(sess["start_entry"].get())
+                e_dt = parse_datetime(sess["end_entry"].get())
+            except ValueError:
+                s_dt = e_dt = None
+            if s_dt is None or s_dt >= e_dt:
+                sess["preview_label"].config(text="")
+                continue
+            windows.append((s_dt, e_dt))
+            valid_rows.append(sess)
+        preview.set_windows(windows)
+        for index, sess in enumerate(valid_rows):
+            try:
+                time_required = float(sess["time_required_entry"].get().strip())
+            except ValueError:
+                sess["preview_label"].config(text="")
+                continue
+            present, absent = preview.counts(index, time_required)
+            sess["preview_label"].config(text=f"P {present} / A {absent}")
+
+    def load_preview(self, file_path, merge_identities):
+        """Build the ThresholdPreview of file_path on a background thread."""
+        def run():
+            try:
+                result = ThresholdPreview(file_path, merge_identities)
+            except Exception as e:
+                result = str(e)
+            self.preview_queue.put(((file_path, merge_identities), result))
+        threading.Thread(target=run, daemon=True).start()
+        if not self.preview_polling:
+            self.preview_polling = True
+            self.master.after(100, self.poll_previews)
+
+    def poll_previews(self):
+        try:
+            while True:
+                key, result = self.preview_queue.get_nowait()
+                # Ignore (and drop the logs of) previews of files deselected while loading.
+                if self.previews.get(key) == PREVIEW_LOADING:
+                    self.previews[key] = result
+                elif not any(file_path == key[0] for file_path, _ in self.previews):
+                    forget_log(key[0])
+        except queue.Empty:
+            pass
+        self.preview_polling = PREVIEW_LOADING in self.previews.values()
+        if self.preview_polling:
+            self.master.after(100, self.poll_previews)
+        self.update_previews()
 
     def generate_attendance(self):
+        self.start_warm_up()
         mode = self.mode.get()
+        chunksize = STREAM_CHUNKSIZE if self.low_memory.get() else None
+        merge_identities = self.merge_identities.get()
+        incremental = self.incremental.get()
+        database = self.database_path if self.save_to_database.get() else None
+        if merge_identities and (chunksize or incremental):
+            messagebox.showerror("Error", "Merging renamed participants needs the whole log; "
+                                          "turn off Low memory and Growing log mode.")
+            return
+        timeline_resolution = TIMELINE_RESOLUTION if self.timeline.get() else None
+        if timeline_resolution and chunksize and not incremental:
+            messagebox.showerror("Error", "The timeline sheet needs every participant's intervals; "
+                                          "turn off Low memory.")
+            return
+        output_format = self.output_format.get()
+        raw_sheet = self.raw_sheet.get()
+        try:
+            profile = StageProfile(PROFILE_LOG) if self.show_timings.get() else NO_PROFILE
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
         # Single file mode
         if mode == "single":
             if not self.selected_file:
@@ -346,94 +486,42 @@ class AttendanceApp:
                     "session_end": e_dt,
                     "time_required": time_req_val
                 })
-            # Process single file sessions
-            global_participants = {}
-            total_sessions = len(sessions_info)
-            session_labels = []
-            for session_index, session in enumerate(sessions_info, start=1):
-                try:
-                    session_results = process_csv_session(session["file_path"], session["session_start"], session["session_end"], session["time_required"])
-                    session_global_times = get_global_times(session["file_path"])
-                except ValueError as ve:
-                    messagebox.showerror("Error", str(ve))
-                    return
-                for name_lower, details in session_results.items():
-                    if name_lower in session_global_times:
-                        g_join, g_leave = session_global_times[name_lower]
-                    else:
-                        continue
-                    if name_lower not in global_participants:
-                        global_participants[name_lower] = {
-                            "Name": details["Name"],
-                            "Email": details["Email"],
-                            "global_join": g_join,
-                            "global_leave": g_leave,
-                            "total_duration": details["session_duration"],
-                            "sessions": {session_index: details["status"]}
-                        }
-                    else:
-                        curr = global_participants[name_lower]
-                        curr["global_join"] = min(curr["global_join"], g_join)
-                        curr["global_leave"] = max(curr["global_leave"], g_leave)
-                        curr["total_duration"] += details["session_duration"]
-                        curr["sessions"][session_index] = details["status"]
-                session_labels.append(f"Session {session_index} ({session['session_start'].strftime('%Y-%m-%d %H:%M:%S')})")
-            for participant in global_participants.values():
-                for i in range(1, total_sessions + 1):
-                    if i not in participant["sessions"]:
-                        participant["sessions"][i] = "A"
-            # --- NEW: Update the duration using the raw CSV's total durations ---
-            try:
-                raw_durations = get_total_durations(self.selected_file)
-            except ValueError as e:
-                messagebox.showerror("Error", str(e))
-                return
-            for name_lower, participant in global_participants.items():
-                if name_lower in raw_durations:
-                    participant["total_duration"] = raw_durations[name_lower]
-            # ---------------------------------------------------------------------
-
-            output_records = []
-            for participant in global_participants.values():
-                record = {
-                    "Name": participant["Name"],
-                    "Email": participant["Email"],
-                    "Join Time": participant["global_join"].strftime('%Y-%m-%d %H:%M:%S'),
-                    "Leave Time": participant["global_leave"].strftime('%Y-%m-%d %H:%M:%S')
-                }
-                for i in range(1, total_sessions + 1):
-                    record[session_labels[i-1]] = participant["sessions"][i]
-                record["Duration"] = round(participant["total_duration"], 2)
-                output_records.append(record)
-            try:
-                raw_log_df = pd.read_csv(self.selected_file)
-            except Exception as e:
-                messagebox.showerror("Error", f"Error reading raw log from '{self.selected_file}': {e}")
-                return
             base = os.path.basename(self.selected_file)
             name_part, _ = os.path.splitext(base)
-            output_file = filedialog.asksaveasfilename(initialfile=name_part + "_processed.xlsx",
-                                                       defaultextension=".xlsx",
-                                                       filetypes=[("Excel files", "*.xlsx")],
-                                                       title="Save Attendance Excel File as")
+            extension = REPORT_WRITERS[output_format][1]
+            output_file = filedialog.asksaveasfilename(initialfile=name_part + "_processed" + extension,
+                                                       defaultextension=extension,
+                                                       filetypes=[(f"{output_format} files", "*" + extension)],
+                                                       title="Save Attendance File as")
             if not output_file:
                 return
-            try:
-                with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
-                    raw_log_df.to_excel(writer, sheet_name="Sheet1", index=False)
-                    pd.DataFrame(output_records).to_excel(writer, sheet_name="Attendance", index=False)
-            except Exception as e:
-                messagebox.showerror("Error", f"Error saving output Excel file: {e}")
-                return
-            # Build summary for single file.
-            session_summary = []
-            for i in range(1, total_sessions + 1):
-                present_count = sum(1 for p in global_participants.values() if p["sessions"].get(i, "A") == "P")
-                absent_count = sum(1 for p in global_participants.values() if p["sessions"].get(i, "A") == "A")
-                session_summary.append(f"Session {i}: Present: {present_count}, Absent: {absent_count}")
-            summary_str = "\n".join(session_summary)
-            messagebox.showinfo("Attendance Generated",
-                                f"Attendance generated and saved to:\n{output_file}\n\nAttendance Summary:\n{summary_str}")
+            selected_file = self.selected_file
+
+            def work(progress):
+                # Process all sessions of the file in one pass
+                attendance = build_attendance(selected_file, sessions_info, progress, chunksize, profile,
+                                              merge_identities, incremental, timeline_resolution)
+                if database:
+                    progress("Saving to database", 4, 4)
+                    store_attendance(database, selected_file, sessions_info, attendance, chunksize,
+                                     merge_identities, incremental, profile)
+                progress(f"Writing {output_format} report", 4, 4)
+                try:
+                    write_stats = write_report(output_file, attendance, selected_file,
+                                               output_format, raw_sheet, chunksize, profile, incremental)
+                except Exception as e:
+                    raise ValueError(f"Error saving output file: {e}")
+                return attendance.summary(), write_stats
+
+            def done(result):
+                session_summary, write_stats = result
+                summary_str = "\n".join(session_summary)
+                if profile.enabled:
+                    summary_str += "\n\n" + format_stage_profile(profile.entries)
+                messagebox.showinfo("Attendance Generated",
+                                    f"Attendance generated and saved to:\n{output_file}\n\nAttendance Summary:\n{summary_str}"
+                                    f"\n\n{format_write_stats(write_stats)}")
+            self.start_job(work, done)
         else:
             # Multiple file mode: Process each file individually.
             sessions_by_file = {}
@@ -469,89 +557,136 @@ class AttendanceApp:
             if not sessions_by_file:
                 messagebox.showerror("Error", "No session information available.")
                 return
-            summary_all = {}
-            for file_path, sessions_info in sessions_by_file.items():
-                global_participants = {}
-                total_sessions = len(sessions_info)
-                session_labels = []
-                for session_index, session in enumerate(sessions_info, start=1):
-                    try:
-                        session_results = process_csv_session(file_path, session["session_start"], session["session_end"], session["time_required"])
-                        session_global_times = get_global_times(file_path)
-                    except ValueError as ve:
-                        messagebox.showerror("Error", str(ve))
-                        return
-                    for name_lower, details in session_results.items():
-                        if name_lower in session_global_times:
-                            g_join, g_leave = session_global_times[name_lower]
-                        else:
-                            continue
-                        if name_lower not in global_participants:
-                            global_participants[name_lower] = {
-                                "Name": details["Name"],
-                                "Email": details["Email"],
-                                "global_join": g_join,
-                                "global_leave": g_leave,
-                                "total_duration": details["session_duration"],
-                                "sessions": {session_index: details["status"]}
-                            }
-                        else:
-                            curr = global_participants[name_lower]
-                            curr["global_join"] = min(curr["global_join"], g_join)
-                            curr["global_leave"] = max(curr["global_leave"], g_leave)
-                            curr["total_duration"] += details["session_duration"]
-                            curr["sessions"][session_index] = details["status"]
-                    session_labels.append(f"Session {session_index} ({session['session_start'].strftime('%Y-%m-%d %H:%M:%S')})")
-                for participant in global_participants.values():
-                    for i in range(1, total_sessions + 1):
-                        if i not in participant["sessions"]:
-                            participant["sessions"][i] = "A"
-                # --- NEW: Update the duration using the raw CSV's total durations for this file ---
-                try:
-                    raw_durations = get_total_durations(file_path)
-                except ValueError as e:
-                    messagebox.showerror("Error", str(e))
-                    return
-                for name_lower, participant in global_participants.items():
-                    if name_lower in raw_durations:
-                        participant["total_duration"] = raw_durations[name_lower]
-                # ---------------------------------------------------------------------------
-                output_records = []
-                for participant in global_participants.values():
-                    record = {
-                        "Name": participant["Name"],
-                        "Email": participant["Email"],
-                        "Join Time": participant["global_join"].strftime('%Y-%m-%d %H:%M:%S'),
-                        "Leave Time": participant["global_leave"].strftime('%Y-%m-%d %H:%M:%S')
-                    }
-                    for i in range(1, total_sessions + 1):
-                        record[session_labels[i-1]] = participant["sessions"][i]
-                    record["Duration"] = round(participant["total_duration"], 2)
-                    output_records.append(record)
-                try:
-                    raw_log_df = pd.read_csv(file_path)
-                except Exception as e:
-                    messagebox.showerror("Error", f"Error reading raw log from '{file_path}': {e}")
-                    return
-                base = os.path.basename(file_path)
-                name_part, _ = os.path.splitext(base)
-                output_file = os.path.join(os.path.dirname(file_path), name_part + "_processed.xlsx")
-                try:
-                    with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
-                        raw_log_df.to_excel(writer, sheet_name="Sheet1", index=False)
-                        pd.DataFrame(output_records).to_excel(writer, sheet_name="Attendance", index=False)
-                except Exception as e:
-                    messagebox.showerror("Error", f"Error saving output Excel file for {base}: {e}")
+            try:
+                max_workers = int(self.workers_var.get())
+            except (ValueError, tk.TclError):
+                messagebox.showerror("Error", "Workers must be a whole number.")
+                return
+            if self.consolidated.get():
+                self.generate_register(sessions_by_file, max_workers, profile, chunksize, output_format,
+                                       merge_identities, incremental, database)
+                return
+
+            def done(results):
+                summary_all = {}
+                errors = []
+                for file_path, session_summary, error, write_stats in results:
+                    base = os.path.basename(file_path)
+                    if error is None:
+                        summary_all[base] = "\n".join(session_summary + [format_write_stats(write_stats)])
+                    else:
+                        errors.append(f"{base}: {error}")
+                if not summary_all:
+                    messagebox.showerror("Error", "\n".join(errors))
                     return
-                session_summary = []
-                for i in range(1, total_sessions + 1):
-                    present_count = sum(1 for p in global_participants.values() if p["sessions"].get(i, "A") == "P")
-                    absent_count = sum(1 for p in global_participants.values() if p["sessions"].get(i, "A") == "A")
-                    session_summary.append(f"Session {i}: Present: {present_count}, Absent: {absent_count}")
-                summary_all[base] = "\n".join(session_summary)
-            summary_str = "\n\n".join([f"{fname}:\n{summary}" for fname, summary in summary_all.items()])
+                summary_str = "\n\n".join([f"{fname}:\n{summary}" for fname, summary in summary_all.items()])
+                if errors:
+                    summary_str += "\n\nFailed:\n" + "\n".join(errors)
+                if profile.enabled:
+                    summary_str += "\n\n" + format_stage_profile(profile.entries)
+                messagebox.showinfo("Attendance Generated",
+                                    f"Processed {len(summary_all)} files.\n\nSummary:\n{summary_str}")
+            self.start_job(lambda progress: process_files(sessions_by_file, max_workers, progress,
+                                                          profile=profile, chunksize=chunksize,
+                                                          output_format=output_format, raw_sheet=raw_sheet,
+                                                          merge_identities=merge_identities,
+                                                          incremental=incremental, database=database,
+                                                          timeline_resolution=timeline_resolution), done)
+
+    def generate_register(self, sessions_by_file, max_workers, profile, chunksize, output_format, merge_identities,
+                          incremental, database):
+        """Join the attendance of all files into one register file (see process_register)."""
+        extension = REPORT_WRITERS[output_format][1]
+        output_file = filedialog.asksaveasfilename(initialfile="attendance_register" + extension,
+                                                   defaultextension=extension,
+                                                   filetypes=[(f"{output_format} files", "*" + extension)],
+                                                   title="Save Attendance Register as")
+        if not output_file:
+            return
+
+        def done(result):
+            register_summary, errors, write_stats = result
+            summary_str = "\n".join(register_summary)
+            if errors:
+                summary_str += "\n\nFailed:\n" + "\n".join(f"{os.path.basename(file_path)}: {error}"
+                                                          for file_path, error in errors)
+            if profile.enabled:
+                summary_str += "\n\n" + format_stage_profile(profile.entries)
             messagebox.showinfo("Attendance Generated",
-                                f"Processed {len(summary_all)} files.\n\nSummary:\n{summary_str}")
+                                f"Register saved to:\n{output_file}\n\n{summary_str}\n\n{format_write_stats(write_stats)}")
+        self.start_job(lambda progress: process_register(sessions_by_file, output_file, max_workers, progress,
+                                                         profile, chunksize, output_format, merge_identities,
+                                                         incremental, database), done)
+
+    # ---------------------------
+    # Background Jobs
+    # ---------------------------
+    def start_job(self, work, on_done):
+        """
+        Run work(progress) on a background thread so the window stays responsive.
+        Progress events and the outcome are passed back through a queue polled with
+        master.after; on_done(result) is then called on the Tk thread.
+        """
+        cancel_event = threading.Event()
+        job_queue = queue.Queue()
+
+        def progress(stage, done, total):
+            if cancel_event.is_set():
+                raise GenerationCancelled()
+            job_queue.put(("progress", stage, done / total if total else 0.0))
+
+        def run():
+            try:
+                result = work(progress)
+            except GenerationCancelled:
+                job_queue.put(("cancelled",))
+            except Exception as e:
+                job_queue.put(("error", str(e)))
+            else:
+                job_queue.put(("done", result))
+
+        self.cancel_event = cancel_event
+        self.job_queue = job_queue
+        self.generate_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        self.progress_bar.config(value=0.0)
+        self.progress_label.config(text="Starting...")
+        threading.Thread(target=run, daemon=True).start()
+        self.master.after(100, self.poll_job, on_done)
+
+    def poll_job(self, on_done):
+        """Apply queued progress events; finish the job once its outcome arrives."""
+        while True:
+            try:
+                event = self.job_queue.get_nowait()
+            except queue.Empty:
+                self.master.after(100, self.poll_job, on_done)
+                return
+            if event[0] == "progress":
+                self.progress_label.config(text=event[1])
+                self.progress_bar.config(value=event[2])
+                continue
+            self.cancel_event = None
+            self.generate_button.config(state="normal")
+            self.cancel_button.config(state="disabled")
+            if event[0] == "done":
+                self.progress_bar.config(value=1.0)
+                self.progress_label.config(text="Done.")
+                on_done(event[1])
+            elif event[0] == "cancelled":
+                self.progress_bar.config(value=0.0)
+                self.progress_label.config(text="Cancelled.")
+            else:
+                self.progress_label.config(text="Failed.")
+                messagebox.showerror("Error", event[1])
+            return
+
+    def cancel_job(self):
+        """Ask the running job to stop at its next stage."""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_button.config(state="disabled")
+            self.progress_label.config(text="Cancelling...")
 
 # ---------------------------
 # Main Program Entry
@@ -0,0 +1,401 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import attendance_core
+
+# Scales (rows x participants) run when no --scale is given.
+DEFAULT_SCALES = ("10000x500", "100000x5000", "1000000x50000")
+STAGES = ("parse", "get_global_times", "get_total_durations", "merge_intervals",
+          "process_csv_session", "build_attendance", "occupancy_timeline", "write_excel")
+MEETING_START = datetime(2024, 2, 8, 9, 0, 0)
+MEETING_HOURS = 8
+# Excel worksheets hold at most 1,048,576 rows including the header.
+EXCEL_MAX_ROWS = 1_048_575
+# A stage is a regression when it is this much slower (or larger) than the baseline,
+# ignoring changes below the noise floors.
+DEFAULT_THRESHOLD = 10.0
+NOISE_SECONDS = 0.02
+NOISE_MB = 5.0
+# Startup targets: what a fresh interpreter imports (and runs) before it is usable.
+# "gui" imports the Tk application module without opening a window.
+STARTUP_TARGETS = {
+    "attendance_core": "import attendance_core",
+    "warm_up": "import attendance_core; attendance_core.warm_up()",
+    "gui": "import importlib; importlib.import_module('Attendance Generator app')",
+}
+STARTUP_TOP_MODULES = 5
+
+# ---------------------------
+# Synthetic Zoom Logs
+# ---------------------------
+def generate_log(output_file, rows, participants, seed=0):
+    """
+    Write a synthetic Zoom participant log: the meeting preamble (three rows) followed by
+    "Name (Original Name)", "User Email", "Join Time", "Leave Time", "Duration" and
+    "Guest" columns. Every participant connects at least once (when rows allow it) and
+    the remaining rows are reconnects, so participants have several intervals, some of
+    which overlap (e.g. a second device). Some names vary in case and about a tenth of
+    the participants join without an email, as guests do.
+    """
+    if rows < 1 or participants < 1:
+        raise ValueError("rows and participants must be positive.")
+    rng = np.random.default_rng(seed)
+    meeting_seconds = MEETING_HOURS * 3600
+    people = np.arange(participants)
+    if rows >= participants:
+        person = np.concatenate([people, rng.integers(0, participants, rows - participants)])
+    else:
+        person = rng.choice(people, rows, replace=False)
+    rng.shuffle(person)
+    # Each participant arrives around their own time and reconnects around it, so
+    # intervals of one participant cluster and frequently overlap.
+    arrival = rng.integers(0, meeting_seconds * 3 // 4, participants)
+    offset = np.abs(rng.normal(0, 1800, rows)).astype(np.int64)
+    start_seconds = np.minimum(arrival[person] + offset, meeting_seconds - 60)
+    length = np.maximum(rng.exponential(2400, rows).astype(np.int64), 30)
+    end_seconds = np.minimum(start_seconds + length, meeting_seconds)
+
+    surnames = np.array(["Kumar", "Singh", "Rao", "Shah", "Iyer", "Das"], dtype=object)
+    names = (pd.Series(people, dtype=str).radd("Person ") + " "
+             + surnames[rng.integers(0, len(surnames), participants)]).to_numpy(dtype=object)
+    row_names = names[person]
+    upper = rng.random(rows) < 0.05
+    row_names[upper] = pd.Series(row_names[upper], dtype=object).str.upper().to_numpy(dtype=object)
+    guest = rng.random(participants) < 0.1
+    emails = pd.Series(people, dtype=str).radd("p").add("@example.com").to_numpy(dtype=object)
+    emails[guest] = ""
+
+    base = np.datetime64(MEETING_START, "s")
+    df = pd.DataFrame({
+        "Name (Original Name)": row_names,
+        "User Email": emails[person],
+        "Join Time": base + start_seconds.astype("timedelta64[s]"),
+        "Leave Time": base + end_seconds.astype("timedelta64[s]"),
+        "Duration": np.round((end_seconds - start_seconds) / 60).astype(np.int64),
+        "Guest": np.where(guest[person], "Yes", "No"),
+    })
+    meeting_end = MEETING_START + timedelta(hours=MEETING_HOURS)
+    with open(output_file, "w", newline="", encoding="utf-8") as f:
+        f.write("Meeting ID,Topic,Start Time,End Time,User Email,Duration (Minutes),Participants\n")
+        f.write(f"100200300,Benchmark,{MEETING_START},{meeting_end},host@example.com,"
+                f"{MEETING_HOURS * 60},{participants}\n\n")
+        df.to_csv(f, index=False, date_format="%Y-%m-%d %H:%M:%S")
+
+def benchmark_sessions(count=3):
+    """Split the synthetic meeting into count equal sessions requiring 40% attendance."""
+    length = MEETING_HOURS * 60 // count
+    sessions = []
+    for index in range(count):
+        start = pd.Timestamp(MEETING_START) + pd.Timedelta(minutes=index * length)
+        sessions.append({"session_start": start.to_pydatetime(),
+                         "session_end": (start + pd.Timedelta(minutes=length)).to_pydatetime(),
+                         "time_required": length * 0.4})
+    return sessions
+
+def parse_scale(scale):
+    """Parse a 'ROWSxPARTICIPANTS' scale, e.g. '100000x5000' (k and M suffixes allowed)."""
+    def number(text):
+        text = text.strip().lower()
+        multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+        return int(float(text[:-1] if multiplier > 1 else text) * multiplier)
+    try:
+        rows, participants = (number(part) for part in scale.split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid scale '{scale}', expected ROWSxPARTICIPANTS (e.g. 100kx5k)")
+    return rows, participants
+
+def benchmark_log(data_dir, rows, participants, seed):
+    """Return the path of the synthetic log for a scale, generating it if it does not exist."""
+    os.makedirs(data_dir, exist_ok=True)
+    file_path = os.path.join(data_dir, f"zoom_{rows}x{participants}_seed{seed}.csv")
+    if not os.path.exists(file_path):
+        generate_log(file_path + ".tmp", rows, participants, seed)
+        os.replace(file_path + ".tmp", file_path)
+    return file_path
+
+# ---------------------------
+# Stage Timing
+# ---------------------------
+def fresh_log(file_path):
+    """Parse file_path from scratch (no in-memory or on-disk cache) with converted times."""
+    attendance_core._parsed_logs.clear()
+    log = attendance_core.load_log(file_path)
+    log.convert_times()
+    return log
+
+def run_stage(stage, file_path, rows, sessions_info, repeat):
+    """
+    Run one stage repeat times in this (fresh) process and return its fastest time and
+    largest memory use. Everything a stage needs besides its own work, such as parsing
+    the log, is done before the clock starts.
+    """
+    attendance_core.LOG_CACHE_ENABLED = False
+    if stage == "write_excel" and rows > EXCEL_MAX_ROWS:
+        return {"skipped": f"{rows:,} rows exceed the Excel sheet limit"}
+    seconds, peak_mb, growth_mb = [], [], []
+    for _ in range(repeat):
+        attendance_core._parsed_logs.clear()
+        if stage != "parse":
+            fresh_log(file_path)
+        if stage == "write_excel":
+            result = attendance_core.build_attendance(file_path, sessions_info)
+            output_file = os.path.join(tempfile.mkdtemp(), "benchmark_processed.xlsx")
+        gc.collect()
+        started = time.perf_counter()
+        with attendance_core.MemorySampler() as memory:
+            if stage == "parse":
+                fresh_log(file_path)
+            elif stage == "get_global_times":
+                attendance_core.get_global_times(file_path)
+            elif stage == "get_total_durations":
+                attendance_core.get_total_durations(file_path)
+            elif stage == "merge_intervals":
+                attendance_core.load_log(file_path).merged_intervals()
+            elif stage == "process_csv_session":
+                for session in sessions_info:
+                    attendance_core.process_csv_session(file_path, session["session_start"],
+                                                        session["session_end"], session["time_required"])
+            elif stage == "build_attendance":
+                attendance_core.build_attendance(file_path, sessions_info)
+            elif stage == "occupancy_timeline":
+                attendance_core.timeline_frame(file_path)
+            elif stage == "write_excel":
+                attendance_core.write_report(output_file, result, file_path)
+        seconds.append(time.perf_counter() - started)
+        peak_mb.append(memory.peak_mb)
+        growth_mb.append(memory.growth_mb)
+        if stage == "write_excel":
+            os.remove(output_file)
+            os.rmdir(os.path.dirname(output_file))
+    result = {"seconds": min(seconds)}
+    if peak_mb[0] is not None:
+        result.update(peak_rss_mb=max(peak_mb), rss_growth_mb=max(growth_mb))
+    return result
+
+def measure_stage(stage, file_path, rows, sessions_info, repeat):
+    """Run a stage in its own process so memory and caches of other stages do not leak in."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_stage, stage, file_path, rows, sessions_info, repeat).result()
+
+# ---------------------------
+# Startup Time
+# ---------------------------
+def parse_importtime(text):
+    """Return {module: self microseconds} from the stderr of 'python -X importtime'."""
+    modules = {}
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) == 3 and fields[0].strip().isdigit():
+            modules[fields[2].strip()] = int(fields[0])
+    return modules
+
+def measure_startup(target, repeat):
+    """
+    Time STARTUP_TARGETS[target] in fresh interpreters (python -X importtime) and return
+    the fastest time with the modules that took the most import time in that run.
+    """
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    code = ("import time; started = time.perf_counter(); " + STARTUP_TARGETS[target]
+            + "; print(time.perf_counter() - started)")
+    best = None
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=repo_dir,
+                                   capture_output=True, text=True)
+        if completed.returncode:
+            error = completed.stderr.strip().splitlines()
+            return {"skipped": error[-1] if error else f"exit code {completed.returncode}"}
+        seconds = float(completed.stdout.split()[-1])
+        if best is None or seconds < best[0]:
+            best = (seconds, parse_importtime(completed.stderr))
+    seconds, modules = best
+    slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:STARTUP_TOP_MODULES]
+    return {"seconds": seconds, "modules": len(modules),
+            "slowest_imports": {name: round(micros / 1e6, 4) for name, micros in slowest}}
+
+def git_commit():
+    """Return the current git commit of the repository, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(scales, stages=STAGES, repeat=3, data_dir=None, seed=0, startup=True, log=print):
+    """
+    Time every stage on a synthetic log of every (rows, participants) scale, plus the
+    startup time of the modules unless startup is False, and return the report dict
+    written by the 'run' command.
+    """
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), "attendance-benchmark")
+    sessions_info = benchmark_sessions()
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "versions": {"numpy": np.__version__, "pandas": pd.__version__},
+        "repeat": repeat,
+        "sessions": len(sessions_info),
+        "startup": {},
+        "runs": [],
+    }
+    if startup:
+        log("Startup (fresh interpreter, python -X importtime)...")
+        for target in STARTUP_TARGETS:
+            result = measure_startup(target, repeat)
+            report["startup"][target] = result
+            log(f"  {target:<22}" + (f"skipped: {result['skipped']}" if "skipped" in result else
+                                     f"{result['seconds']:9.3f} s  slowest: " +
+                                     ", ".join(f"{name} {seconds:.3f} s"
+                                               for name, seconds in result["slowest_imports"].items())))
+    for rows, participants in scales:
+        log(f"Generating {rows:,} rows x {participants:,} participants...")
+        file_path = benchmark_log(data_dir, rows, participants, seed)
+        run = {"rows": rows, "participants": participants, "seed": seed,
+               "file_mb": round(os.path.getsize(file_path) / 1e6, 2), "stages": {}}
+        for stage in stages:
+            result = measure_stage(stage, file_path, rows, sessions_info, repeat)
+            run["stages"][stage] = result
+            log(f"  {stage:<22}" + (f"skipped: {result['skipped']}" if "skipped" in result else
+                                    f"{result['seconds']:9.3f} s" +
+                                    (f"  peak RSS {result['peak_rss_mb']:8.1f} MB (+{result['rss_growth_mb']:.1f} MB)"
+                                     if "peak_rss_mb" in result else "")))
+        report["runs"].append(run)
+    return report
+
+# ---------------------------
+# Report Comparison
+# ---------------------------
+def compare_reports(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two benchmark reports: startup time, then scale by scale and stage by stage.
+    Returns (lines, regressions): a printable table and the number of stages that are
+    more than threshold percent slower, or use that much more memory, than the baseline.
+    """
+    lines = [f"Baseline {baseline.get('commit') or '?'} ({baseline.get('created')}) vs "
+             f"current {current.get('commit') or '?'} ({current.get('created')})"]
+    regressions = 0
+    base_startup = baseline.get("startup", {})
+    if current.get("startup") and base_startup:
+        lines.append("\nStartup")
+        lines.append(f"  {'target':<22}{'baseline s':>12}{'current s':>12}{'change':>9}")
+        for target, result in current["startup"].items():
+            base = base_startup.get(target)
+            if base is None or "skipped" in base or "skipped" in result:
+                lines.append(f"  {target:<22}{'-':>12}{'-':>12}")
+                continue
+            time_change = (result["seconds"] - base["seconds"]) / base["seconds"] * 100
+            line = f"  {target:<22}{base['seconds']:12.3f}{result['seconds']:12.3f}{time_change:+8.1f}%"
+            if time_change > threshold and result["seconds"] - base["seconds"] > NOISE_SECONDS:
+                regressions += 1
+                line += "  REGRESSION"
+            lines.append(line)
+    baseline_runs = {(run["rows"], run["participants"]): run for run in baseline["runs"]}
+    for run in current["runs"]:
+        base_run = baseline_runs.get((run["rows"], run["participants"]))
+        lines.append(f"\n{run['rows']:,} rows x {run['participants']:,} participants")
+        if base_run is None:
+            lines.append("  (not in baseline)")
+            continue
+        lines.append(f"  {'stage':<22}{'baseline s':>12}{'current s':>12}{'change':>9}"
+                     f"{'baseline MB':>13}{'current MB':>12}{'change':>9}")
+        for stage, result in run["stages"].items():
+            base = base_run["stages"].get(stage)
+            if base is None or "skipped" in base or "skipped" in result:
+                lines.append(f"  {stage:<22}{'-':>12}{'-':>12}")
+                continue
+            time_change = (result["seconds"] - base["seconds"]) / base["seconds"] * 100
+            slower = (time_change > threshold and result["seconds"] - base["seconds"] > NOISE_SECONDS)
+            line = f"  {stage:<22}{base['seconds']:12.3f}{result['seconds']:12.3f}{time_change:+8.1f}%"
+            larger = False
+            if base.get("rss_growth_mb") is not None and result.get("rss_growth_mb") is not None:
+                memory_change = ((result["rss_growth_mb"] - base["rss_growth_mb"])
+                                 / max(base["rss_growth_mb"], NOISE_MB) * 100)
+                larger = (memory_change > threshold
+                          and result["rss_growth_mb"] - base["rss_growth_mb"] > NOISE_MB)
+                line += f"{base['rss_growth_mb']:13.1f}{result['rss_growth_mb']:12.1f}{memory_change:+8.1f}%"
+            if slower or larger:
+                regressions += 1
+                line += "  REGRESSION"
+            lines.append(line)
+    return lines, regressions
+
+# ---------------------------
+# Command Line Entry
+# ---------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the attendance pipeline on synthetic Zoom logs and compare reports between commits.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="time every stage and write a JSON report")
+    run.add_argument("-s", "--scale", action="append", type=parse_scale, metavar="ROWSxPARTICIPANTS",
+                     help=f"log size to benchmark, repeatable, 1k to 10M rows (default: {' '.join(DEFAULT_SCALES)})")
+    run.add_argument("--stage", action="append", choices=STAGES, dest="stages",
+                     help="stage to time, repeatable (default: all)")
+    run.add_argument("-r", "--repeat", type=int, default=3, help="runs per stage; the fastest is reported (default: 3)")
+    run.add_argument("--seed", type=int, default=0, help="random seed of the synthetic logs (default: 0)")
+    run.add_argument("--no-startup", dest="startup", action="store_false",
+                     help="do not time the module startup in fresh interpreters")
+    run.add_argument("--data-dir", help="where synthetic logs are generated and reused (default: a temp directory)")
+    run.add_argument("-o", "--output", default="benchmark.json", help="JSON report file (default: benchmark.json)")
+    run.add_argument("--compare", metavar="BASELINE", help="compare the new report with a baseline report")
+
+    generate = commands.add_parser("generate", help="write one synthetic Zoom log")
+    generate.add_argument("scale", type=parse_scale, metavar="ROWSxPARTICIPANTS")
+    generate.add_argument("output", help="CSV file to write")
+    generate.add_argument("--seed", type=int, default=0)
+
+    compare = commands.add_parser("compare", help="compare two JSON reports")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    for command in (run, compare):
+        command.add_argument("-t", "--threshold", type=float, default=DEFAULT_THRESHOLD,
+                             help=f"percent slowdown or memory growth reported as a regression "
+                                  f"(default: {DEFAULT_THRESHOLD:g})")
+    return parser
+
+def load_report(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "generate":
+        rows, participants = args.scale
+        generate_log(args.output, rows, participants, args.seed)
+        return 0
+    if args.command == "run":
+        scales = args.scale or [parse_scale(scale) for scale in DEFAULT_SCALES]
+        report = run_benchmarks(scales, args.stages or STAGES, max(args.repeat, 1), args.data_dir, args.seed,
+                                args.startup, log=lambda line: print(line, file=sys.stderr))
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}", file=sys.stderr)
+        if not args.compare:
+            return 0
+        baseline, current = load_report(args.compare), report
+    else:
+        baseline, current = load_report(args.baseline), load_report(args.current)
+    lines, regressions = compare_reports(baseline, current, args.threshold)
+    print("\n".join(lines))
+    print(f"\n{regressions} regression(s) above {args.threshold:g}%.")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+import argparse
+from collections import Counter
+import glob
+import json
+import os
+import sys
+from datetime import datetime
+
+from attendance_core import (DEFAULT_WORKERS, NO_PROFILE, PROFILE_LOG, RAW_SHEET_MODES, REPORT_WRITERS,
+                             SESSION_OCCUPANCY_FRACTION, STREAM_CHUNKSIZE, TIMELINE_RESOLUTION, LogCache,
+                             StageProfile, attendance_rates, format_stage_profile, format_write_stats,
+                             parse_datetime, participant_history, process_files, process_register,
+                             processed_output_path, suggest_sessions, timeline_step)
+
+# Exit codes for scheduled runs.
+EXIT_OK = 0
+EXIT_FILE_ERRORS = 1   # at least one file could not be processed
+EXIT_USAGE = 2         # bad arguments, session spec or no input files
+EXIT_BROKEN_PIPE = 141  # the output was closed early, e.g. piped into head (128 + SIGPIPE)
+
+# ---------------------------
+# Session Spec
+# ---------------------------
+def load_spec(spec_path):
+    """
+    Load a session spec from a JSON or YAML (.yaml/.yml, needs PyYAML) file.
+    The spec is either a list of sessions applied to every file, or a dict with an
+    optional "sessions" list (the default) and a "files" dict mapping a CSV file name,
+    or a path as given on the command line for files that share a name, to its own
+    list of sessions (see file_sessions_for). Each session has "start", "end"
+    (YYYY-MM-DD HH:MM:SS) and "time_required" (minutes).
+    """
+    is_yaml = os.path.splitext(spec_path)[1].lower() in (".yaml", ".yml")
+    if is_yaml:
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("PyYAML is required for YAML session specs (pip install pyyaml).")
+    try:
+        with open(spec_path, encoding="utf-8") as f:
+            spec = yaml.safe_load(f) if is_yaml else json.load(f)
+    except Exception as e:
+        raise ValueError(f"Error reading session spec '{spec_path}': {e}")
+    if isinstance(spec, list):
+        spec = {"sessions": spec}
+    if not isinstance(spec, dict):
+        raise ValueError(f"Session spec '{spec_path}' must be a list of sessions or a dict.")
+    default_sessions = parse_sessions(spec.get("sessions") or [], "sessions")
+    file_sessions = {name: parse_sessions(sessions, name)
+                     for name, sessions in (spec.get("files") or {}).items()}
+    return default_sessions, file_sessions
+
+def parse_sessions(sessions, where):
+    """Validate spec sessions and convert them to the sessions_info dicts used by attendance_core."""
+    sessions_info = []
+    for index, session in enumerate(sessions, start=1):
+        try:
+            start, end = (value if isinstance(value, datetime) else parse_datetime(str(value))
+                          for value in (session["start"], session["end"]))
+            time_required = float(session["time_required"])
+        except KeyError as e:
+            raise ValueError(f"Session {index} of '{where}' is missing {e}.")
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Error in session {index} of '{where}': {e}")
+        if start >= end:
+            raise ValueError(f"Session {index} of '{where}': start must be before end.")
+        sessions_info.append({"session_start": start, "session_end": end, "time_required": time_required})
+    return sessions_info
+
+def file_sessions_for(file_path, file_sessions, default_sessions):
+    """Return the spec sessions of file_path: by its path as given, then by its name, then the default."""
+    by_path = {os.path.normpath(name): sessions for name, sessions in file_sessions.items()}
+    sessions = by_path.get(os.path.normpath(file_path))
+    if sessions is None:
+        sessions = file_sessions.get(os.path.basename(file_path), default_sessions)
+    return sessions
+
+def file_labels(files):
+    """Label each file by its name, or by its path where several files share a name."""
+    names = Counter(os.path.basename(file_path) for file_path in files)
+    return {file_path: file_path if names[os.path.basename(file_path)] > 1 else os.path.basename(file_path)
+            for file_path in files}
+
+def output_clashes(files, output_dir, output_format):
+    """Return [(report path, files)] for reports that more than one file would be written to."""
+    outputs = {}
+    for file_path in files:
+        output_file = os.path.abspath(processed_output_path(file_path, output_dir, output_format))
+        outputs.setdefault(output_file, []).append(file_path)
+    return [(output_file, clashing) for output_file, clashing in outputs.items() if len(clashing) > 1]
+
+def collect_files(paths):
+    """Expand CSV files and directories (all *.csv directly inside) into a sorted file list."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.csv"))))
+        else:
+            files.append(path)
+    return files
+
+# ---------------------------
+# Command Line Entry
+# ---------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Generate Zoom attendance reports without the GUI. Each CSV file gets a "
+                    "'<name>_processed' report and the present/absent summary is printed.")
+    parser.add_argument("spec", nargs="?", help="session spec file (JSON, or YAML with PyYAML installed)")
+    parser.add_argument("paths", nargs="*", help="Zoom log CSV files and/or directories of CSV files")
+    parser.add_argument("-o", "--output-dir", help="write reports here instead of next to each CSV file")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"number of files processed in parallel (default: {DEFAULT_WORKERS})")
+    parser.add_argument("-f", "--format", choices=list(REPORT_WRITERS), default="xlsx", dest="output_format",
+                        help="report format; xlsx-stream writes rows without holding the workbook in memory, "
+                             "csv and parquet hold the Attendance table only (default: xlsx)")
+    parser.add_argument("--raw-sheet", choices=RAW_SHEET_MODES,
+                        help="xlsx 'Sheet1': copy the raw log, reference the CSV file, or skip it "
+                             "(default: copy, reference with --incremental)")
+    parser.add_argument("--stream", nargs="?", type=int, const=STREAM_CHUNKSIZE, metavar="CHUNKSIZE",
+                        dest="chunksize", help="read logs in chunks of CHUNKSIZE rows to bound memory "
+                                               f"(default chunk: {STREAM_CHUNKSIZE:,} rows)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="for logs re-exported while a meeting runs: keep a checkpoint per log and only "
+                             "read the rows appended since the last run (Sheet1 references the CSV file unless "
+                             "--raw-sheet copy is given)")
+    parser.add_argument("--merge-identities", action="store_true",
+                        help="treat records with the same email or a similar name (renames, device suffixes) "
+                             "as one participant; xlsx reports list the merges in an 'Identities' sheet")
+    parser.add_argument("--timeline", nargs="?", type=timeline_step, const=TIMELINE_RESOLUTION,
+                        metavar="RESOLUTION", dest="timeline_resolution",
+                        help="add a 'Timeline' sheet (xlsx) with the participants present every RESOLUTION, "
+                             f"e.g. 30s or 5min (default: {TIMELINE_RESOLUTION}); not with --stream")
+    parser.add_argument("--suggest-sessions", action="store_true",
+                        help="print a session spec with the session windows detected from each log's "
+                             "occupancy instead of generating reports (add time_required before using it)")
+    parser.add_argument("--min-occupancy", type=float, default=SESSION_OCCUPANCY_FRACTION * 100,
+                        metavar="PERCENT",
+                        help="with --suggest-sessions, the share of the peak number of participants that "
+                             f"marks a session (default: {SESSION_OCCUPANCY_FRACTION * 100:g})")
+    parser.add_argument("--register", metavar="FILE",
+                        help="write one consolidated register of all files (in the order given, directories "
+                             "sorted by name) to FILE instead of a report per file")
+    parser.add_argument("--db", metavar="FILE", dest="database",
+                        help="also save participants, intervals and per-session statuses to this SQLite database")
+    parser.add_argument("--history", metavar="PARTICIPANT",
+                        help="print the attendance history of a participant (name or email) from --db")
+    parser.add_argument("--rates", action="store_true",
+                        help="print every participant's attendance rate over the sessions in --db")
+    parser.add_argument("--below", type=float, metavar="PERCENT",
+                        help="with --rates, list only participants below PERCENT attendance")
+    parser.add_argument("--since", type=parse_datetime, metavar="DATETIME",
+                        help="with --history/--rates, only sessions starting at or after DATETIME")
+    parser.add_argument("--until", type=parse_datetime, metavar="DATETIME",
+                        help="with --history/--rates, only sessions starting before DATETIME")
+    parser.add_argument("--files", metavar="GLOB", dest="file_pattern",
+                        help="with --history/--rates, only sessions of stored files whose name or path "
+                             "matches GLOB, e.g. 'cs101_*.csv' (default: all files)")
+    parser.add_argument("--profile", action="store_true",
+                        help="print the time and peak memory of every pipeline stage")
+    parser.add_argument("--profile-log", metavar="FILE", default=PROFILE_LOG,
+                        help="append stage timings to FILE as JSON lines (implies --profile)")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="empty the on-disk cache of parsed logs, then process any given files")
+    return parser
+
+def main(argv=None):
+    try:
+        exit_code = run(argv)
+        # Output to a pipe is buffered; flush here so a closed pipe is handled below.
+        sys.stdout.flush()
+        return exit_code
+    except BrokenPipeError:
+        # The reader of stdout has gone; stop quietly instead of printing a traceback,
+        # and point stdout at devnull so the interpreter's final flush does not fail again.
+        try:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        except (OSError, ValueError):
+            pass
+        return EXIT_BROKEN_PIPE
+
+def run(argv):
+    """Run the command line argv and return its exit code (see main)."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.clear_cache:
+        cache = LogCache()
+        removed, freed = cache.clear()
+        print(f"Cleared {removed} cached logs ({freed / 1e6:.1f} MB) from {cache.directory}.")
+        if args.spec is None:
+            return EXIT_OK
+    if args.history or args.rates:
+        if not args.database:
+            parser.error("--history and --rates need --db")
+        return query_database(args)
+    if args.suggest_sessions:
+        paths = ([args.spec] if args.spec else []) + args.paths
+        if not paths:
+            parser.error("--suggest-sessions needs Zoom log CSV files or directories")
+        return print_suggested_sessions(args, collect_files(paths))
+    if args.spec is None or not args.paths:
+        parser.error("the following arguments are required: spec, paths")
+    if args.merge_identities and (args.chunksize or args.incremental):
+        parser.error("--merge-identities needs the whole log and cannot be combined with --stream or --incremental")
+    if args.timeline_resolution is not None and args.chunksize and not args.incremental:
+        parser.error("--timeline needs every participant's intervals and cannot be combined with --stream")
+    if args.raw_sheet is None:
+        args.raw_sheet = "reference" if args.incremental else "copy"
+    try:
+        default_sessions, file_sessions = load_spec(args.spec)
+        profile = StageProfile(args.profile_log) if args.profile or args.profile_log else NO_PROFILE
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    files = collect_files(args.paths)
+    if not files:
+        print("Error: no CSV files found.", file=sys.stderr)
+        return EXIT_USAGE
+    labels = file_labels(files)
+    sessions_by_file = {}
+    skipped = []
+    for file_path in files:
+        sessions_info = file_sessions_for(file_path, file_sessions, default_sessions)
+        if sessions_info:
+            sessions_by_file[file_path] = sessions_info
+        else:
+            skipped.append(file_path)
+    for file_path in skipped:
+        print(f"Error: no sessions defined for '{labels[file_path]}'.", file=sys.stderr)
+    if args.register:
+        return write_register(args, sessions_by_file, profile, len(files))
+    clashes = output_clashes(sessions_by_file, args.output_dir, args.output_format)
+    for output_file, clashing in clashes:
+        print(f"Error: {', '.join(clashing)} would be written to the same report '{output_file}'; "
+              "run them with different --output-dir directories.", file=sys.stderr)
+    if clashes:
+        return EXIT_USAGE
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    results = process_files(sessions_by_file, max(args.workers, 1), output_dir=args.output_dir, profile=profile,
+                            chunksize=args.chunksize, output_format=args.output_format,
+                            raw_sheet=args.raw_sheet, merge_identities=args.merge_identities,
+                            incremental=args.incremental, database=args.database,
+                            timeline_resolution=args.timeline_resolution)
+    succeeded = 0
+    for file_path, session_summary, error, write_stats in results:
+        base = labels[file_path]
+        if error is None:
+            succeeded += 1
+            print(f"{base}:\n" + "\n".join(session_summary) + "\n" + format_write_stats(write_stats) + "\n")
+        else:
+            print(f"Error: {base}: {error}", file=sys.stderr)
+    if profile.enabled:
+        print(format_stage_profile(profile.entries))
+    print(f"Processed {succeeded} of {len(files)} files.")
+    return EXIT_OK if succeeded == len(files) else EXIT_FILE_ERRORS
+
+def write_register(args, sessions_by_file, profile, file_count):
+    """Run the --register mode of main and return its exit code."""
+    try:
+        register_summary, errors, write_stats = process_register(
+            sessions_by_file, args.register, max(args.workers, 1), profile=profile, chunksize=args.chunksize,
+            output_format=args.output_format, merge_identities=args.merge_identities, incremental=args.incremental,
+            database=args.database)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_FILE_ERRORS
+    for file_path, error in errors:
+        print(f"Error: {os.path.basename(file_path)}: {error}", file=sys.stderr)
+    print("\n".join(register_summary) + "\n" + format_write_stats(write_stats))
+    if profile.enabled:
+        print(format_stage_profile(profile.entries))
+    succeeded = len(sessions_by_file) - len(errors)
+    print(f"Register of {succeeded} of {file_count} files written to {args.register}.")
+    return EXIT_OK if succeeded == file_count else EXIT_FILE_ERRORS
+
+def print_suggested_sessions(args, files):
+    """Run the --suggest-sessions mode of main: print a session spec and return the exit code."""
+    if not files:
+        print("Error: no CSV files found.", file=sys.stderr)
+        return EXIT_USAGE
+    # Keyed by the path as given, so files sharing a name keep their own sessions.
+    spec = {"files": {}}
+    errors = 0
+    for file_path in files:
+        try:
+            windows = suggest_sessions(file_path, args.min_occupancy / 100,
+                                       merge_identities=args.merge_identities)
+        except ValueError as e:
+            print(f"Error: {file_path}: {e}", file=sys.stderr)
+            errors += 1
+            continue
+        spec["files"][file_path] = [
+            {"start": start.strftime("%Y-%m-%d %H:%M:%S"), "end": end.strftime("%Y-%m-%d %H:%M:%S")}
+            for start, end in windows]
+    print(json.dumps(spec, indent=2))
+    print('Add "time_required" (minutes) to every session before using this spec.', file=sys.stderr)
+    return EXIT_FILE_ERRORS if errors else EXIT_OK
+
+def query_database(args):
+    """Run the --history / --rates queries of main and return the exit code."""
+    try:
+        if args.history:
+            history = participant_history(args.database, args.history, args.since, args.until,
+                                          args.file_pattern)
+            present = int((history["Status"] == "P").sum())
+            print(history.to_string(index=False))
+            print(f"{args.history}: present in {present} of {len(history)} sessions.")
+        if args.rates:
+            rates = attendance_rates(args.database, args.since, args.until, args.below, args.file_pattern)
+            print(rates.to_string(index=False) if len(rates) else "No participants.")
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    return EXIT_OK
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2738 @@
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+import copy
+import csv
+import hashlib
+import importlib.util
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# ---------------------------
+# Deferred Imports
+# ---------------------------
+class DeferredModule:
+    """
+    Stand-in for a heavy module that is imported on first attribute access and then
+    replaces itself in this module's globals, so later uses cost nothing extra.
+    numpy and pandas take most of the import time of this module; deferring them lets
+    the GUI window appear at once and keeps CLI usage errors fast.
+    """
+    def __init__(self, name, alias):
+        self.name = name
+        self.alias = alias
+
+    def load(self):
+        """Import the module (thread-safe through the import lock) and install it."""
+        module = importlib.import_module(self.name)
+        globals()[self.alias] = module
+        return module
+
+    def __getattr__(self, attribute):
+        return getattr(self.load(), attribute)
+
+np = DeferredModule("numpy", "np")
+pd = DeferredModule("pandas", "pd")
+
+def warm_up():
+    """
+    Import numpy, pandas and the Excel engine now, e.g. on a background thread once a
+    file is selected, so the first report does not wait for them.
+    """
+    for module in (np, pd):
+        if isinstance(module, DeferredModule):
+            module.load()
+    for engine in ("openpyxl", "xlsxwriter"):
+        if importlib.util.find_spec(engine):
+            importlib.import_module(engine)
+
+# ---------------------------
+# Helper Functions
+# ---------------------------
+class GenerationCancelled(Exception):
+    """Raised by a progress callback to stop attendance generation between stages."""
+
+def no_progress(stage, done, total):
+    """Default progress callback: progress(stage, done, total) that ignores every event."""
+
+# (process handle, GetProcessMemoryInfo, PROCESS_MEMORY_COUNTERS) set up on first use.
+_windows_memory_info = None
+
+def windows_rss_mb():
+    """Return the working set of this process in MB from GetProcessMemoryInfo (Windows only)."""
+    global _windows_memory_info
+    import ctypes
+    if _windows_memory_info is None:
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+        kernel32, psapi = ctypes.WinDLL("kernel32"), ctypes.WinDLL("psapi")
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD]
+        psapi.GetProcessMemoryInfo.restype = wintypes.BOOL
+        _windows_memory_info = (kernel32.GetCurrentProcess(), psapi.GetProcessMemoryInfo, ProcessMemoryCounters)
+    handle, get_memory_info, counters_type = _windows_memory_info
+    counters = counters_type()
+    counters.cb = ctypes.sizeof(counters)
+    if not get_memory_info(handle, ctypes.byref(counters), counters.cb):
+        raise OSError("GetProcessMemoryInfo failed")
+    return counters.WorkingSetSize / 1e6
+
+def current_rss_mb():
+    """
+    Return the resident set size of this process in MB, or None if it cannot be read:
+    from /proc on Linux, GetProcessMemoryInfo on Windows, otherwise (e.g. macOS)
+    through psutil when it is installed.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError, IndexError):
+        pass
+    if os.name == "nt":
+        try:
+            return windows_rss_mb()
+        except (OSError, AttributeError, ValueError):
+            pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / 1e6
+
+class MemorySampler:
+    """
+    Context manager that samples current_rss_mb on a background thread.
+    After the block, peak_mb is the highest RSS seen and growth_mb how far it rose
+    above the RSS at entry (both None where RSS is unavailable).
+    """
+    interval = 0.01
+
+    def __enter__(self):
+        self.start_mb = self.peak_mb = current_rss_mb()
+        self.growth_mb = None
+        self._stop = threading.Event()
+        self._thread = None
+        if self.start_mb is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+    def __exit__(self, *exc_info):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+            self.growth_mb = self.peak_mb - self.start_mb
+        return False
+
+def parse_datetime(dt_str):
+    """Parse a datetime string in the format: YYYY-MM-DD HH:MM:SS"""
+    try:
+        return datetime.strptime(dt_str.strip(), '%Y-%m-%d %H:%M:%S')
+    except Exception:
+        raise ValueError(f"Invalid datetime format: {dt_str}. Expected format: YYYY-MM-DD HH:MM:SS")
+
+def merge_intervals(intervals):
+    """Merge overlapping intervals (list of (start, end) datetime tuples)."""
+    if not intervals:
+        return []
+    intervals.sort(key=lambda x: x[0])
+    merged = [intervals[0]]
+    for current in intervals[1:]:
+        last = merged[-1]
+        if current[0] <= last[1]:
+            merged[-1] = (last[0], max(last[1], current[1]))
+        else:
+            merged.append(current)
+    return merged
+
+def compute_total_duration(intervals):
+    """Return total duration in minutes from a list of (start, end) intervals."""
+    total = timedelta()
+    for start, end in intervals:
+        total += (end - start)
+    return total.total_seconds() / 60
+
+def intersect_interval(interval, period):
+    """Return the overlapping portion of an interval with a given period."""
+    start, end = interval
+    p_start, p_end = period
+    new_start = max(start, p_start)
+    new_end = min(end, p_end)
+    if new_start < new_end:
+        return (new_start, new_end)
+    return None
+
+def to_nanoseconds(times):
+    """Return a datetime Series as an int64 array of nanoseconds since the epoch."""
+    return times.to_numpy(dtype="datetime64[ns]").view("int64")
+
+def merge_intervals_by_key(codes, starts, ends):
+    """
+    Vectorized merge_intervals for many participants at once.
+    codes are integer participant codes and starts/ends int64 nanosecond timestamps.
+    Intervals are sorted by (code, start); a new merged interval begins where the code
+    changes or where the start lies after the running maximum end of the participant's
+    earlier intervals. Returns (codes, starts, ends) of the merged intervals, sorted by
+    code and start.
+    """
+    if len(codes) == 0:
+        return codes, starts, ends
+    order = np.lexsort((starts, codes))
+    codes, starts, ends = codes[order], starts[order], ends[order]
+    running_end = pd.Series(ends).groupby(codes).cummax().to_numpy()
+    breaks = np.empty(len(codes), dtype=bool)
+    breaks[0] = True
+    breaks[1:] = (codes[1:] != codes[:-1]) | (starts[1:] > running_end[:-1])
+    block_starts = np.flatnonzero(breaks)
+    return codes[block_starts], starts[block_starts], np.maximum.reduceat(ends, block_starts)
+
+# Upper bound on interval x session cells evaluated at once by session_matrix.
+SESSION_MATRIX_CHUNK = 4_000_000
+
+def session_matrix(codes, starts, ends, window_starts, window_ends):
+    """
+    Evaluate merged intervals (see merge_intervals_by_key) against several session
+    windows at once. Windows are given as int64 nanosecond arrays; each interval is
+    clipped to every window by broadcasting and the overlaps are summed per participant.
+    Returns (participant_codes, overlap_ns, first_join, last_leave) where the last three
+    are participants x sessions int64 arrays. first_join/last_leave bound the overlapping
+    portion and are only meaningful where overlap_ns > 0.
+    """
+    window_starts = np.asarray(window_starts, dtype=np.int64)
+    window_ends = np.asarray(window_ends, dtype=np.int64)
+    n_sessions = len(window_starts)
+    group_starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.empty(0, dtype=np.int64)
+    n_participants = len(group_starts)
+    overlap_ns = np.zeros((n_participants, n_sessions), dtype=np.int64)
+    first_join = np.zeros((n_participants, n_sessions), dtype=np.int64)
+    last_leave = np.zeros((n_participants, n_sessions), dtype=np.int64)
+    bounds = np.append(group_starts, len(codes))
+    rows_per_chunk = max(1, SESSION_MATRIX_CHUNK // max(n_sessions, 1))
+    lo_participant = 0
+    while lo_participant < n_participants:
+        # Take whole participants so every chunk can be reduced on its own.
+        hi_participant = np.searchsorted(bounds, bounds[lo_participant] + rows_per_chunk, side="right") - 1
+        hi_participant = min(max(hi_participant, lo_participant + 1), n_participants)
+        lo, hi = bounds[lo_participant], bounds[hi_participant]
+        clipped_starts = np.maximum(starts[lo:hi, None], window_starts[None, :])
+        clipped_ends = np.minimum(ends[lo:hi, None], window_ends[None, :])
+        overlaps = clipped_starts < clipped_ends
+        local_starts = group_starts[lo_participant:hi_participant] - lo
+        overlap_ns[lo_participant:hi_participant] = np.add.reduceat(
+            np.where(overlaps, clipped_ends - clipped_starts, 0), local_starts, axis=0)
+        first_join[lo_participant:hi_participant] = np.minimum.reduceat(
+            np.where(overlaps, clipped_starts, np.iinfo(np.int64).max), local_starts, axis=0)
+        last_leave[lo_participant:hi_participant] = np.maximum.reduceat(
+            np.where(overlaps, clipped_ends, np.iinfo(np.int64).min), local_starts, axis=0)
+        lo_participant = hi_participant
+    return codes[group_starts], overlap_ns, first_join, last_leave
+
+# ---------------------------
+# Interval Index
+# ---------------------------
+def window_nanoseconds(window):
+    """Return a (start, end) window of datetimes, strings or nanoseconds as int64 nanoseconds."""
+    start, end = window
+    return pd.Timestamp(start).value, pd.Timestamp(end).value
+
+class IntervalIndex:
+    """
+    Index of every participant's merged intervals (see merge_intervals_by_key) for
+    attendance queries on arbitrary [start, end) windows without rescanning the log:
+        index = load_log(file_path).interval_index()
+        index.attended_minutes(("2024-02-08 10:15:00", "2024-02-08 10:45:00"))
+        index.present(window, required=20)
+    Each participant's intervals are disjoint and sorted, so with prefix sums of the
+    interval durations the overlap with a window is the sum over the intervals between
+    two binary searches, corrected for the two clipped ends. The searches for all
+    participants run as one searchsorted over composite (participant, time rank) keys,
+    so a window costs O(participants * log intervals).
+    """
+    def __init__(self, codes, starts, ends, keys=None):
+        """
+        codes, starts and ends are merged intervals sorted by (code, start) with int64
+        nanosecond times. keys, if given, maps codes to participant keys (lower-case names).
+        Zero-length intervals never overlap a window and are left out of the searches, as
+        session_matrix ignores them, but their participants are kept.
+        """
+        group_starts = (np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes)
+                        else np.empty(0, dtype=np.int64))
+        self.participant_codes = codes[group_starts]
+        self.keys = None if keys is None else keys[self.participant_codes]
+        participant = np.repeat(np.arange(len(group_starts)), np.diff(np.append(group_starts, len(codes))))
+        positive = ends > starts
+        participant, starts, ends = participant[positive], starts[positive], ends[positive]
+        self.starts = starts
+        self.ends = ends
+        self.cumulative = np.concatenate([[0], np.cumsum(ends - starts)])
+        # Ranking times among their distinct values keeps participant * (ranks + 1) + rank
+        # within int64 while ordering the keys like (participant, time).
+        self._start_values = np.unique(starts)
+        self._end_values = np.unique(ends)
+        self._start_keys = participant * (len(self._start_values) + 1) + np.searchsorted(self._start_values, starts)
+        self._end_keys = participant * (len(self._end_values) + 1) + np.searchsorted(self._end_values, ends)
+        self._participants = np.arange(len(group_starts))
+
+    def __len__(self):
+        return len(self.participant_codes)
+
+    def window_columns(self, windows):
+        """
+        Evaluate (start, end) int64 nanosecond windows for every participant, as
+        session_matrix does. Returns (overlap_ns, first_join, last_leave) participants x
+        windows int64 arrays; first_join/last_leave bound the overlapping portion and are
+        only meaningful where overlap_ns > 0.
+        """
+        shape = (len(self), len(windows))
+        overlap_ns = np.zeros(shape, dtype=np.int64)
+        first_join = np.zeros(shape, dtype=np.int64)
+        last_leave = np.zeros(shape, dtype=np.int64)
+        if not len(self.starts):
+            return overlap_ns, first_join, last_leave
+        for column, (window_start, window_end) in enumerate(windows):
+            # first: each participant's first interval ending after the window start;
+            # stop: its first interval starting at or after the window end.
+            first = np.searchsorted(self._end_keys, self._participants * (len(self._end_values) + 1)
+                                    + np.searchsorted(self._end_values, window_start, side="right"))
+            stop = np.searchsorted(self._start_keys, self._participants * (len(self._start_values) + 1)
+                                   + np.searchsorted(self._start_values, window_end, side="left"))
+            attended = first < stop
+            first, last = first[attended], stop[attended] - 1
+            join = np.maximum(self.starts[first], window_start)
+            leave = np.minimum(self.ends[last], window_end)
+            overlap_ns[attended, column] = (self.cumulative[last + 1] - self.cumulative[first]
+                                            - (join - self.starts[first]) - (self.ends[last] - leave))
+            first_join[attended, column] = join
+            last_leave[attended, column] = leave
+        return overlap_ns, first_join, last_leave
+
+    def attended_minutes(self, window):
+        """
+        Return the minutes each participant attended within window, a (start, end) pair of
+        datetimes, 'YYYY-MM-DD HH:MM:SS' strings or nanoseconds, as a Series indexed by key.
+        """
+        overlap_ns = self.window_columns([window_nanoseconds(window)])[0][:, 0]
+        return pd.Series(overlap_ns / 1e9 / 60, index=self.keys, name="minutes")
+
+    def present(self, window, required):
+        """
+        Return whether each participant attended window for at least required minutes
+        (and at all), as a boolean Series indexed by key.
+        """
+        minutes = self.attended_minutes(window)
+        return ((minutes > 0) & (minutes >= required)).rename("present")
+
+# ---------------------------
+# Identity Resolution
+# ---------------------------
+# Tokens dropped from display names before matching: device labels Zoom users add.
+IDENTITY_DEVICE_WORDS = frozenset({"iphone", "ipad", "android", "phone", "mobile", "tablet", "laptop",
+                                   "desktop", "pc", "mac", "macbook", "galaxy", "zoom"})
+# Names that identify no one ("Guest", "Zoom User", a bare "iPhone"): records with only
+# these words (and numbers) are never joined by name, only by email.
+IDENTITY_PLACEHOLDER_WORDS = frozenset({"guest", "host", "co", "cohost", "user", "unknown", "participant",
+                                        "attendee", "anonymous"}) | IDENTITY_DEVICE_WORDS
+# Names are only compared with the names of their blocks (token prefixes/suffixes);
+# blocks shared by more names than this are too unspecific and skipped.
+IDENTITY_BLOCK_SIZE = 50
+# Minimum character-trigram Jaccard similarity of two normalized names to merge them.
+IDENTITY_SIMILARITY = 0.8
+
+def normalize_names(names):
+    """
+    Normalize display names for matching: accents, text in brackets, possessive "'s",
+    punctuation and device words are removed and the remaining tokens are sorted, so
+    "Ravi Kumar (iPhone)" and "kumar, ravi" both become "kumar ravi". A name with no
+    remaining token keeps its lower-cased text. Returns a list of strings ("" for
+    missing names).
+    """
+    text = pd.Series(names, dtype=object).fillna("").astype(str)
+    cleaned = (text.str.normalize("NFKD").str.replace("[\u0300-\u036f]", "", regex=True).str.lower()
+               .str.replace(r"\([^)]*\)|\[[^\]]*\]", " ", regex=True)
+               .str.replace(r"['’]s\b", "", regex=True)
+               .str.replace(r"[\W_]+", " ", regex=True))
+    normalized = []
+    for raw, words in zip(text, cleaned.str.split()):
+        tokens = sorted(word for word in words if word not in IDENTITY_DEVICE_WORDS)
+        normalized.append(" ".join(tokens) if tokens else raw.strip().lower())
+    return normalized
+
+def placeholder_name(name):
+    """Return whether a normalized name only holds IDENTITY_PLACEHOLDER_WORDS and numbers."""
+    words = {word for word in name.split() if not word.isdigit()}
+    return bool(words) and words <= IDENTITY_PLACEHOLDER_WORDS
+
+def name_trigrams(name):
+    """Return the set of character trigrams of a normalized name, padded at word boundaries."""
+    padded = f" {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def resolve_identities(names, emails):
+    """
+    Group participant records that belong to the same person. names and emails hold one
+    display name and email (missing allowed) per record, in order of first appearance.
+    Records are joined, with union-find, when
+      - they have the same email (case-insensitive),
+      - their normalized names (see normalize_names) are equal, or
+      - their normalized names are similar (IDENTITY_SIMILARITY), or one name's words
+        are a subset of exactly one other name's words ("Ravi" -> "Ravi Kumar"), and
+        the names hold the same numbers ("Room 1" and "Room 2" stay apart).
+    Placeholder names such as "Guest" (see placeholder_name) are only joined by email.
+    Similar names are only compared within blocks of names sharing a word prefix or
+    suffix (IDENTITY_BLOCK_SIZE), which keeps the comparisons near-linear. Two groups
+    with different emails are never joined.
+    Returns (groups, rules): for every record the index of its group's first record,
+    and the rule that joined it ("email", "name", "similar name"; None for the first
+    record of a group).
+    """
+    count = len(names)
+    parent = np.arange(count)
+    group_email = [email.strip().lower() if isinstance(email, str) and email.strip() else None
+                   for email in emails]
+    rules = [None] * count
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j, rule):
+        root_i, root_j = find(i), find(j)
+        if root_i == root_j:
+            return
+        email_i, email_j = group_email[root_i], group_email[root_j]
+        if email_i and email_j and email_i != email_j:
+            return
+        root, other = min(root_i, root_j), max(root_i, root_j)
+        parent[other] = root
+        group_email[root] = email_i or email_j
+        for record in (i, j):
+            if rules[record] is None:
+                rules[record] = rule
+
+    by_email = {}
+    for i, email in enumerate(list(group_email)):
+        if email:
+            union(by_email.setdefault(email, i), i, "email")
+    normalized = normalize_names(names)
+    by_name = {}
+    for i, name in enumerate(normalized):
+        if name and not placeholder_name(name):
+            union(by_name.setdefault(name, i), i, "name")
+
+    # Blocked comparison of the distinct normalized names.
+    distinct = list(by_name)
+    words = [set(name.split()) for name in distinct]
+    numbers = [{word for word in name_words if word.isdigit()} for name_words in words]
+    blocks = {}
+    for d, name in enumerate(distinct):
+        for word in name.split():
+            if len(word) >= 3:
+                for key in {("^", word[:3]), ("$", word[-3:])}:
+                    blocks.setdefault(key, []).append(d)
+    pairs = set()
+    for members in blocks.values():
+        if 1 < len(members) <= IDENTITY_BLOCK_SIZE:
+            pairs.update((a, b) for k, a in enumerate(members) for b in members[k + 1:])
+    trigrams = {}
+    supersets = {}
+    similar = []
+    for a, b in sorted(pairs):
+        if numbers[a] != numbers[b]:
+            continue
+        if words[a] < words[b] or words[b] < words[a]:
+            subset, superset = (a, b) if words[a] < words[b] else (b, a)
+            supersets.setdefault(subset, []).append(superset)
+            continue
+        grams_a = trigrams.get(a) or trigrams.setdefault(a, name_trigrams(distinct[a]))
+        grams_b = trigrams.get(b) or trigrams.setdefault(b, name_trigrams(distinct[b]))
+        if len(grams_a & grams_b) >= IDENTITY_SIMILARITY * len(grams_a | grams_b):
+            similar.append((a, b))
+    similar.extend((subset, found[0]) for subset, found in sorted(supersets.items()) if len(found) == 1)
+    for a, b in similar:
+        union(by_name[distinct[a]], by_name[distinct[b]], "similar name")
+
+    groups = np.array([find(i) for i in range(count)], dtype=np.int64)
+    for root in np.unique(groups):
+        rules[root] = None
+    return groups, rules
+
+def identity_report(names, emails, groups, rules, rows):
+    """
+    Describe the records merged by resolve_identities (same order and arguments, plus
+    the number of log rows of each record) as a DataFrame with one row per record of
+    every person seen under more than one record: "Participant" (the first name seen),
+    "Name", "Email", "Rows" and "Matched by".
+    """
+    groups = np.asarray(groups)
+    merged = np.flatnonzero(np.bincount(groups, minlength=len(groups))[groups] > 1)
+    merged = merged[np.lexsort((merged, groups[merged]))]
+    names = np.asarray(names, dtype=object)
+    return pd.DataFrame({
+        "Participant": names[groups[merged]],
+        "Name": names[merged],
+        "Email": np.asarray(emails, dtype=object)[merged],
+        "Rows": np.asarray(rows)[merged],
+        "Matched by": [rules[i] or "first seen" for i in merged]
+    })
+
+# ---------------------------
+# Stage Profiling
+# ---------------------------
+# JSON-lines file that stage timings are appended to when profiling is on (GUI and CLI).
+PROFILE_LOG = os.environ.get("ATTENDANCE_PROFILE_LOG") or None
+
+class StageProfile:
+    """
+    Records the wall time, peak RSS (see MemorySampler) and the rows, participants and
+    sessions handled by each pipeline stage. Stages are timed with
+        with profile.stage("read_log", file_path) as stage:
+            ...
+            stage.update(rows=n)
+    Entries are kept in entries and, if log_path is given, appended to that file as
+    JSON lines. Pass NO_PROFILE instead to turn profiling off at no cost.
+    """
+    enabled = True
+
+    def __init__(self, log_path=None):
+        self.log_path = log_path
+        self.run = datetime.now().isoformat(timespec="seconds")
+        self.entries = []
+        if log_path:
+            try:
+                open(log_path, "a", encoding="utf-8").close()
+            except OSError as e:
+                raise ValueError(f"Error opening profile log '{log_path}': {e}")
+
+    def stage(self, name, file_path=None, **counts):
+        return ProfiledStage(self, name, file_path, counts)
+
+    def add(self, stage, file_path, seconds, peak_mb=None, growth_mb=None, **counts):
+        """Record one stage measured elsewhere (e.g. by write_report)."""
+        entry = {"run": self.run, "file": file_path and os.path.basename(file_path), "stage": stage,
+                 "seconds": round(seconds, 6), **counts, "peak_rss_mb": peak_mb, "rss_growth_mb": growth_mb}
+        self.extend([entry])
+
+    def extend(self, entries):
+        """Record entries made by another StageProfile, e.g. in a worker process."""
+        self.entries.extend(entries)
+        if self.log_path and entries:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in entries)
+
+class ProfiledStage:
+    """One timed stage of a StageProfile; counts can be added with update() inside the block."""
+    def __init__(self, profile, name, file_path, counts):
+        self.profile = profile
+        self.name = name
+        self.file_path = file_path
+        self.counts = counts
+
+    def update(self, **counts):
+        self.counts.update(counts)
+
+    def __enter__(self):
+        self.memory = MemorySampler().__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        seconds = time.perf_counter() - self.started
+        self.memory.__exit__(exc_type, *exc_info)
+        if exc_type is None:
+            self.profile.add(self.name, self.file_path, seconds, self.memory.peak_mb, self.memory.growth_mb,
+                             **self.counts)
+        return False
+
+class NullProfile:
+    """The StageProfile used when profiling is off: stages are not timed or recorded."""
+    enabled = False
+    entries = ()
+
+    def stage(self, name, file_path=None, **counts):
+        return self
+
+    def update(self, **counts):
+        pass
+
+    def add(self, *args, **counts):
+        pass
+
+    def extend(self, entries):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NO_PROFILE = NullProfile()
+
+def format_stage_profile(entries):
+    """
+    Return a short summary of profile entries for the summary dialog: the total time of
+    each stage over all files, slowest first, and the highest peak RSS.
+    """
+    totals = {}
+    for entry in entries:
+        totals[entry["stage"]] = totals.get(entry["stage"], 0.0) + entry["seconds"]
+    if not totals:
+        return "Stage timings: none recorded"
+    stages = sorted(totals.items(), key=lambda item: -item[1])
+    line = "Stage timings: " + ", ".join(f"{stage} {seconds:.2f} s" for stage, seconds in stages)
+    peaks = [entry["peak_rss_mb"] for entry in entries if entry["peak_rss_mb"] is not None]
+    if peaks:
+        line += f"; peak RSS {max(peaks):.1f} MB"
+    return line
+
+# ---------------------------
+# Log Schema
+# ---------------------------
+# Spellings of the participant table's name and email columns, in order of preference.
+NAME_COLUMNS = ("Name", "Name (Original Name)")
+EMAIL_COLUMNS = ("Email", "User Email")
+TIME_COLUMNS = ("Join Time", "Leave Time")
+# Bytes at the start of a log searched for the participant table header (and the
+# rows sampled for the time format); lines scanned for the header within them.
+SNIFF_BYTES = 64 * 1024
+HEADER_SCAN_LINES = 20
+# Lines above the participant table in Zoom exports (meeting details and a blank
+# line); logs whose header is not found are read from below them.
+PREAMBLE_LINES = 3
+# Join/Leave Time formats tried on the sampled rows, in order: month-first before
+# day-first, as pandas infers them. Other formats are left to pandas' inference.
+TIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%m/%d/%Y %I:%M:%S %p", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %I:%M %p",
+                "%m/%d/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%Y-%m-%dT%H:%M:%S")
+TIME_SAMPLE_ROWS = 100
+
+class LogSchema:
+    """
+    Layout of a log's participant table found by sniff_schema: the byte offset of its
+    header line, the header's columns as written, the resolved Name/Email columns and
+    the Join/Leave Time format (None when pandas has to infer it).
+    """
+    def __init__(self, table_start, columns, time_format=None):
+        self.table_start = table_start
+        self.columns = columns
+        stripped = [column.strip() for column in columns]
+        self.name_col = next((c for c in NAME_COLUMNS if c in stripped), None)
+        self.email_col = next((c for c in EMAIL_COLUMNS if c in stripped), None)
+        self.time_format = time_format
+
+    def usecols(self):
+        """Return the columns read from the table (as written), or None to read all."""
+        needed = {self.name_col, self.email_col, "Duration", *TIME_COLUMNS}
+        columns = list(dict.fromkeys(column for column in self.columns if column.strip() in needed))
+        return columns or None
+
+    def dtypes(self):
+        """Return the read_csv dtypes: display names as categories (few distinct values)."""
+        return {column: "category" for column in self.columns
+                if self.name_col is not None and column.strip() == self.name_col}
+
+def detect_time_format(values):
+    """Return the first of TIME_FORMATS that parses every value, or None."""
+    values = [value for value in values if value]
+    if not values:
+        return None
+    for time_format in TIME_FORMATS:
+        try:
+            for value in values:
+                datetime.strptime(value, time_format)
+        except ValueError:
+            continue
+        return time_format
+    return None
+
+def sniff_schema(head):
+    """
+    Find the participant table in head, the first SNIFF_BYTES of a log (or all of it):
+    the first of HEADER_SCAN_LINES lines with Join Time and Leave Time columns, or the
+    line below Zoom's PREAMBLE_LINES when there is none. The Join/Leave Time format is
+    detected on up to TIME_SAMPLE_ROWS rows below the header. Returns a LogSchema.
+    """
+    lines = head.split(b"\n")
+    if len(head) >= SNIFF_BYTES:
+        # The last line may be cut off.
+        lines = lines[:-1]
+    offsets = list(itertools.accumulate((len(line) + 1 for line in lines), initial=0))
+    fields = [next(csv.reader([line.decode("utf-8-sig" if number == 0 else "utf-8", errors="replace")]), [])
+              for number, line in enumerate(lines[:HEADER_SCAN_LINES])]
+    header = next((number for number, row in enumerate(fields)
+                   if all(column in {field.strip() for field in row} for column in TIME_COLUMNS)), None)
+    if header is None:
+        header = min(PREAMBLE_LINES, len(lines))
+        if header < len(fields):
+            columns = fields[header]
+        elif header < len(lines):
+            columns = next(csv.reader([lines[header].decode("utf-8", errors="replace")]), [])
+        else:
+            columns = []
+        return LogSchema(min(offsets[header], len(head)), columns)
+    columns = fields[header]
+    stripped = [column.strip() for column in columns]
+    positions = [stripped.index(column) for column in TIME_COLUMNS]
+    samples = []
+    rows = csv.reader(line.decode("utf-8", errors="replace")
+                      for line in lines[header + 1:header + 1 + TIME_SAMPLE_ROWS] if line.strip())
+    for row in rows:
+        samples.extend(row[position] for position in positions if position < len(row))
+    return LogSchema(offsets[header], columns, detect_time_format(samples))
+
+def read_table(source, schema, chunksize=None):
+    """
+    Read the participant table from source (a bytes-like object or a file starting at
+    its header line) with only the columns in use: names as categories, everything
+    else as pandas infers it. Whole tables are read by pyarrow's multithreaded parser
+    when it is installed, which also converts ISO timestamps; chunked reads and
+    tables pyarrow rejects fall back to pandas' C parser. Column names are stripped.
+    """
+    options = {"usecols": schema.usecols(), "dtype": schema.dtypes()}
+    if chunksize is not None:
+        return pd.read_csv(source, chunksize=chunksize, **options)
+    df = None
+    if importlib.util.find_spec("pyarrow"):
+        try:
+            df = pd.read_csv(io.BytesIO(source), engine="pyarrow", **options)
+        except Exception:
+            df = None
+        # pyarrow types the categories of an all-empty name column as floats; pandas' parser as objects.
+        for column in options["dtype"] if df is not None else ():
+            if column in df.columns and not len(df[column].cat.categories):
+                df[column] = df[column].cat.set_categories(pd.Index([], dtype=object))
+    if df is None:
+        df = pd.read_csv(io.BytesIO(source), **options)
+    df.columns = df.columns.str.strip()
+    return df
+
+def parse_times(values, time_format=None):
+    """
+    Convert a Join/Leave Time column to datetimes: with the log's detected format when
+    every value matches it, otherwise by pandas' inference over the unique values.
+    Columns pyarrow already converted are brought to the resolution pandas parses to.
+    """
+    if pd.api.types.is_datetime64_dtype(values.dtype):
+        return values.astype(parsed_time_dtype())
+    if time_format is not None:
+        try:
+            return pd.to_datetime(values, format=time_format, cache=True)
+        except (ValueError, TypeError):
+            pass
+    return pd.to_datetime(values, cache=True)
+
+_parsed_time_dtype = None
+
+def parsed_time_dtype():
+    """Return the dtype pd.to_datetime gives for times in seconds (its resolution varies by version)."""
+    global _parsed_time_dtype
+    if _parsed_time_dtype is None:
+        _parsed_time_dtype = pd.to_datetime(pd.Series(["2000-01-01 00:00:00"])).dtype
+    return _parsed_time_dtype
+
+# ---------------------------
+# Parsed Log Cache
+# ---------------------------
+# Number of parsed logs kept in memory. Entries are keyed by path, size and mtime,
+# so an edited or re-exported file is always parsed again.
+PARSED_LOG_CACHE_SIZE = 8
+_parsed_logs = OrderedDict()
+# Guards _parsed_logs; the GUI loads logs for previews while a report job runs.
+_parsed_logs_lock = threading.Lock()
+# Number of session windows whose results are kept per parsed log.
+SESSION_CACHE_SIZE = 16
+
+class ParsedLog:
+    """
+    A Zoom log CSV read from disk once and shared by every session and report stage.
+    Holds the participant table found by sniff_schema, with only the columns in use
+    (see read_table), the resolved Name/Email columns and the lower-case name key.
+    Join/Leave Time are converted to datetimes on first use (see parse_times). The
+    file's bytes are not kept once the table is read; the raw log for "Sheet1" is read
+    from the file again when a report needs it (see read_raw_log).
+    Results of session windows, global times and total durations are kept, so
+    regenerating after editing only thresholds or some sessions recomputes just the
+    new windows. Every kept result is filled under the log's lock, as the GUI's
+    previews use them while a report job runs on another thread.
+    """
+    def __init__(self, file_path, content=None, df=None, schema=None):
+        """
+        Parse file_path (or its already read content). A participant table restored
+        from the LogCache can be passed as df; it already has converted times. A table
+        derived from another log (see resolved) is passed with that log's schema, so
+        the file is not read.
+        """
+        self.file_path = file_path
+        self._lock = threading.RLock()
+        try:
+            if content is None and (df is None or schema is None):
+                with open(file_path, "rb") as f:
+                    content = f.read()
+            self.schema = schema or sniff_schema(content[:SNIFF_BYTES])
+            if df is None:
+                df = read_table(memoryview(content)[self.schema.table_start:], self.schema)
+                parsed = True
+            else:
+                parsed = False
+        except Exception as e:
+            raise ValueError(f"Error reading file '{file_path}': {e}")
+        self.name_col = next((c for c in NAME_COLUMNS if c in df.columns), None)
+        self.email_col = next((c for c in EMAIL_COLUMNS if c in df.columns), None)
+        if parsed and self.name_col is not None:
+            df["Name_lower"] = df[self.name_col].str.lower()
+        if parsed and "Duration" in df.columns:
+            df["Duration"] = pd.to_numeric(df["Duration"], errors="coerce")
+        self.df = df
+        self._times_converted = not parsed
+        self._participants = None
+        self._merged = None
+        self._interval_index = None
+        self._session_codes = None
+        self._session_columns = OrderedDict()
+        self._global_times = None
+        self._total_durations = None
+        self._occupancy = None
+        self._resolved = None
+        # Set on logs returned by resolved(): the merged records (see identity_report).
+        self.identity_merges = None
+
+    def convert_times(self):
+        """Convert 'Join Time' and 'Leave Time' to datetimes (once) and return the table."""
+        with self._lock:
+            if not self._times_converted:
+                join_times = parse_times(self.df["Join Time"], self.schema.time_format)
+                leave_times = parse_times(self.df["Leave Time"], self.schema.time_format)
+                self.df["Join Time"] = join_times
+                self.df["Leave Time"] = leave_times
+                self._times_converted = True
+        return self.df
+
+    def participants(self):
+        """
+        Return (codes, keys, first_rows): an integer participant code for every row (-1 for
+        rows without a name), the sorted lower-case name keys the codes index into, and the
+        position of each participant's first row in the log.
+        """
+        with self._lock:
+            if self._participants is None:
+                codes, keys = pd.factorize(self.df["Name_lower"], sort=True)
+                named_rows = np.flatnonzero(codes >= 0)
+                _, first = np.unique(codes[named_rows], return_index=True)
+                self._participants = (codes, np.asarray(keys, dtype=object), named_rows[first])
+        return self._participants
+
+    def merged_intervals(self):
+        """
+        Return every participant's merged Join/Leave intervals as (codes, starts, ends)
+        arrays (see merge_intervals_by_key). Rows with a missing name or time are skipped.
+        """
+        with self._lock:
+            if self._merged is None:
+                df = self.convert_times()
+                codes = self.participants()[0]
+                valid = (codes >= 0) & df["Join Time"].notna().to_numpy() & df["Leave Time"].notna().to_numpy()
+                self._merged = merge_intervals_by_key(codes[valid],
+                                                      to_nanoseconds(df["Join Time"])[valid],
+                                                      to_nanoseconds(df["Leave Time"])[valid])
+        return self._merged
+
+    def interval_index(self):
+        """Return the IntervalIndex of the merged intervals, keyed by lower-case name."""
+        with self._lock:
+            if self._interval_index is None:
+                self._interval_index = IntervalIndex(*self.merged_intervals(), keys=self.participants()[1])
+        return self._interval_index
+
+    def session_columns(self, windows):
+        """
+        Evaluate the merged intervals against session windows given as (start, end) int64
+        nanosecond pairs, like session_matrix, and return (participant_codes, overlap_ns,
+        first_join, last_leave). Windows evaluated before are taken from the last
+        SESSION_CACHE_SIZE results; only new windows are computed. Thresholds are not
+        part of the result, so changing them needs no recomputation.
+        """
+        with self._lock:
+            missing = [window for window in dict.fromkeys(windows) if window not in self._session_columns]
+            if missing or self._session_codes is None:
+                merged_codes, merged_starts, merged_ends = self.merged_intervals()
+                codes, overlap_ns, first_join, last_leave = session_matrix(
+                    merged_codes, merged_starts, merged_ends,
+                    [start for start, _ in missing], [end for _, end in missing])
+                self._session_codes = codes
+                for column, window in enumerate(missing):
+                    self._session_columns[window] = (overlap_ns[:, column].copy(), first_join[:, column].copy(),
+                                                     last_leave[:, column].copy())
+            for window in windows:
+                self._session_columns.move_to_end(window)
+            columns = [self._session_columns[window] for window in windows]
+            while len(self._session_columns) > max(SESSION_CACHE_SIZE, len(windows)):
+                self._session_columns.popitem(last=False)
+            if not columns:
+                empty = np.zeros((len(self._session_codes), 0), dtype=np.int64)
+                return self._session_codes, empty, empty, empty
+            return (self._session_codes,) + tuple(np.column_stack(arrays) for arrays in zip(*columns))
+
+    def resolved(self):
+        """
+        Return a ParsedLog of the same file whose lower-case name key identifies people
+        rather than display names (see resolve_identities): every record of a person is
+        keyed by the name first seen in the log and rows missing an email get the
+        person's email. The participant table is shared and only these two columns are
+        replaced, so the log itself and its cached results are unchanged. A log without
+        name or time columns is returned as is, for the callers to report.
+        """
+        if self.name_col is None or not {"Join Time", "Leave Time"} <= set(self.df.columns):
+            return self
+        with self._lock:
+            if self._resolved is None:
+                try:
+                    df = self.convert_times()
+                except Exception as e:
+                    raise ValueError(f"Error converting join/leave times in '{self.file_path}': {e}")
+                codes, keys, first_rows = self.participants()
+                order = np.argsort(first_rows, kind="stable")
+                names = df[self.name_col].to_numpy()[first_rows[order]]
+                if self.email_col is not None:
+                    first_emails = df[self.email_col].groupby(codes).first().reindex(np.arange(len(keys)))
+                    emails = first_emails.to_numpy()[order]
+                else:
+                    emails = [None] * len(keys)
+                groups, rules = resolve_identities(names, emails)
+                canonical = np.empty(len(keys), dtype=np.int64)
+                canonical[order] = order[groups]
+                # Rows without a name (code -1) keep no key; index only the named ones.
+                named = codes >= 0
+                person = np.full(len(codes), -1, dtype=np.int64)
+                person[named] = canonical[codes[named]]
+                name_keys = np.full(len(codes), None, dtype=object)
+                name_keys[named] = keys[person[named]]
+                resolved_df = df.copy(deep=False)
+                resolved_df["Name_lower"] = pd.Series(name_keys, index=df.index, dtype=df["Name_lower"].dtype)
+                if self.email_col is not None:
+                    person_emails = df[self.email_col].groupby(person).transform("first")
+                    resolved_df[self.email_col] = df[self.email_col].fillna(person_emails.where(named))
+                resolved = ParsedLog(self.file_path, df=resolved_df, schema=self.schema)
+                rows = np.bincount(codes[named], minlength=len(keys))[order]
+                resolved.identity_merges = identity_report(names, emails, groups, rules, rows)
+                self._resolved = resolved
+        return self._resolved
+
+# ---------------------------
+# Persistent Log Cache
+# ---------------------------
+def default_cache_dir():
+    """Return the per-user cache directory for parsed logs."""
+    base = (os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "attendance-generator")
+
+# The on-disk cache is configured through the environment: ATTENDANCE_CACHE=0 turns
+# it off, ATTENDANCE_CACHE_DIR moves it and ATTENDANCE_CACHE_MAX_MB bounds its size.
+LOG_CACHE_ENABLED = os.environ.get("ATTENDANCE_CACHE", "1") != "0"
+LOG_CACHE_DIR = os.environ.get("ATTENDANCE_CACHE_DIR") or default_cache_dir()
+LOG_CACHE_MAX_BYTES = int(float(os.environ.get("ATTENDANCE_CACHE_MAX_MB", "512")) * 1e6)
+# Bumped whenever the cached participant table changes shape, so stale entries miss.
+LOG_CACHE_VERSION = "2"
+
+class LogCache:
+    """
+    On-disk cache of parsed participant tables (normalized columns, converted
+    timestamps, lower-case name key) keyed by a BLAKE2 hash of the file contents, so
+    an unchanged log loads without parsing, also from a new process. Tables are stored
+    as Feather when pyarrow is installed, otherwise as pickles; checkpoints of growing
+    logs (see ingest_log) are pickled under their own keys. Reading an entry marks
+    it as recently used; the least recently used entries are evicted once the cache
+    holds more than max_bytes.
+    """
+    extensions = (".feather", ".pkl")
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or LOG_CACHE_DIR
+        self.max_bytes = LOG_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+
+    @staticmethod
+    def digest(content):
+        """Return the cache key for the bytes of a log file."""
+        hasher = hashlib.blake2b(digest_size=20)
+        hasher.update(LOG_CACHE_VERSION.encode())
+        hasher.update(content)
+        return hasher.hexdigest()
+
+    def entries(self):
+        """Return [(path, size, mtime)] of the cached tables, least recently used first."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        entries = []
+        for name in names:
+            if name.endswith(self.extensions):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def load(self, digest):
+        """Return the cached table for digest, or None if it is not cached or unreadable."""
+        for extension in self.extensions:
+            path = os.path.join(self.directory, digest + extension)
+            if not os.path.exists(path):
+                continue
+            try:
+                df = pd.read_feather(path) if extension == ".feather" else pd.read_pickle(path)
+                os.utime(path)
+                return df
+            except Exception:
+                return None
+        return None
+
+    def store(self, digest, df):
+        """
+        Write a table, or another picklable object such as a LogCheckpoint, to the cache
+        (best effort) and evict old entries beyond max_bytes.
+        """
+        extension = ".feather" if isinstance(df, pd.DataFrame) and importlib.util.find_spec("pyarrow") else ".pkl"
+        path = os.path.join(self.directory, digest + extension)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if extension == ".feather":
+                df.to_feather(temp_path)
+            else:
+                pd.to_pickle(df, temp_path)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove every cached table; returns (entries removed, bytes freed)."""
+        removed = freed = 0
+        for path, size, _ in self.entries():
+            try:
+                os.remove(path)
+                removed += 1
+                freed += size
+            except OSError:
+                pass
+        return removed, freed
+
+def read_log(file_path):
+    """
+    Read file_path into a ParsedLog, restoring the participant table from the LogCache
+    when the file's contents were parsed before. Freshly parsed tables whose times
+    convert cleanly are added to the cache.
+    """
+    try:
+        with open(file_path, "rb") as f:
+            content = f.read()
+    except OSError as e:
+        raise ValueError(f"Error reading file '{file_path}': {e}")
+    if not LOG_CACHE_ENABLED:
+        return ParsedLog(file_path, content)
+    cache = LogCache()
+    digest = cache.digest(content)
+    df = cache.load(digest)
+    if df is not None:
+        if "Name_lower" in df.columns:
+            # Feather reads the name keys back as strings; a freshly parsed log keeps them as objects.
+            df["Name_lower"] = df["Name_lower"].astype(object)
+        return ParsedLog(file_path, content, df)
+    log = ParsedLog(file_path, content)
+    try:
+        log.convert_times()
+    except Exception:
+        # Leave the error to the stage that needs the times; such logs are not cached.
+        return log
+    cache.store(digest, log.df)
+    return log
+
+def load_log(file_path, merge_identities=False):
+    """
+    Return the ParsedLog for file_path, from memory when the file (path, size, mtime)
+    was loaded earlier in this process, otherwise via read_log. With merge_identities
+    the log keyed by person instead of display name is returned (see ParsedLog.resolved).
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError as e:
+        raise ValueError(f"Error reading file '{file_path}': {e}")
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    with _parsed_logs_lock:
+        log = _parsed_logs.get(key)
+        if log is not None:
+            _parsed_logs.move_to_end(key)
+    if log is None:
+        log = read_log(file_path)
+        with _parsed_logs_lock:
+            _parsed_logs[key] = log
+            while len(_parsed_logs) > PARSED_LOG_CACHE_SIZE:
+                _parsed_logs.popitem(last=False)
+    return log.resolved() if merge_identities else log
+
+def forget_log(file_path):
+    """Drop every parsed log of file_path (any size and mtime) from memory."""
+    path = os.path.abspath(file_path)
+    with _parsed_logs_lock:
+        for key in [key for key in _parsed_logs if key[0] == path]:
+            del _parsed_logs[key]
+
+def get_global_times(file_path):
+    """
+    Compute for each participant of the parsed log (see load_log) the overall (raw)
+    minimum Join Time and maximum Leave Time.
+    Returns a dict mapping lower-case name to (global_join, global_leave).
+    """
+    times = global_time_frame(file_path)
+    return dict(zip(times.index, zip(times["global_join"], times["global_leave"])))
+
+def global_time_frame(file_path, merge_identities=False):
+    """
+    Columnar get_global_times: a DataFrame indexed by lower-case name with datetime
+    columns "global_join" and "global_leave". It is kept with the parsed log and shared
+    between calls; do not modify it. merge_identities is passed to load_log.
+    """
+    log = load_log(file_path, merge_identities)
+    if log.name_col is None:
+        raise ValueError(f"CSV file '{file_path}' must contain a 'Name' or 'Name (Original Name)' column for global times.")
+    try:
+        df = log.convert_times()
+    except Exception as e:
+        raise ValueError(f"Error converting join/leave times in '{file_path}' for global times: {e}")
+    with log._lock:
+        if log._global_times is None:
+            grouped = df.groupby("Name_lower")
+            log._global_times = pd.DataFrame({"global_join": grouped["Join Time"].min(),
+                                              "global_leave": grouped["Leave Time"].max()})
+    return log._global_times
+
+def get_total_durations(file_path):
+    """
+    Return a dict mapping lower-case name to total duration (in minutes) by summing
+    the 'Duration' column of the parsed log.
+    This ensures that the 'Duration' in the generated Attendance sheet reflects the raw CSV totals.
+    """
+    return total_duration_series(file_path).to_dict()
+
+def total_duration_series(file_path, merge_identities=False):
+    """
+    Columnar get_total_durations: a Series of total minutes indexed by lower-case name.
+    Like global_time_frame, it is kept with the parsed log; do not modify it.
+    """
+    try:
+        log = load_log(file_path, merge_identities)
+        if log.name_col is None:
+            raise ValueError(f"CSV file '{file_path}' must contain a 'Name' or 'Name (Original Name)' column.")
+        if "Duration" not in log.df.columns:
+            raise ValueError(f"CSV file '{file_path}' must contain a 'Duration' column to compute total duration.")
+        with log._lock:
+            if log._total_durations is None:
+                log._total_durations = log.df.groupby("Name_lower")["Duration"].sum()
+        return log._total_durations
+    except Exception as e:
+        raise ValueError(f"Error computing total durations from '{file_path}': {e}")
+
+def process_csv_sessions(file_path, sessions, profile=NO_PROFILE, merge_identities=False):
+    """
+    Process one CSV file for several sessions in a single pass, using the parsed log
+    (see load_log, which merge_identities is passed to). sessions is a list of (session_start, session_end, time_required).
+    The time conversion, interval merge and session matrix stages are recorded in profile.
+    The participant table (see sniff_schema; below the meeting preamble in Zoom exports) must provide:
+      - Name: "Name (Original Name)" or "Name"
+      - Email: "User Email" or "Email"
+      - "Join Time" and "Leave Time"
+    Every participant's merged intervals are clipped to all session windows at once
+    (see session_matrix); windows evaluated before are reused (see
+    ParsedLog.session_columns). Returns a dict of participants x sessions arrays:
+      {
+         "keys": lower-case names (one per participant, sorted),
+         "Name": original name (first row of the participant),
+         "Email": email (first row of the participant),
+         "attended": True where the participant overlaps the session,
+         "session_min_join": earliest join from overlapping portion (int64 ns),
+         "raw_max_leave": maximum leave from overlapping portion (int64 ns),
+         "session_duration": total minutes attended in session,
+         "present": True where attended and duration >= time_required
+      }
+    """
+    log = load_log(file_path, merge_identities)
+    if log.name_col is None:
+        raise ValueError(f"CSV file '{file_path}' must contain a 'Name' or 'Name (Original Name)' column.")
+    if log.email_col is None:
+        raise ValueError(f"CSV file '{file_path}' must contain an 'Email' or 'User Email' column.")
+    for col in ["Join Time", "Leave Time"]:
+        if col not in log.df.columns:
+            raise ValueError(f"CSV file '{file_path}' must contain a '{col}' column.")
+    try:
+        with profile.stage("convert_times", file_path, rows=len(log.df)):
+            df = log.convert_times()
+    except Exception as e:
+        raise ValueError(f"Error converting join/leave times in '{file_path}': {e}")
+    with profile.stage("merge_intervals", file_path, rows=len(df)) as stage:
+        _, keys, first_rows = log.participants()
+        log.merged_intervals()
+        stage.update(participants=len(keys))
+    with profile.stage("session_matrix", file_path, participants=len(keys), sessions=len(sessions)):
+        codes, overlap_ns, first_joins, last_leaves = log.session_columns(
+            [(pd.Timestamp(start).value, pd.Timestamp(end).value) for start, end, _ in sessions])
+    durations = overlap_ns / 1e9 / 60
+    attended = overlap_ns > 0
+    time_required = np.array([required for _, _, required in sessions], dtype=float)
+    return {
+        "keys": keys[codes],
+        "Name": df[log.name_col].to_numpy()[first_rows[codes]],
+        "Email": df[log.email_col].to_numpy()[first_rows[codes]],
+        "attended": attended,
+        "session_min_join": first_joins,
+        "raw_max_leave": last_leaves,
+        "session_duration": durations,
+        "present": attended & (durations >= time_required[None, :])
+    }
+
+def process_csv_session(file_path, session_start, session_end, time_required):
+    """
+    Process one CSV file for a single session (see process_csv_sessions).
+    For each participant:
+      - Merges overlapping intervals.
+      - Considers only portions overlapping the session period.
+      - Computes session duration (from overlapping portions).
+      - Determines status ("P" if duration >= time_required, else "A").
+    Returns a dict mapping lower-case name to:
+      {
+         "Name": original name,
+         "Email": email,
+         "session_min_join": earliest join from overlapping portion,
+         "raw_max_leave": maximum leave from overlapping portion,
+         "session_duration": total minutes attended in session,
+         "status": "P" or "A"
+      }
+    """
+    matrix = process_csv_sessions(file_path, [(session_start, session_end, time_required)])
+    session_results = {}
+    for row in np.flatnonzero(matrix["attended"][:, 0]):
+        session_results[matrix["keys"][row]] = {
+            "Name": matrix["Name"][row],
+            "Email": matrix["Email"][row],
+            "session_min_join": pd.Timestamp(matrix["session_min_join"][row, 0]),
+            "raw_max_leave": pd.Timestamp(matrix["raw_max_leave"][row, 0]),
+            "session_duration": float(matrix["session_duration"][row, 0]),
+            "status": "P" if matrix["present"][row, 0] else "A"
+        }
+    return session_results
+
+# ---------------------------
+# Streaming Ingestion
+# ---------------------------
+# Rows read per chunk in streaming mode.
+STREAM_CHUNKSIZE = 200_000
+
+def fold_totals(totals, chunk, name_col, email_col):
+    """
+    Fold the named rows of a chunk into per-participant totals (None before the first
+    chunk): a DataFrame indexed by lower-case name with the first row's "Name" and
+    "Email", "global_join", "global_leave" and the summed "duration". Returns new totals.
+    """
+    first_rows = chunk.drop_duplicates("Name_lower").set_index("Name_lower")
+    grouped = chunk.groupby("Name_lower", sort=False)
+    chunk_totals = pd.DataFrame({
+        "Name": first_rows[name_col],
+        "Email": first_rows[email_col],
+        "global_join": grouped["Join Time"].min(),
+        "global_leave": grouped["Leave Time"].max(),
+        "duration": grouped["Duration"].sum()
+    })
+    if totals is None:
+        return chunk_totals
+    combined = pd.concat([totals, chunk_totals])
+    firsts = combined[~combined.index.duplicated()]
+    grouped = combined.groupby(level=0, sort=False)
+    return pd.DataFrame({
+        "Name": firsts["Name"],
+        "Email": firsts["Email"],
+        "global_join": grouped["global_join"].min(),
+        "global_leave": grouped["global_leave"].max(),
+        "duration": grouped["duration"].sum()
+    })
+
+def sorted_totals(totals):
+    """
+    Return totals of fold_totals (None before the first chunk) sorted by participant
+    key, and the new position of every row, which interval codes refer to.
+    """
+    if totals is None:
+        # Typed like folded totals, so an empty log still formats its times.
+        totals = pd.DataFrame({"Name": pd.Series(dtype=object), "Email": pd.Series(dtype=object),
+                               "global_join": pd.Series(dtype=parsed_time_dtype()),
+                               "global_leave": pd.Series(dtype=parsed_time_dtype()),
+                               "duration": pd.Series(dtype=float)}, index=pd.Index([], dtype=object))
+    order = np.argsort(totals.index.to_numpy(dtype=object), kind="stable")
+    position = np.empty(len(order), dtype=np.int64)
+    position[order] = np.arange(len(order))
+    return totals.iloc[order], position
+
+def session_results(totals, rows, overlap_ns, first_joins, last_leaves, sessions):
+    """
+    Build (matrix, global_times, raw_durations), shaped like process_csv_sessions,
+    global_time_frame and total_duration_series, from sorted totals (see sorted_totals)
+    and participants x sessions arrays like those of session_matrix, whose participant
+    rows are the totals rows `rows`. sessions is a list of (session_start, session_end,
+    time_required).
+    """
+    durations = overlap_ns / 1e9 / 60
+    attended = overlap_ns > 0
+    time_required = np.array([required for _, _, required in sessions], dtype=float)
+    matrix = {
+        "keys": totals.index.to_numpy(dtype=object)[rows],
+        "Name": totals["Name"].to_numpy()[rows],
+        "Email": totals["Email"].to_numpy()[rows],
+        "attended": attended,
+        "session_min_join": first_joins,
+        "raw_max_leave": last_leaves,
+        "session_duration": durations,
+        "present": attended & (durations >= time_required[None, :])
+    }
+    return matrix, totals[["global_join", "global_leave"]], totals["duration"]
+
+class StreamAccumulator:
+    """
+    Per-participant attendance state built from a log read in chunks, so memory grows
+    with the number of distinct participants rather than the number of rows.
+    Keeps, per lower-case name, the first row's Name/Email, the global join/leave
+    and the summed 'Duration', plus every participant's intervals clipped to each
+    session window and merged as they arrive. Produces the same results as
+    process_csv_sessions, get_global_times and get_total_durations.
+    """
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.window_starts = np.array([pd.Timestamp(start).value for start, _, _ in sessions], dtype=np.int64)
+        self.window_ends = np.array([pd.Timestamp(end).value for _, end, _ in sessions], dtype=np.int64)
+        self.totals = None
+        self.interval_codes = np.empty(0, dtype=np.int64)
+        self.interval_starts = np.empty(0, dtype=np.int64)
+        self.interval_ends = np.empty(0, dtype=np.int64)
+
+    def update(self, chunk, name_col, email_col):
+        """Fold one chunk of the participant table (times already converted) into the state."""
+        chunk = chunk[chunk["Name_lower"].notna()]
+        self.totals = fold_totals(self.totals, chunk, name_col, email_col)
+        valid = chunk["Join Time"].notna() & chunk["Leave Time"].notna()
+        ids = self.totals.index.get_indexer(chunk.loc[valid, "Name_lower"])
+        starts = to_nanoseconds(chunk.loc[valid, "Join Time"])
+        ends = to_nanoseconds(chunk.loc[valid, "Leave Time"])
+        # Clip every row to every session; merging clipped intervals gives the same
+        # union as clipping merged ones. Codes combine participant id and session.
+        clipped_starts = np.maximum(starts[:, None], self.window_starts[None, :])
+        clipped_ends = np.minimum(ends[:, None], self.window_ends[None, :])
+        rows, sessions = np.nonzero(clipped_starts < clipped_ends)
+        self.interval_codes, self.interval_starts, self.interval_ends = merge_intervals_by_key(
+            np.concatenate([self.interval_codes, ids[rows] * len(self.sessions) + sessions]),
+            np.concatenate([self.interval_starts, clipped_starts[rows, sessions]]),
+            np.concatenate([self.interval_ends, clipped_ends[rows, sessions]]))
+
+    def results(self):
+        """
+        Return (matrix, global_times, raw_durations) shaped like process_csv_sessions,
+        get_global_times and get_total_durations.
+        """
+        n_sessions = len(self.sessions)
+        totals, position = sorted_totals(self.totals)
+        overlap_ns = np.zeros((len(totals), n_sessions), dtype=np.int64)
+        first_joins = np.zeros((len(totals), n_sessions), dtype=np.int64)
+        last_leaves = np.zeros((len(totals), n_sessions), dtype=np.int64)
+        codes = self.interval_codes
+        if len(codes):
+            group_starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+            rows = position[codes[group_starts] // n_sessions]
+            columns = codes[group_starts] % n_sessions
+            overlap_ns[rows, columns] = np.add.reduceat(self.interval_ends - self.interval_starts, group_starts)
+            first_joins[rows, columns] = self.interval_starts[group_starts]
+            last_leaves[rows, columns] = np.maximum.reduceat(self.interval_ends, group_starts)
+        return session_results(totals, np.arange(len(totals)), overlap_ns, first_joins, last_leaves, self.sessions)
+
+def stream_columns(columns, file_path):
+    """
+    Validate the (stripped) columns of a log read in chunks as process_csv_sessions and
+    get_total_durations do. Returns (name_col, email_col).
+    """
+    name_col = next((c for c in NAME_COLUMNS if c in columns), None)
+    email_col = next((c for c in EMAIL_COLUMNS if c in columns), None)
+    if name_col is None:
+        raise ValueError(f"CSV file '{file_path}' must contain a 'Name' or 'Name (Original Name)' column.")
+    if email_col is None:
+        raise ValueError(f"CSV file '{file_path}' must contain an 'Email' or 'User Email' column.")
+    for col in ["Join Time", "Leave Time"]:
+        if col not in columns:
+            raise ValueError(f"CSV file '{file_path}' must contain a '{col}' column.")
+    if "Duration" not in columns:
+        raise ValueError(f"Error computing total durations from '{file_path}': CSV file '{file_path}' "
+                         "must contain a 'Duration' column to compute total duration.")
+    return name_col, email_col
+
+def prepare_chunk(chunk, name_col, file_path, time_format=None):
+    """
+    Strip the column names of a chunk, convert its times (see parse_times) and Duration
+    and add the name key.
+    """
+    chunk.columns = chunk.columns.str.strip()
+    try:
+        chunk["Join Time"] = parse_times(chunk["Join Time"], time_format)
+        chunk["Leave Time"] = parse_times(chunk["Leave Time"], time_format)
+    except Exception as e:
+        raise ValueError(f"Error converting join/leave times in '{file_path}': {e}")
+    chunk["Duration"] = pd.to_numeric(chunk["Duration"], errors="coerce")
+    chunk["Name_lower"] = chunk[name_col].str.lower()
+    return chunk
+
+def stream_log(file_path, sessions, chunksize=STREAM_CHUNKSIZE, progress=no_progress):
+    """
+    Read a log in chunks of chunksize rows into a StreamAccumulator for sessions
+    (a list of (session_start, session_end, time_required)), validating columns with
+    stream_columns. Returns the accumulator.
+    """
+    accumulator = StreamAccumulator(sessions)
+    try:
+        f = open(file_path, "rb")
+    except OSError as e:
+        raise ValueError(f"Error reading file '{file_path}': {e}")
+    with f:
+        try:
+            schema = sniff_schema(f.read(SNIFF_BYTES))
+            f.seek(schema.table_start)
+            chunks = iter(read_table(f, schema, chunksize))
+            first = next(chunks, None)
+        except Exception as e:
+            raise ValueError(f"Error reading file '{file_path}': {e}")
+        if first is None:
+            return accumulator
+        name_col, email_col = stream_columns(first.columns.str.strip(), file_path)
+        chunk = first
+        rows_read = 0
+        while chunk is not None:
+            rows_read += len(chunk)
+            progress(f"Streaming rows ({rows_read:,} read)", 0, 1)
+            accumulator.update(prepare_chunk(chunk, name_col, file_path, schema.time_format), name_col, email_col)
+            try:
+                chunk = next(chunks, None)
+            except Exception as e:
+                raise ValueError(f"Error reading file '{file_path}': {e}")
+    return accumulator
+
+# ---------------------------
+# Incremental Ingestion
+# ---------------------------
+# Checkpoints of growing logs kept in this process, by absolute path (see ingest_log).
+_checkpoints = OrderedDict()
+_checkpoints_lock = threading.Lock()
+
+class LogCheckpoint:
+    """
+    State of a growing log (re-exported during a meeting, each export a superset of the
+    last) after its participant table was read up to `consumed` bytes: the per-
+    participant totals of fold_totals and every participant's merged Join/Leave
+    intervals, unclipped so that any sessions can be evaluated. `digest` is the BLAKE2
+    hash of the table bytes read, so a later export is known to extend this one.
+    """
+    def __init__(self, file_path):
+        self.file_path = os.path.abspath(file_path)
+        self.version = LOG_CACHE_VERSION
+        self.header = b""
+        self.consumed = 0
+        self.digest = None
+        self.rows = 0
+        self.name_col = None
+        self.email_col = None
+        self.totals = None
+        self.interval_codes = np.empty(0, dtype=np.int64)
+        self.interval_starts = np.empty(0, dtype=np.int64)
+        self.interval_ends = np.empty(0, dtype=np.int64)
+
+    def update(self, chunk):
+        """Fold one prepared chunk (see prepare_chunk) into the totals and merged intervals."""
+        chunk = chunk[chunk["Name_lower"].notna()]
+        self.totals = fold_totals(self.totals, chunk, self.name_col, self.email_col)
+        valid = chunk["Join Time"].notna() & chunk["Leave Time"].notna()
+        ids = self.totals.index.get_indexer(chunk.loc[valid, "Name_lower"])
+        self.interval_codes, self.interval_starts, self.interval_ends = merge_intervals_by_key(
+            np.concatenate([self.interval_codes, ids]),
+            np.concatenate([self.interval_starts, to_nanoseconds(chunk.loc[valid, "Join Time"])]),
+            np.concatenate([self.interval_ends, to_nanoseconds(chunk.loc[valid, "Leave Time"])]))
+
+    def results(self, sessions):
+        """
+        Evaluate sessions (a list of (session_start, session_end, time_required)) on the
+        merged intervals (see session_matrix). Returns (matrix, global_times,
+        raw_durations) shaped like process_csv_sessions, global_time_frame and
+        total_duration_series.
+        """
+        totals, position = sorted_totals(self.totals)
+        codes = position[self.interval_codes]
+        resorted = np.lexsort((self.interval_starts, codes))
+        codes, overlap_ns, first_joins, last_leaves = session_matrix(
+            codes[resorted], self.interval_starts[resorted], self.interval_ends[resorted],
+            np.array([pd.Timestamp(start).value for start, _, _ in sessions], dtype=np.int64),
+            np.array([pd.Timestamp(end).value for _, end, _ in sessions], dtype=np.int64))
+        return session_results(totals, codes, overlap_ns, first_joins, last_leaves, sessions)
+
+def checkpoint_key(file_path):
+    """Return the LogCache key of the checkpoint of file_path (by absolute path)."""
+    return "checkpoint-" + hashlib.blake2b(os.path.abspath(file_path).encode(), digest_size=20).hexdigest()
+
+def load_checkpoint(file_path):
+    """Return the last LogCheckpoint of file_path from memory or the LogCache, or None."""
+    path = os.path.abspath(file_path)
+    with _checkpoints_lock:
+        checkpoint = _checkpoints.get(path)
+    if checkpoint is None and LOG_CACHE_ENABLED:
+        checkpoint = LogCache().load(checkpoint_key(file_path))
+    if not isinstance(checkpoint, LogCheckpoint) or checkpoint.version != LOG_CACHE_VERSION:
+        return None
+    return checkpoint
+
+def store_checkpoint(checkpoint):
+    """Keep a LogCheckpoint in memory and, when the cache is enabled, in the LogCache."""
+    with _checkpoints_lock:
+        _checkpoints[checkpoint.file_path] = checkpoint
+        _checkpoints.move_to_end(checkpoint.file_path)
+        while len(_checkpoints) > PARSED_LOG_CACHE_SIZE:
+            _checkpoints.popitem(last=False)
+    if LOG_CACHE_ENABLED:
+        LogCache().store(checkpoint_key(checkpoint.file_path), checkpoint)
+
+def ingest_log(file_path, chunksize=STREAM_CHUNKSIZE, progress=no_progress):
+    """
+    Bring the checkpoint of a growing log up to date and return (checkpoint, new_rows).
+    When the participant table starts with the bytes read last time (same header and
+    hash), only the rows appended since are parsed, in chunks of chunksize rows, and
+    folded into a copy of the checkpoint; otherwise the table is read from the start.
+    The table is found by sniff_schema; the meeting preamble above it may change
+    between exports. Parsing time is proportional to the new rows; the file is only
+    read and hashed as a whole.
+    """
+    try:
+        with open(file_path, "rb") as f:
+            content = f.read()
+    except OSError as e:
+        raise ValueError(f"Error reading file '{file_path}': {e}")
+    schema = sniff_schema(content[:SNIFF_BYTES])
+    table_start = schema.table_start
+    table = memoryview(content)[table_start:]
+    header_end = content.find(b"\n", table_start)
+    header = bytes(table) if header_end < 0 else content[table_start:header_end + 1]
+    previous = load_checkpoint(file_path)
+    hasher = hashlib.blake2b(digest_size=20)
+    if previous is not None and previous.header == header and previous.consumed <= len(table):
+        hasher.update(table[:previous.consumed])
+        if hasher.copy().hexdigest() != previous.digest:
+            previous = None
+    else:
+        previous = None
+    if previous is None:
+        hasher = hashlib.blake2b(digest_size=20)
+        checkpoint = LogCheckpoint(file_path)
+        checkpoint.header = header
+        new_bytes = table[len(header):]
+    else:
+        checkpoint = copy.copy(previous)
+        new_bytes = table[previous.consumed:]
+    hasher.update(table[checkpoint.consumed:])
+    new_rows = 0
+    if len(header.strip()):
+        try:
+            chunks = iter(read_table(io.BytesIO(header + bytes(new_bytes)), schema, chunksize))
+            chunk = next(chunks, None)
+        except Exception as e:
+            raise ValueError(f"Error reading file '{file_path}': {e}")
+        if chunk is not None and checkpoint.name_col is None:
+            checkpoint.name_col, checkpoint.email_col = stream_columns(chunk.columns.str.strip(), file_path)
+        while chunk is not None:
+            new_rows += len(chunk)
+            progress(f"Reading new rows ({new_rows:,} read)", 0, 1)
+            if len(chunk):
+                checkpoint.update(prepare_chunk(chunk, checkpoint.name_col, file_path, schema.time_format))
+            try:
+                chunk = next(chunks, None)
+            except Exception as e:
+                raise ValueError(f"Error reading file '{file_path}': {e}")
+    checkpoint.consumed = len(table)
+    checkpoint.digest = hasher.hexdigest()
+    checkpoint.rows += new_rows
+    store_checkpoint(checkpoint)
+    return checkpoint, new_rows
+
+# ---------------------------
+# Attendance Report
+# ---------------------------
+def build_attendance(file_path, sessions_info, progress=no_progress, chunksize=None, profile=NO_PROFILE,
+                     merge_identities=False, incremental=False, timeline_resolution=None):
+    """
+    Build the attendance of one CSV file from all of its sessions at once.
+    sessions_info is a list of dicts with "session_start", "session_end" and
+    "time_required". Participants who attended at least one session are listed in the
+    order they first appear across sessions; "Duration" is the raw CSV total.
+    With chunksize the log is streamed (see stream_log) instead of parsed whole; with
+    incremental only rows appended since the last run are read (see ingest_log).
+    With merge_identities participants are people rather than display names (see
+    resolve_identities) and the merged records are kept in the result's identity_merges.
+    With timeline_resolution the result's timeline holds the number of participants
+    present every timeline_resolution (see timeline_frame; not with streaming).
+    progress(stage, done, total) is called before each stage and may raise
+    GenerationCancelled to stop. Each stage is timed in profile (see StageProfile).
+    Returns an AttendanceResult; its summary() holds one "Session i: Present: x,
+    Absent: y" line per session and to_frame() is the Attendance sheet.
+    """
+    if timeline_resolution is not None:
+        timeline_step(timeline_resolution)
+        if chunksize and not incremental:
+            raise ValueError("The occupancy timeline needs every participant's intervals; turn off low memory "
+                             "(streaming).")
+    matrix, global_times, raw_durations = attendance_matrix(file_path, sessions_info, progress, chunksize, profile,
+                                                            merge_identities, incremental)
+    progress("Building Attendance sheet", 3, 4)
+    with profile.stage("attendance_result", file_path, participants=len(matrix["keys"]),
+                       sessions=len(sessions_info)):
+        result = AttendanceResult.from_matrix(matrix, global_times, raw_durations, sessions_info)
+    if merge_identities:
+        result.identity_merges = load_log(file_path, merge_identities).identity_merges
+    if timeline_resolution is not None:
+        with profile.stage("occupancy_timeline", file_path) as stage:
+            result.timeline = timeline_frame(file_path, timeline_resolution, chunksize, merge_identities,
+                                             incremental)
+            stage.update(rows=len(result.timeline))
+    return result
+
+def attendance_matrix(file_path, sessions_info, progress=no_progress, chunksize=None, profile=NO_PROFILE,
+                      merge_identities=False, incremental=False):
+    """
+    Compute the session matrix (see process_csv_sessions), global times and raw
+    durations of one CSV file, parsed whole, streamed with chunksize or, with
+    incremental, brought up to date from its last checkpoint (see ingest_log). Progress
+    events and profile stages are those of build_attendance up to building the sheet.
+    Identities are resolved over the whole log, so merge_identities cannot be combined
+    with streaming or incremental reading. Returns (matrix, global_times, raw_durations).
+    """
+    sessions = [(s["session_start"], s["session_end"], s["time_required"]) for s in sessions_info]
+    if (chunksize or incremental) and merge_identities:
+        raise ValueError("Merging participant identities needs the whole log; turn off low memory (streaming) "
+                         "and incremental mode.")
+    if incremental:
+        def ingest_progress(stage, done, total):
+            progress(stage, 0, 4)
+        with profile.stage("ingest_log", file_path) as stage:
+            checkpoint, new_rows = ingest_log(file_path, chunksize or STREAM_CHUNKSIZE, ingest_progress)
+            stage.update(rows=new_rows)
+        progress(f"Evaluating sessions 1-{len(sessions_info)} of {len(sessions_info)}", 1, 4)
+        with profile.stage("session_matrix", file_path, sessions=len(sessions)) as stage:
+            matrix, global_times, raw_durations = checkpoint.results(sessions)
+            stage.update(participants=len(global_times))
+    elif chunksize:
+        def stream_progress(stage, done, total):
+            progress(stage, 0, 4)
+        with profile.stage("stream_log", file_path, sessions=len(sessions)) as stage:
+            matrix, global_times, raw_durations = stream_log(file_path, sessions, chunksize, stream_progress).results()
+            stage.update(participants=len(matrix["keys"]))
+    else:
+        progress("Reading log", 0, 4)
+        with profile.stage("read_log", file_path) as stage:
+            stage.update(rows=len(load_log(file_path).df))
+        if merge_identities:
+            with profile.stage("resolve_identities", file_path) as stage:
+                stage.update(merged=len(load_log(file_path, merge_identities).identity_merges))
+        progress(f"Evaluating sessions 1-{len(sessions_info)} of {len(sessions_info)}", 1, 4)
+        matrix = process_csv_sessions(file_path, sessions, profile, merge_identities)
+        progress("Computing global times and durations", 2, 4)
+        with profile.stage("global_times", file_path) as stage:
+            global_times = global_time_frame(file_path, merge_identities)
+            stage.update(participants=len(global_times))
+        with profile.stage("total_durations", file_path) as stage:
+            raw_durations = total_duration_series(file_path, merge_identities)
+            stage.update(participants=len(raw_durations))
+    return matrix, global_times, raw_durations
+
+def session_column_labels(sessions_info):
+    """Return the "Session i (YYYY-MM-DD HH:MM:SS)" column label of every session."""
+    return [f"Session {i} ({s['session_start'].strftime('%Y-%m-%d %H:%M:%S')})"
+            for i, s in enumerate(sessions_info, start=1)]
+
+class AttendanceResult:
+    """
+    Attendance of one log in columnar form: one row per participant who attended any
+    session, in report order, with
+      keys            lower-case names (a CategoricalIndex over the matrix keys)
+      names, emails   as shown in the report
+      join, leave     datetime64 arrays of the raw first join and last leave
+      durations       float (or int) array of the raw CSV totals in minutes
+      session_minutes float participants x sessions array of attended minutes
+      status          int8 participants x sessions array, 1 present and 0 absent
+    The summary, the Attendance sheet and the register are derived from these arrays.
+    identity_merges holds the merged records (see identity_report) when identities
+    were resolved, and timeline the occupancy timeline (see occupancy_timeline) when
+    one was requested; both are None otherwise.
+    """
+    def __init__(self, keys, names, emails, join, leave, durations, session_minutes, status, session_labels):
+        self.keys = keys
+        self.names = names
+        self.emails = emails
+        self.join = join
+        self.leave = leave
+        self.durations = durations
+        self.session_minutes = session_minutes
+        self.status = status
+        self.session_labels = session_labels
+        self.identity_merges = None
+        self.timeline = None
+
+    @classmethod
+    def from_matrix(cls, matrix, global_times, raw_durations, sessions_info):
+        """
+        Select and order the attendees of a session matrix (see process_csv_sessions)
+        and attach the global times (see global_time_frame) and raw durations (see
+        total_duration_series) of its log. Participants without a raw total get the
+        sum of their session minutes.
+        """
+        attended = matrix["attended"]
+        rows = np.flatnonzero(attended.any(axis=1))
+        rows = rows[np.lexsort((rows, attended[rows].argmax(axis=1)))]
+        keys = pd.CategoricalIndex(pd.Categorical.from_codes(rows, categories=pd.Index(matrix["keys"])),
+                                   name="key")
+        key_values = matrix["keys"][rows]
+        times = global_times.reindex(key_values)
+        session_minutes = matrix["session_duration"][rows]
+        durations = raw_durations.reindex(key_values)
+        if durations.isna().any():
+            durations = durations.fillna(pd.Series(session_minutes.sum(axis=1), index=durations.index))
+        return cls(keys, matrix["Name"][rows], matrix["Email"][rows],
+                   times["global_join"].to_numpy(), times["global_leave"].to_numpy(),
+                   np.round(durations.to_numpy(), 2), session_minutes,
+                   matrix["present"][rows].astype(np.int8), session_column_labels(sessions_info))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def present_counts(self):
+        """Return the number of participants present in each session."""
+        return self.status.sum(axis=0, dtype=np.int64)
+
+    def summary(self):
+        """
+        Return one "Session i: Present: x, Absent: y" line per session, followed by
+        the number of merged records when identities were resolved.
+        """
+        lines = [f"Session {i}: Present: {present}, Absent: {len(self) - present}"
+                 for i, present in enumerate(self.present_counts(), start=1)]
+        if self.identity_merges is not None:
+            merges = self.identity_merges
+            people = merges["Participant"].nunique()
+            lines.append(f"Identities: {len(merges) - people} names merged into {people} participants"
+                         if people else "Identities: no names merged")
+        return lines
+
+    def to_frame(self):
+        """Return the Attendance sheet: Name, Email, Join/Leave Time, P/A per session and Duration."""
+        columns = {
+            "Name": self.names,
+            "Email": self.emails,
+            "Join Time": pd.Series(self.join).dt.strftime('%Y-%m-%d %H:%M:%S').to_numpy(),
+            "Leave Time": pd.Series(self.leave).dt.strftime('%Y-%m-%d %H:%M:%S').to_numpy(),
+        }
+        statuses = np.where(self.status == 1, "P", "A").astype(object)
+        columns.update(zip(self.session_labels, statuses.T))
+        columns["Duration"] = self.durations
+        return pd.DataFrame(columns)
+
+# ---------------------------
+# Threshold Preview
+# ---------------------------
+class ThresholdPreview:
+    """
+    Live present/absent counts of one log's sessions while sessions are being edited.
+    set_windows evaluates the session windows once and keeps every session's attended
+    minutes sorted, so counts(session, required) for a new "Time Required" is a single
+    binary search. As in the report, absent participants are those who attended any of
+    the sessions but not this one for the required time.
+    The parsed log fills its shared results under a lock (see ParsedLog) and the preview
+    keeps its own counts, so a preview can be updated while a report is generated on
+    another thread. merge_identities counts people as the report does with the same
+    option (see resolve_identities).
+    """
+    def __init__(self, file_path, merge_identities=False):
+        self.log = load_log(file_path, merge_identities)
+        if self.log.name_col is None:
+            raise ValueError(f"CSV file '{file_path}' must contain a 'Name' or 'Name (Original Name)' column.")
+        for col in ["Join Time", "Leave Time"]:
+            if col not in self.log.df.columns:
+                raise ValueError(f"CSV file '{file_path}' must contain a '{col}' column.")
+        try:
+            self.log.convert_times()
+        except Exception as e:
+            raise ValueError(f"Error converting join/leave times in '{file_path}': {e}")
+        self.merged = self.log.merged_intervals()
+        self.windows = []
+        self.sorted_minutes = []
+        self.attendees = 0
+
+    def set_windows(self, windows):
+        """Evaluate a list of (session_start, session_end) windows unless they are unchanged."""
+        windows = [window_nanoseconds(window) for window in windows]
+        if windows == self.windows:
+            return
+        _, overlap_ns, _, _ = session_matrix(*self.merged, [start for start, _ in windows],
+                                             [end for _, end in windows])
+        attended = overlap_ns > 0
+        durations = overlap_ns / 1e9 / 60
+        self.windows = windows
+        self.sorted_minutes = [np.sort(durations[attended[:, column], column]) for column in range(len(windows))]
+        self.attendees = int(attended.any(axis=1).sum())
+
+    def counts(self, session, required):
+        """Return (present, absent) of session (an index into the windows) for required minutes."""
+        minutes = self.sorted_minutes[session]
+        present = len(minutes) - int(np.searchsorted(minutes, required, side="left"))
+        return present, self.attendees - present
+
+# ---------------------------
+# Occupancy Timeline
+# ---------------------------
+# Default step of the "Timeline" sheet (a pandas Timedelta string such as 30s or 5min).
+TIMELINE_RESOLUTION = "1min"
+# Longest timeline written; a finer resolution than any meeting needs is refused.
+TIMELINE_MAX_ROWS = 1_000_000
+# Session windows proposed by suggest_sessions: occupancy stays at or above this
+# fraction of the log's peak for at least SESSION_MIN_MINUTES, and dips shorter than
+# SESSION_GAP_MINUTES (people reconnecting, a short pause) do not split a session.
+SESSION_OCCUPANCY_FRACTION = 0.5
+SESSION_MIN_MINUTES = 10
+SESSION_GAP_MINUTES = 5
+
+def occupancy_curve(starts, ends):
+    """
+    Sweep the Join/Leave events of [start, end) intervals (int64 nanoseconds) and return
+    (times, counts): the distinct event times in order and the number of intervals open
+    from each time until the next. Sorting the events dominates, so this is O(n log n).
+    """
+    starts = np.sort(starts)
+    ends = np.sort(ends)
+    times = np.unique(np.concatenate([starts, ends]))
+    counts = np.searchsorted(starts, times, side="right") - np.searchsorted(ends, times, side="right")
+    return times, counts
+
+def timeline_step(resolution):
+    """Return a timeline resolution ("1min", "30s", a Timedelta...) as a positive Timedelta."""
+    try:
+        step = pd.Timedelta(resolution)
+    except (TypeError, ValueError):
+        step = None
+    if step is None or pd.isna(step) or step <= pd.Timedelta(0):
+        raise ValueError(f"Invalid timeline resolution '{resolution}'. Use a duration such as 30s, 1min or 5min.")
+    return step
+
+def occupancy_timeline(times, counts, resolution=TIMELINE_RESOLUTION):
+    """
+    Sample an occupancy curve (see occupancy_curve) every resolution, from its first
+    event (floored to the resolution) to its last. Returns the "Timeline" sheet: a
+    DataFrame with the "Time" each step starts (formatted like the Attendance sheet's
+    times), the "Participants" present then and the "Peak" present at once during the
+    step.
+    """
+    step = timeline_step(resolution).value
+    if not len(times):
+        return pd.DataFrame({"Time": pd.Series(dtype=object), "Participants": pd.Series(dtype=np.int64),
+                             "Peak": pd.Series(dtype=np.int64)})
+    first = times[0] - times[0] % step
+    rows = max(-(-(times[-1] - first) // step), 1)
+    if rows > TIMELINE_MAX_ROWS:
+        raise ValueError(f"A timeline every {pd.Timedelta(step)} would have {rows:,} rows; "
+                         "choose a coarser resolution.")
+    grid = first + step * np.arange(rows, dtype=np.int64)
+    at = np.searchsorted(times, grid, side="right") - 1
+    present = np.where(at >= 0, counts[at], 0)
+    # Most present at once: the step's first count or any count it changes to.
+    peak = present.copy()
+    buckets = (times - first) // step
+    segments = np.flatnonzero(np.diff(buckets, prepend=-1))
+    segments = segments[buckets[segments] < rows]
+    if len(segments):
+        segment_peaks = np.maximum.reduceat(counts, segments)
+        targets = buckets[segments]
+        peak[targets] = np.maximum(peak[targets], segment_peaks)
+    return pd.DataFrame({"Time": pd.Series(pd.to_datetime(grid)).dt.strftime('%Y-%m-%d %H:%M:%S').to_numpy(),
+                         "Participants": present, "Peak": peak})
+
+def detect_sessions(times, counts, fraction=SESSION_OCCUPANCY_FRACTION, min_minutes=SESSION_MIN_MINUTES,
+                    gap_minutes=SESSION_GAP_MINUTES):
+    """
+    Find the stretches of an occupancy curve (see occupancy_curve) at or above fraction
+    of its peak, join stretches less than gap_minutes apart and keep those lasting at
+    least min_minutes. Returns [(start, end)] in int64 nanoseconds.
+    """
+    if not 0 < fraction <= 1:
+        raise ValueError(f"The occupancy fraction must be in (0, 1], not {fraction}.")
+    if not len(times) or counts.max() <= 0:
+        return []
+    above = counts >= fraction * counts.max()
+    edges = np.diff(above.astype(np.int8), prepend=0, append=0)
+    # The last count is 0 (every interval has ended), so every stretch has an end time.
+    run_starts = times[np.flatnonzero(edges == 1)]
+    run_ends = times[np.flatnonzero(edges == -1)]
+    new_session = np.concatenate([[True], run_starts[1:] - run_ends[:-1] >= gap_minutes * 60e9])
+    first_runs = np.flatnonzero(new_session)
+    last_runs = np.append(first_runs[1:] - 1, len(run_ends) - 1)
+    starts, ends = run_starts[first_runs], run_ends[last_runs]
+    long_enough = ends - starts >= min_minutes * 60e9
+    return list(zip(starts[long_enough].tolist(), ends[long_enough].tolist()))
+
+def log_occupancy(file_path, chunksize=None, merge_identities=False, incremental=False):
+    """
+    Return the occupancy curve (see occupancy_curve) of file_path: the number of
+    participants present over time, from their merged intervals (see
+    merged_interval_arrays), so overlapping records of one participant count once.
+    The curve of a parsed log is kept with it. Streaming keeps only intervals clipped
+    to the sessions, so it cannot be combined with a timeline.
+    """
+    if incremental:
+        intervals = merged_interval_arrays(file_path, chunksize, merge_identities, incremental)
+        if intervals is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return occupancy_curve(intervals[2], intervals[3])
+    if chunksize:
+        raise ValueError("The occupancy timeline needs every participant's intervals; turn off low memory "
+                         "(streaming).")
+    log = load_log(file_path, merge_identities)
+    if log.name_col is None:
+        raise ValueError(f"CSV file '{file_path}' must contain a 'Name' or 'Name (Original Name)' column.")
+    for col in ["Join Time", "Leave Time"]:
+        if col not in log.df.columns:
+            raise ValueError(f"CSV file '{file_path}' must contain a '{col}' column.")
+    with log._lock:
+        if log._occupancy is None:
+            try:
+                log.convert_times()
+            except Exception as e:
+                raise ValueError(f"Error converting join/leave times in '{file_path}': {e}")
+            _, starts, ends = log.merged_intervals()
+            log._occupancy = occupancy_curve(starts, ends)
+    return log._occupancy
+
+def timeline_frame(file_path, resolution=TIMELINE_RESOLUTION, chunksize=None, merge_identities=False,
+                   incremental=False):
+    """Return the "Timeline" sheet of file_path (see occupancy_timeline and log_occupancy)."""
+    return occupancy_timeline(*log_occupancy(file_path, chunksize, merge_identities, incremental), resolution)
+
+def suggest_sessions(file_path, fraction=SESSION_OCCUPANCY_FRACTION, min_minutes=SESSION_MIN_MINUTES,
+                     gap_minutes=SESSION_GAP_MINUTES, merge_identities=False):
+    """
+    Propose the session windows of file_path from its occupancy (see detect_sessions),
+    widened to whole minutes. Returns [(session_start, session_end)] as datetimes.
+    """
+    windows = detect_sessions(*log_occupancy(file_path, merge_identities=merge_identities), fraction,
+                              min_minutes, gap_minutes)
+    return [(pd.Timestamp(start).floor("min").to_pydatetime(), pd.Timestamp(end).ceil("min").to_pydatetime())
+            for start, end in windows]
+
+# ---------------------------
+# Report Writers
+# ---------------------------
+# Rows converted to Python values at a time by the streaming xlsx writer.
+XLSX_STREAM_ROWS = 50_000
+
+def read_raw_log(file_path):
+    """
+    Return the raw log (read without skipping rows) written to "Sheet1". It is read
+    from the file each time rather than kept with the parsed log, as it is only needed
+    while a report is written.
+    """
+    try:
+        return pd.read_csv(file_path)
+    except Exception as e:
+        raise ValueError(f"Error reading raw log from '{file_path}': {e}")
+
+def iter_raw_log(file_path, chunksize):
+    """
+    Yield the raw log written to "Sheet1" in chunks of chunksize rows, so it is never
+    held whole (streaming mode). Columns holding text in the first chunk, which
+    includes the participant table's header row, are read as text throughout, as a
+    whole-file read (see read_raw_log) does.
+    """
+    try:
+        first = pd.read_csv(file_path, nrows=chunksize)
+        text_columns = {column: str for column in first.columns
+                        if not pd.api.types.is_numeric_dtype(first[column].dtype)}
+        del first
+        yield from pd.read_csv(file_path, chunksize=chunksize, dtype=text_columns)
+    except Exception as e:
+        raise ValueError(f"Error reading raw log from '{file_path}': {e}")
+
+def raw_log_reference(file_path):
+    """Return a one-row table pointing at the raw log, written instead of copying it."""
+    stat = os.stat(file_path)
+    return pd.DataFrame({
+        "Raw log": [os.path.abspath(file_path)],
+        "Size (bytes)": [stat.st_size],
+        "Modified": [datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S')]
+    })
+
+def write_xlsx(output_file, sheets):
+    """Write (sheet name, DataFrame) pairs to a workbook with pandas and openpyxl."""
+    with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
+        for sheet_name, df in sheets:
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+def iter_sheet_rows(df):
+    """Yield the rows of df as lists of Python values (None for missing), a block at a time."""
+    for start in range(0, len(df), XLSX_STREAM_ROWS):
+        block = df.iloc[start:start + XLSX_STREAM_ROWS].astype(object)
+        yield from block.where(block.notna(), None).values.tolist()
+
+def sheet_frames(df):
+    """Yield the DataFrames of a sheet: df itself, or every chunk of a chunked sheet (see iter_raw_log)."""
+    if isinstance(df, pd.DataFrame):
+        yield df
+    else:
+        yield from df
+
+def write_xlsx_streaming(output_file, sheets):
+    """
+    Write (sheet name, DataFrame or iterable of DataFrame chunks) pairs row by row
+    without building the workbook in memory: xlsxwriter in constant_memory mode when
+    installed, otherwise an openpyxl write-only workbook.
+    """
+    try:
+        import xlsxwriter
+    except ImportError:
+        xlsxwriter = None
+    if xlsxwriter is not None:
+        workbook = xlsxwriter.Workbook(output_file, {"constant_memory": True})
+        bold = workbook.add_format({"bold": True})
+        for sheet_name, df in sheets:
+            worksheet = workbook.add_worksheet(sheet_name)
+            row_number = 0
+            for frame in sheet_frames(df):
+                if row_number == 0:
+                    worksheet.write_row(0, 0, [str(col) for col in frame.columns], bold)
+                    row_number = 1
+                for row in iter_sheet_rows(frame):
+                    worksheet.write_row(row_number, 0, row)
+                    row_number += 1
+        workbook.close()
+        return
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    workbook = Workbook(write_only=True)
+    for sheet_name, df in sheets:
+        worksheet = workbook.create_sheet(sheet_name)
+        header = None
+        for frame in sheet_frames(df):
+            if header is None:
+                header = []
+                for col in frame.columns:
+                    cell = WriteOnlyCell(worksheet, value=str(col))
+                    cell.font = Font(bold=True)
+                    header.append(cell)
+                worksheet.append(header)
+            for row in iter_sheet_rows(frame):
+                worksheet.append(row)
+    workbook.save(output_file)
+
+def write_csv(output_file, sheets):
+    """Write the Attendance table (the last sheet) as CSV."""
+    sheets[-1][1].to_csv(output_file, index=False)
+
+def write_parquet(output_file, sheets):
+    """Write the Attendance table (the last sheet) as Parquet (needs pyarrow or fastparquet)."""
+    try:
+        sheets[-1][1].to_parquet(output_file, index=False)
+    except ImportError as e:
+        raise ValueError(f"Parquet output needs pyarrow or fastparquet: {e}")
+
+# Output formats: name -> (writer, file extension, whether the raw log sheet is written).
+REPORT_WRITERS = {
+    "xlsx": (write_xlsx, ".xlsx", True),
+    "xlsx-stream": (write_xlsx_streaming, ".xlsx", True),
+    "csv": (write_csv, ".csv", False),
+    "parquet": (write_parquet, ".parquet", False)
+}
+# How the raw log sheet ("Sheet1") is written in xlsx reports.
+RAW_SHEET_MODES = ("copy", "reference", "skip")
+
+def write_report(output_file, result, file_path, output_format="xlsx", raw_sheet="copy", chunksize=None,
+                 profile=NO_PROFILE, incremental=False):
+    """
+    Write the attendance result (see AttendanceResult) of file_path to output_file
+    with the writer registered for output_format (see REPORT_WRITERS). For xlsx
+    formats raw_sheet chooses whether "Sheet1" holds a copy of the raw log, a
+    reference to the CSV file, or is skipped. In streaming and incremental mode the
+    copy is read in chunks (see iter_raw_log) and xlsx reports are written by
+    write_xlsx_streaming, so neither the raw log nor the workbook is held in memory;
+    the log is never parsed as a whole. Resolved identities are listed in an
+    "Identities" sheet and a requested occupancy timeline in a "Timeline" sheet; CSV
+    and Parquet reports hold the Attendance table only.
+    Returns {"writer" (the format written), "seconds", "peak_rss_mb", "rss_growth_mb"}
+    measured around the whole stage, including reading the raw log (see
+    MemorySampler), which is also recorded in profile.
+    """
+    if output_format not in REPORT_WRITERS:
+        raise ValueError(f"Unknown output format '{output_format}'. Choose from: {', '.join(REPORT_WRITERS)}.")
+    if raw_sheet not in RAW_SHEET_MODES:
+        raise ValueError(f"Unknown raw sheet mode '{raw_sheet}'. Choose from: {', '.join(RAW_SHEET_MODES)}.")
+    writer, _, writes_raw_sheet = REPORT_WRITERS[output_format]
+    started = time.perf_counter()
+    with MemorySampler() as memory:
+        sheets = []
+        if writes_raw_sheet and raw_sheet == "copy" and (chunksize or incremental):
+            sheets.append(("Sheet1", iter_raw_log(file_path, chunksize or STREAM_CHUNKSIZE)))
+            output_format = "xlsx-stream"
+            writer = REPORT_WRITERS[output_format][0]
+        elif writes_raw_sheet and raw_sheet == "copy":
+            sheets.append(("Sheet1", read_raw_log(file_path)))
+        elif writes_raw_sheet and raw_sheet == "reference":
+            sheets.append(("Sheet1", raw_log_reference(file_path)))
+        if writes_raw_sheet and result.identity_merges is not None:
+            sheets.append(("Identities", result.identity_merges))
+        if writes_raw_sheet and result.timeline is not None:
+            sheets.append(("Timeline", result.timeline))
+        sheets.append(("Attendance", result.to_frame()))
+        writer(output_file, sheets)
+    seconds = time.perf_counter() - started
+    profile.add("write_report", file_path, seconds, memory.peak_mb, memory.growth_mb, rows=len(result))
+    return {"writer": output_format, "seconds": seconds,
+            "peak_rss_mb": memory.peak_mb, "rss_growth_mb": memory.growth_mb}
+
+def format_write_stats(stats):
+    """Return a one-line description of write_report statistics."""
+    line = f"Output ({stats['writer']}): {stats['seconds']:.2f} s"
+    if stats["peak_rss_mb"] is not None:
+        line += f", peak RSS {stats['peak_rss_mb']:.1f} MB (+{stats['rss_growth_mb']:.1f} MB)"
+    return line
+
+def processed_output_path(file_path, output_dir=None, output_format="xlsx"):
+    """
+    Return the '<name>_processed<ext>' path for a CSV file, with the extension of
+    output_format: next to the file (multiple mode) or inside output_dir when given.
+    """
+    name_part, _ = os.path.splitext(os.path.basename(file_path))
+    extension = REPORT_WRITERS[output_format][1]
+    return os.path.join(output_dir or os.path.dirname(file_path), name_part + "_processed" + extension)
+
+# ---------------------------
+# Attendance Store
+# ---------------------------
+# Rows passed to one executemany call when storing results.
+STORE_BATCH_ROWS = 50_000
+# Bumped whenever the database schema changes.
+# Version 2 added participants_email; older databases are upgraded by running the schema again.
+STORE_SCHEMA_VERSION = 2
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    stored_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS participants (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT,
+    email TEXT
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    number INTEGER NOT NULL,
+    session_start TEXT NOT NULL,
+    session_end TEXT NOT NULL,
+    time_required REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attendance (
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    participant_id INTEGER NOT NULL REFERENCES participants(id),
+    status INTEGER NOT NULL,
+    minutes REAL NOT NULL,
+    PRIMARY KEY (session_id, participant_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS intervals (
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    participant_id INTEGER NOT NULL REFERENCES participants(id),
+    join_time TEXT NOT NULL,
+    leave_time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_file ON sessions(file_id);
+CREATE INDEX IF NOT EXISTS sessions_start ON sessions(session_start);
+CREATE INDEX IF NOT EXISTS attendance_participant ON attendance(participant_id, session_id);
+CREATE INDEX IF NOT EXISTS intervals_participant ON intervals(participant_id);
+CREATE INDEX IF NOT EXISTS intervals_file ON intervals(file_id);
+CREATE INDEX IF NOT EXISTS participants_email ON participants(lower(email));
+"""
+
+def connect_store(database):
+    """
+    Open (creating if needed) the SQLite attendance database at database. WAL mode lets
+    the parallel workers of process_files queue their writes while reports are read.
+    Databases of an older schema version are upgraded; newer ones are refused.
+    """
+    try:
+        connection = sqlite3.connect(database, timeout=60)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version > STORE_SCHEMA_VERSION:
+            connection.close()
+            raise ValueError(f"Database '{database}' has schema version {version}; "
+                             f"expected {STORE_SCHEMA_VERSION}.")
+        connection.executescript(STORE_SCHEMA)
+        connection.execute(f"PRAGMA user_version={STORE_SCHEMA_VERSION}")
+    except sqlite3.Error as e:
+        raise ValueError(f"Error opening database '{database}': {e}")
+    return connection
+
+def batches(rows, size=STORE_BATCH_ROWS):
+    """Yield lists of at most size rows from an iterable of row tuples."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iso_seconds(values):
+    """Format datetime64 values (or int64 nanoseconds) as 'YYYY-MM-DD HH:MM:SS' strings."""
+    return np.char.replace(np.datetime_as_string(np.asarray(values).astype("datetime64[ns]"), unit="s"), "T", " ")
+
+def merged_interval_arrays(file_path, chunksize=None, merge_identities=False, incremental=False):
+    """
+    Return the merged Join/Leave intervals of every participant of file_path as
+    (keys, codes, starts, ends), from the parsed log (see ParsedLog.merged_intervals)
+    or the incremental checkpoint, or None in streaming mode, where only intervals
+    clipped to the sessions are kept, and for a checkpoint without participants.
+    """
+    if incremental:
+        checkpoint = load_checkpoint(file_path)
+        if checkpoint is None or checkpoint.totals is None:
+            return None
+        keys = checkpoint.totals.index.to_numpy(dtype=object)
+        return keys, checkpoint.interval_codes, checkpoint.interval_starts, checkpoint.interval_ends
+    if chunksize:
+        return None
+    log = load_log(file_path, merge_identities)
+    return (log.participants()[1],) + log.merged_intervals()
+
+def merged_interval_frame(file_path, chunksize=None, merge_identities=False, incremental=False):
+    """
+    Return the merged intervals of merged_interval_arrays as a DataFrame with "key",
+    "start" and "end" (int64 nanoseconds), or None when there are none to store.
+    """
+    intervals = merged_interval_arrays(file_path, chunksize, merge_identities, incremental)
+    if intervals is None:
+        return None
+    keys, codes, starts, ends = intervals
+    return pd.DataFrame({"key": keys[codes], "start": starts, "end": ends})
+
+def store_attendance(database, file_path, sessions_info, result, chunksize=None, merge_identities=False,
+                     incremental=False, profile=NO_PROFILE):
+    """
+    Save the attendance result (see AttendanceResult) of file_path for sessions_info into
+    the SQLite database, replacing what was stored for the same file before: the
+    participants (by lower-case name key; a missing email is filled in later), the
+    sessions, every participant's status and minutes per session and the merged
+    intervals of the listed participants (see merged_interval_frame, which the mode
+    options are passed to). All rows are written with batched executemany calls in one
+    transaction, timed in profile. Returns the number of attendance rows written.
+    """
+    with profile.stage("store_attendance", file_path, participants=len(result),
+                       sessions=len(sessions_info)) as stage:
+        written = write_store(database, file_path, sessions_info, result,
+                              merged_interval_frame(file_path, chunksize, merge_identities, incremental))
+        stage.update(rows=written)
+    return written
+
+def write_store(database, file_path, sessions_info, result, intervals):
+    """Write the rows of store_attendance; intervals may be None."""
+    path = os.path.abspath(file_path)
+    keys = np.asarray(result.keys.astype(object))
+    connection = connect_store(database)
+    try:
+        with connection:
+            connection.execute("INSERT INTO files (path, name, stored_at) VALUES (?, ?, ?) "
+                               "ON CONFLICT (path) DO UPDATE SET stored_at = excluded.stored_at",
+                               (path, os.path.basename(file_path), datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            file_id = connection.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()[0]
+            connection.execute("DELETE FROM attendance WHERE session_id IN "
+                               "(SELECT id FROM sessions WHERE file_id = ?)", (file_id,))
+            connection.execute("DELETE FROM sessions WHERE file_id = ?", (file_id,))
+            connection.execute("DELETE FROM intervals WHERE file_id = ?", (file_id,))
+
+            names = pd.Series(result.names, dtype=object)
+            emails = pd.Series(result.emails, dtype=object)
+            people = zip(keys.tolist(), names.where(names.notna(), None).tolist(),
+                         emails.where(emails.notna(), None).tolist())
+            for batch in batches(people):
+                connection.executemany(
+                    "INSERT INTO participants (key, name, email) VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE "
+                    "SET email = COALESCE(participants.email, excluded.email)", batch)
+            connection.execute("CREATE TEMP TABLE IF NOT EXISTS stored_keys (key TEXT PRIMARY KEY)")
+            connection.execute("DELETE FROM stored_keys")
+            for batch in batches((key,) for key in keys.tolist()):
+                connection.executemany("INSERT OR IGNORE INTO stored_keys (key) VALUES (?)", batch)
+            ids = dict(connection.execute("SELECT p.key, p.id FROM participants p JOIN stored_keys USING (key)"))
+            participant_ids = np.array([ids[key] for key in keys.tolist()], dtype=np.int64)
+
+            session_ids = []
+            for number, session in enumerate(sessions_info, start=1):
+                cursor = connection.execute(
+                    "INSERT INTO sessions (file_id, number, session_start, session_end, time_required) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (file_id, number, pd.Timestamp(session["session_start"]).strftime('%Y-%m-%d %H:%M:%S'),
+                     pd.Timestamp(session["session_end"]).strftime('%Y-%m-%d %H:%M:%S'),
+                     float(session["time_required"])))
+                session_ids.append(cursor.lastrowid)
+            participants, sessions = result.status.shape
+            rows, columns = np.repeat(np.arange(participants), sessions), np.tile(np.arange(sessions), participants)
+            marks = zip(np.asarray(session_ids, dtype=np.int64)[columns].tolist(), participant_ids[rows].tolist(),
+                        result.status[rows, columns].tolist(),
+                        np.round(result.session_minutes[rows, columns], 4).tolist())
+            written = 0
+            for batch in batches(marks):
+                connection.executemany("INSERT INTO attendance (session_id, participant_id, status, minutes) "
+                                       "VALUES (?, ?, ?, ?)", batch)
+                written += len(batch)
+
+            if intervals is not None:
+                positions = pd.Index(keys).get_indexer(intervals["key"])
+                listed = positions >= 0
+                spans = zip(itertools.repeat(file_id), participant_ids[positions[listed]].tolist(),
+                            iso_seconds(intervals["start"].to_numpy()[listed]).tolist(),
+                            iso_seconds(intervals["end"].to_numpy()[listed]).tolist())
+                for batch in batches(spans):
+                    connection.executemany("INSERT INTO intervals (file_id, participant_id, join_time, leave_time) "
+                                           "VALUES (?, ?, ?, ?)", batch)
+    except sqlite3.Error as e:
+        raise ValueError(f"Error writing attendance of '{os.path.basename(file_path)}' to '{database}': {e}")
+    finally:
+        connection.close()
+    return written
+
+def session_range(since=None, until=None, files=None):
+    """
+    Return the SQL condition and parameters selecting sessions (s) starting in
+    [since, until), of files (f) whose name or path matches the glob pattern files.
+    """
+    conditions, parameters = [], []
+    if files is not None:
+        conditions.append("(f.name GLOB ? OR f.path GLOB ?)")
+        parameters += [files, files]
+    if since is not None:
+        conditions.append("s.session_start >= ?")
+        parameters.append(pd.Timestamp(since).strftime('%Y-%m-%d %H:%M:%S'))
+    if until is not None:
+        conditions.append("s.session_start < ?")
+        parameters.append(pd.Timestamp(until).strftime('%Y-%m-%d %H:%M:%S'))
+    return " AND ".join(conditions) or "1", parameters
+
+def attendance_rates(database, since=None, until=None, below=None, files=None):
+    """
+    Report every participant's attendance over the stored sessions starting in
+    [since, until), of the files whose name or path matches the glob pattern files
+    (e.g. "cs101_*.csv"; all files by default): a DataFrame with "Name", "Email",
+    "Present", "Sessions" (all selected sessions; a participant missing from a file is
+    absent from its sessions) and "Attendance %", lowest first. Logs of unrelated
+    meetings stored in the same database would count as absences, so select a course
+    or group with files. With below only participants under that percentage are listed.
+    """
+    condition, parameters = session_range(since, until, files)
+    connection = connect_store(database)
+    try:
+        total = connection.execute("SELECT COUNT(*) FROM sessions s JOIN files f ON f.id = s.file_id "
+                                   f"WHERE {condition}", parameters).fetchone()[0]
+        rates = pd.read_sql_query(
+            "SELECT p.name AS Name, p.email AS Email, SUM(a.status) AS Present "
+            "FROM attendance a JOIN sessions s ON s.id = a.session_id JOIN files f ON f.id = s.file_id "
+            "JOIN participants p ON p.id = a.participant_id "
+            f"WHERE {condition} GROUP BY a.participant_id", connection, params=parameters)
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        raise ValueError(f"Error reading database '{database}': {e}")
+    finally:
+        connection.close()
+    rates["Sessions"] = total
+    rates["Attendance %"] = (100 * rates["Present"] / total).round(1) if total else 0.0
+    if below is not None:
+        rates = rates[rates["Attendance %"] < below]
+    return rates.sort_values(["Attendance %", "Name"], kind="stable").reset_index(drop=True)
+
+def participant_history(database, participant, since=None, until=None, files=None):
+    """
+    Return the attendance history of one participant (name, case-insensitive, or
+    email): a DataFrame with "File", "Session", "Session Start", "Session End",
+    "Status" (P/A; A also where the participant was not in the log) and "Minutes" for
+    every stored session starting in [since, until) of the files matching files (see
+    attendance_rates), oldest first. When the name and email match several stored
+    participants, the best status and minutes count.
+    Raises ValueError if no stored participant matches.
+    """
+    condition, parameters = session_range(since, until, files)
+    connection = connect_store(database)
+    try:
+        key = str(participant).strip().lower()
+        ids = [row[0] for row in connection.execute(
+            "SELECT id FROM participants WHERE key = ? OR lower(email) = ?", (key, key))]
+        if not ids:
+            raise ValueError(f"No participant '{participant}' in database '{database}'.")
+        marks = ", ".join("?" * len(ids))
+        history = pd.read_sql_query(
+            "SELECT f.name AS File, s.number AS Session, s.session_start AS 'Session Start', "
+            "s.session_end AS 'Session End', COALESCE(MAX(a.status), 0) AS Status, "
+            "COALESCE(MAX(a.minutes), 0) AS Minutes "
+            "FROM sessions s JOIN files f ON f.id = s.file_id "
+            f"LEFT JOIN attendance a ON a.session_id = s.id AND a.participant_id IN ({marks}) "
+            f"WHERE {condition} GROUP BY s.id ORDER BY s.session_start, s.id",
+            connection, params=ids + parameters)
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        raise ValueError(f"Error reading database '{database}': {e}")
+    finally:
+        connection.close()
+    history["Status"] = np.where(history["Status"] == 1, "P", "A")
+    return history
+
+# ---------------------------
+# Multiple File Processing
+# ---------------------------
+# Default number of worker processes used in Multiple CSV Files mode.
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+def process_file(file_path, sessions_info, output_file, progress=no_progress, chunksize=None,
+                 output_format="xlsx", raw_sheet="copy", profile=NO_PROFILE, merge_identities=False,
+                 incremental=False, database=None, timeline_resolution=None):
+    """
+    Compute the attendance of one CSV file and write its report to output_file.
+    Kept at module level and free of any Tk state so it can be run by a
+    ProcessPoolExecutor. chunksize, merge_identities and incremental select streaming,
+    identity resolution and incremental reading, and timeline_resolution adds an
+    occupancy timeline (see build_attendance); output_format
+    and raw_sheet are passed to write_report. With database the result is also saved
+    to that SQLite file (see store_attendance). Stages are timed in profile.
+    Returns (session_summary, write_stats).
+    """
+    result = build_attendance(file_path, sessions_info, progress, chunksize, profile, merge_identities,
+                              incremental, timeline_resolution)
+    if database:
+        progress("Saving to database", 4, 4)
+        store_attendance(database, file_path, sessions_info, result, chunksize, merge_identities, incremental,
+                         profile)
+    progress(f"Writing {output_format} report", 4, 4)
+    try:
+        write_stats = write_report(output_file, result, file_path, output_format, raw_sheet, chunksize,
+                                   profile, incremental)
+    except Exception as e:
+        raise ValueError(f"Error saving output file for {os.path.basename(file_path)}: {e}")
+    return result.summary(), write_stats
+
+def run_profiled(task, *args, profiled=False, cancel_event=None, progress_queue=None, job_index=0, **kwargs):
+    """
+    Run task(*args, progress=..., profile=..., **kwargs) in a worker process, with a
+    StageProfile if profiled, and return (result, profile entries) so the entries reach
+    the parent. Progress events are put on progress_queue as (job_index, stage, done,
+    total), and once cancel_event is set the next event raises GenerationCancelled, so
+    the worker stops between stages (both are multiprocessing Manager proxies).
+    """
+    def worker_progress(stage, done, total):
+        if cancel_event is not None and cancel_event.is_set():
+            raise GenerationCancelled()
+        if progress_queue is not None:
+            progress_queue.put((job_index, stage, done, total))
+
+    profile = StageProfile() if profiled else NO_PROFILE
+    return task(*args, progress=worker_progress, profile=profile, **kwargs), list(profile.entries)
+
+def run_jobs_here(task, jobs, progress, profile, options):
+    """Run the jobs of run_file_jobs one after another in this process."""
+    results = []
+    for index, job in enumerate(jobs):
+        def file_progress(stage, done, total, index=index, base=os.path.basename(job[0])):
+            progress(f"File {index + 1}/{len(jobs)} ({base}): {stage}", index + done / total, len(jobs))
+        try:
+            results.append((job[0], task(*job, progress=file_progress, profile=profile, **options), None))
+        except GenerationCancelled:
+            raise
+        except Exception as e:
+            results.append((job[0], None, str(e) or type(e).__name__))
+    return results
+
+def submit_jobs(executor, task, jobs, profile, cancel_event, progress_queue, options):
+    """Submit every job of run_file_jobs to executor; returns [(file_path, future)] in job order."""
+    return [(job[0], executor.submit(run_profiled, task, *job, profiled=profile.enabled, cancel_event=cancel_event,
+                                     progress_queue=progress_queue, job_index=index, **options))
+            for index, job in enumerate(jobs)]
+
+def forward_progress(progress_queue, jobs, running, stage):
+    """
+    Take the queued worker progress events, record each job's fraction done in running
+    and return the stage of the latest event (stage if there was none).
+    """
+    while True:
+        try:
+            index, job_stage, done, total = progress_queue.get_nowait()
+        except queue.Empty:
+            return stage
+        running[index] = done / total if total else 0
+        stage = f"File {index + 1}/{len(jobs)} ({os.path.basename(jobs[index][0])}): {job_stage}"
+
+def wait_for_jobs(futures, jobs, workers, progress_queue, progress):
+    """Report the progress of submitted jobs until every future is done."""
+    pending = {future for _, future in futures}
+    # Fraction done of every job still running, from its latest progress event.
+    running = {}
+    stage = f"File 0/{len(jobs)}: processing on {workers} workers"
+    progress(stage, 0, len(jobs))
+    while pending:
+        _, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+        stage = forward_progress(progress_queue, jobs, running, stage)
+        for index, (_, future) in enumerate(futures):
+            if future.done():
+                running.pop(index, None)
+        completed = len(jobs) - len(pending)
+        if not running:
+            stage = f"File {completed}/{len(jobs)} processed"
+        progress(stage, completed + sum(running.values()), len(jobs))
+
+def collect_results(futures, profile):
+    """Return the (file_path, result, error) of finished futures and add their stage timings to profile."""
+    results = []
+    for file_path, future in futures:
+        try:
+            result, entries = future.result()
+            profile.extend(entries)
+            results.append((file_path, result, None))
+        except Exception as e:
+            results.append((file_path, None, str(e) or type(e).__name__))
+    return results
+
+def run_file_jobs(task, jobs, max_workers=DEFAULT_WORKERS, progress=no_progress, profile=NO_PROFILE, **options):
+    """
+    Run task(*job, progress=..., profile=..., **options) for every job, a tuple starting
+    with a file path. task must be a module-level function so it can be sent to workers.
+    Jobs run on up to max_workers spawned processes; with one worker (or one job) they
+    run in this process.
+    progress(stage, done, total) receives "File i/N" events (done/total in files), also
+    forwarded from the stages of worker processes, and may raise GenerationCancelled;
+    pending jobs are then cancelled, running workers stop at their next stage (see
+    run_profiled) and are waited for, and the exception propagates. Stage timings of
+    every job, also from worker processes, go to profile.
+    Returns a list of (file_path, result, error) in job order, where error is None on
+    success and result is None on failure, so one bad file does not abort the others.
+    """
+    if max_workers <= 1 or len(jobs) <= 1:
+        return run_jobs_here(task, jobs, progress, profile, options)
+    # Spawned workers do not inherit the GUI's threads or Tk state.
+    context = multiprocessing.get_context("spawn")
+    workers = min(max_workers, len(jobs))
+    with context.Manager() as manager:
+        cancel_event = manager.Event()
+        progress_queue = manager.Queue()
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        try:
+            futures = submit_jobs(executor, task, jobs, profile, cancel_event, progress_queue, options)
+            wait_for_jobs(futures, jobs, workers, progress_queue, progress)
+        except GenerationCancelled:
+            cancel_event.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        executor.shutdown()
+    return collect_results(futures, profile)
+
+def process_files(sessions_by_file, max_workers=DEFAULT_WORKERS, progress=no_progress, output_dir=None,
+                  profile=NO_PROFILE, **file_options):
+    """
+    Run process_file for every file in sessions_by_file (file path -> sessions_info),
+    writing each report to processed_output_path (inside output_dir if given).
+    file_options (chunksize, output_format, raw_sheet, merge_identities, incremental,
+    database, timeline_resolution) are passed to process_file.
+    Files are processed, and progress, cancellation and profile handled, as described
+    for run_file_jobs.
+    Returns a list of (file_path, session_summary, error, write_stats) in the order of
+    sessions_by_file, where error is None on success and session_summary/write_stats
+    are None on failure, so one bad file does not abort the others.
+    """
+    output_format = file_options.get("output_format", "xlsx")
+    jobs = [(file_path, sessions_info, processed_output_path(file_path, output_dir, output_format))
+            for file_path, sessions_info in sessions_by_file.items()]
+    results = []
+    for file_path, result, error in run_file_jobs(process_file, jobs, max_workers, progress, profile,
+                                                  **file_options):
+        session_summary, write_stats = result or (None, None)
+        results.append((file_path, session_summary, error, write_stats))
+    return results
+
+# ---------------------------
+# Consolidated Register
+# ---------------------------
+def register_part(file_path, sessions_info, progress=no_progress, chunksize=None, profile=NO_PROFILE,
+                  merge_identities=False, incremental=False, database=None):
+    """
+    Compute the attendance of one CSV file for the consolidated register.
+    Returns a DataFrame of the participants who attended any session, indexed by
+    lower-case name (the first name seen of each person with merge_identities), with
+    "Name", "Email" and one int8 column per session (1 present, 0 absent) labelled as in
+    the Attendance sheet. With database the file's attendance is also saved there (see
+    store_attendance).
+    """
+    matrix, global_times, raw_durations = attendance_matrix(file_path, sessions_info, progress, chunksize, profile,
+                                                            merge_identities, incremental)
+    if database:
+        result = AttendanceResult.from_matrix(matrix, global_times, raw_durations, sessions_info)
+        store_attendance(database, file_path, sessions_info, result, chunksize, merge_identities, incremental,
+                         profile)
+    rows = np.flatnonzero(matrix["attended"].any(axis=1))
+    part = pd.DataFrame(matrix["present"][rows].astype(np.int8), columns=session_column_labels(sessions_info),
+                        index=pd.Index(matrix["keys"][rows], name="key"))
+    part.insert(0, "Name", matrix["Name"][rows])
+    part.insert(1, "Email", matrix["Email"][rows])
+    return part
+
+def build_register(parts, merge_identities=False):
+    """
+    Join register parts [(file_path, part)] (see register_part), in semester order, on the
+    participant key into one participants x (file, session) register. Participants
+    missing from a file are absent from its sessions. Columns are "Name", "Email", then
+    per file "<file> | Session i (...)" with P/A and "<file> | Cumulative %" (attendance
+    over all sessions up to that file), then "Present", "Sessions" and "Attendance %".
+    Rows are sorted by participant key; Name and Email come from the first file.
+    With merge_identities the participants of all parts are resolved together (see
+    resolve_identities), so a person spelled differently in two files is one row, keyed
+    by the first key seen.
+    """
+    labels = []
+    for file_path, _ in parts:
+        label = base = os.path.splitext(os.path.basename(file_path))[0]
+        number = 1
+        while label in labels:
+            number += 1
+            label = f"{base} ({number})"
+        labels.append(label)
+    # One hash join for all parts: factorize the concatenated keys, then scatter every
+    # part's statuses into its rows and session columns of a preallocated matrix.
+    frames = [part for _, part in parts]
+    join_keys = frames[0].index.append([part.index for part in frames[1:]])
+    people = pd.concat([part[["Name", "Email"]] for part in frames], ignore_index=True)
+    if merge_identities:
+        groups, _ = resolve_identities(people["Name"].to_numpy(), people["Email"].to_numpy())
+        join_keys = join_keys[groups]
+    codes, keys = join_keys.factorize()
+    order = np.argsort(np.asarray(keys, dtype=object), kind="stable")
+    row_of_code = np.empty(len(keys), dtype=np.int64)
+    row_of_code[order] = np.arange(len(keys))
+    rows = row_of_code[codes]
+    _, first = np.unique(rows, return_index=True)
+    session_counts = np.array([part.shape[1] - 2 for _, part in parts], dtype=np.int64)
+    file_ends = np.cumsum(session_counts)
+    total_sessions = int(file_ends[-1]) if len(file_ends) else 0
+    present = np.zeros((len(keys), total_sessions), dtype=np.int8)
+    people = people.iloc[first]
+    offset = 0
+    for (_, part), file_end, count in zip(parts, file_ends, session_counts):
+        # Resolved rows of one file may be one person; a session counts when any was present.
+        np.maximum.at(present, (rows[offset:offset + len(part), None], np.arange(file_end - count, file_end)[None, :]),
+                      part.iloc[:, 2:].to_numpy(dtype=np.int8))
+        offset += len(part)
+    cumulative_present = np.cumsum(present, axis=1, dtype=np.int64)
+    columns = {"Name": people["Name"].to_numpy(), "Email": people["Email"].to_numpy()}
+    for label, (_, part), file_end, count in zip(labels, parts, file_ends, session_counts):
+        for column, session_label in enumerate(part.columns[2:], start=file_end - count):
+            columns[f"{label} | {session_label}"] = pd.Categorical.from_codes(present[:, column], ["A", "P"])
+        columns[f"{label} | Cumulative %"] = (np.round(cumulative_present[:, file_end - 1] * 100 / file_end, 2)
+                                              if file_end else np.zeros(len(keys)))
+    total_present = cumulative_present[:, -1] if total_sessions else np.zeros(len(keys), dtype=np.int64)
+    columns["Present"] = total_present
+    columns["Sessions"] = np.full(len(keys), total_sessions)
+    columns["Attendance %"] = (np.round(total_present * 100 / total_sessions, 2) if total_sessions
+                               else np.zeros(len(keys)))
+    return pd.DataFrame(columns)
+
+def write_register(output_file, register, output_format="xlsx"):
+    """
+    Write the register as a single "Register" sheet (or table) with the writer registered
+    for output_format. Returns the same statistics as write_report.
+    """
+    if output_format not in REPORT_WRITERS:
+        raise ValueError(f"Unknown output format '{output_format}'. Choose from: {', '.join(REPORT_WRITERS)}.")
+    started = time.perf_counter()
+    with MemorySampler() as memory:
+        REPORT_WRITERS[output_format][0](output_file, [("Register", register)])
+    return {"writer": output_format, "seconds": time.perf_counter() - started,
+            "peak_rss_mb": memory.peak_mb, "rss_growth_mb": memory.growth_mb}
+
+def process_register(sessions_by_file, output_file, max_workers=DEFAULT_WORKERS, progress=no_progress,
+                     profile=NO_PROFILE, chunksize=None, output_format="xlsx", merge_identities=False,
+                     incremental=False, database=None):
+    """
+    Compute register_part for every file in sessions_by_file (file path -> sessions_info,
+    in semester order; chunksize, merge_identities, incremental and database are passed
+    on) on up to max_workers processes (see run_file_jobs), join the parts with
+    build_register and write the register to output_file.
+    Returns (register_summary, errors, write_stats): summary lines, a list of
+    (file_path, error) of the files left out, and the write_register statistics.
+    Raises ValueError if no file could be processed.
+    """
+    jobs = list(sessions_by_file.items())
+    parts, errors = [], []
+    for file_path, part, error in run_file_jobs(register_part, jobs, max_workers, progress, profile,
+                                                chunksize=chunksize, merge_identities=merge_identities,
+                                                incremental=incremental, database=database):
+        if error is None:
+            parts.append((file_path, part))
+        else:
+            errors.append((file_path, error))
+    if not parts:
+        raise ValueError("No file could be processed:\n" + "\n".join(
+            f"{os.path.basename(file_path)}: {error}" for file_path, error in errors))
+    progress("Joining register", len(jobs), len(jobs))
+    with profile.stage("build_register", output_file, sessions=sum(part.shape[1] - 2 for _, part in parts)) as stage:
+        register = build_register(parts, merge_identities)
+        stage.update(participants=len(register))
+    progress(f"Writing {output_format} register", len(jobs), len(jobs))
+    try:
+        write_stats = write_register(output_file, register, output_format)
+    except Exception as e:
+        raise ValueError(f"Error saving register file: {e}")
+    profile.add("write_register", output_file, write_stats["seconds"], write_stats["peak_rss_mb"],
+                write_stats["rss_growth_mb"], rows=len(register))
+    register_summary = [f"Register: {len(register)} participants, {len(parts)} files, "
+                        f"{int(register['Sessions'].iloc[0]) if len(register) else 0} sessions",
+                        f"Average attendance: {register['Attendance %'].mean() if len(register) else 0:.1f}%"]
+    return register_summary, errors, write_stats
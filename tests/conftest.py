@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import attendance_core  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Give every test an empty parsed-log cache on disk and in memory."""
+    monkeypatch.setattr(attendance_core, "LOG_CACHE_DIR", str(tmp_path / "cache"))
+    attendance_core._parsed_logs.clear()
+    attendance_core._checkpoints.clear()
+    yield
+    attendance_core._parsed_logs.clear()
+    attendance_core._checkpoints.clear()
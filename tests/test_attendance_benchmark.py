@@ -0,0 +1,68 @@
+import argparse
+import copy
+import json
+
+import pytest
+
+import attendance_core
+from attendance_benchmark import compare_reports, generate_log, main, parse_scale, run_benchmarks
+
+# ---------------------------
+# Synthetic Zoom Logs
+# ---------------------------
+@pytest.mark.parametrize("scale, expected", [
+    ("10000x500", (10_000, 500)), ("100kx5k", (100_000, 5_000)), ("1.5Mx50K", (1_500_000, 50_000))])
+def test_parse_scale(scale, expected):
+    assert parse_scale(scale) == expected
+
+
+@pytest.mark.parametrize("scale", ["10000", "10kxmany", "1x2x3"])
+def test_parse_scale_errors(scale):
+    with pytest.raises(argparse.ArgumentTypeError, match="expected ROWSxPARTICIPANTS"):
+        parse_scale(scale)
+
+
+def test_generate_log_parses(tmp_path):
+    file_path = str(tmp_path / "zoom.csv")
+    generate_log(file_path, 600, 40, seed=3)
+    log = attendance_core.read_log(file_path)
+    df = log.convert_times()
+    assert (log.name_col, log.email_col) == ("Name (Original Name)", "User Email")
+    assert len(df) == 600
+    # Every participant connects; names only vary in case.
+    assert df["Name_lower"].nunique() == 40
+    assert (df["Join Time"] <= df["Leave Time"]).all()
+    generate_log(str(tmp_path / "again.csv"), 600, 40, seed=3)
+    assert (tmp_path / "again.csv").read_bytes() == (tmp_path / "zoom.csv").read_bytes()
+
+
+# ---------------------------
+# Report Comparison
+# ---------------------------
+def test_run_then_compare_reports(tmp_path, capsys):
+    report = run_benchmarks([parse_scale("300x30")], stages=("parse", "build_attendance"), repeat=1,
+                            data_dir=str(tmp_path / "data"), startup=False, log=lambda line: None)
+    [run] = report["runs"]
+    assert (run["rows"], run["participants"], list(run["stages"])) == (300, 30, ["parse", "build_attendance"])
+    lines, regressions = compare_reports(report, report)
+    assert regressions == 0 and not any("REGRESSION" in line for line in lines)
+    baseline = copy.deepcopy(report)
+    baseline["runs"][0]["stages"]["parse"]["seconds"] = 1.0
+    baseline_path = tmp_path / "baseline.json"
+    baseline_path.write_text(json.dumps(baseline))
+
+    # A slower stage and a scale the baseline lacks are reported.
+    current = copy.deepcopy(baseline)
+    current["runs"][0]["stages"]["parse"]["seconds"] = 1.5
+    current["runs"].append(dict(copy.deepcopy(run), rows=600))
+    lines, regressions = compare_reports(baseline, current)
+    assert regressions == 1
+    assert [line.split()[0] for line in lines if line.endswith("REGRESSION")] == ["parse"]
+    assert "  (not in baseline)" in lines
+    current_path = tmp_path / "current.json"
+    current_path.write_text(json.dumps(current))
+    assert main(["compare", str(baseline_path), str(baseline_path)]) == 0
+    assert main(["compare", str(baseline_path), str(current_path)]) == 1
+    assert "1 regression(s) above 10%." in capsys.readouterr().out
+    # A higher threshold accepts the slowdown.
+    assert main(["compare", str(baseline_path), str(current_path), "-t", "60"]) == 0
@@ -0,0 +1,179 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import attendance_cli
+from attendance_cli import (EXIT_BROKEN_PIPE, EXIT_FILE_ERRORS, EXIT_OK, EXIT_USAGE, file_sessions_for, load_spec, main,
+                            parse_sessions)
+
+# ---------------------------
+# Helpers
+# ---------------------------
+LOG = ("Meeting ID,Topic,Start Time,End Time,User Email,Duration (Minutes),Participants\n"
+       "123,Test,2024-02-08 09:00:00,2024-02-08 12:00:00,host@x.com,180,3\n"
+       "\n"
+       "Name (Original Name),User Email,Join Time,Leave Time,Duration,Guest\n"
+       "Al,al@x.com,2024-02-08 09:00:00,2024-02-08 10:30:00,90,No\n"
+       "Bo,bo@x.com,2024-02-08 09:10:00,2024-02-08 09:20:00,10,No\n"
+       "Cy,cy@x.com,2024-02-08 09:05:00,2024-02-08 10:25:00,80,No\n")
+SESSION = {"start": "2024-02-08 09:00:00", "end": "2024-02-08 10:00:00", "time_required": 30}
+
+
+def write_file(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return str(path)
+
+
+def write_spec(tmp_path, spec, name="spec.json"):
+    return write_file(tmp_path / name, json.dumps(spec))
+
+
+# ---------------------------
+# Session Spec
+# ---------------------------
+def test_load_spec_list_and_files(tmp_path):
+    sessions, files = load_spec(write_spec(tmp_path, [SESSION]))
+    assert sessions == [{"session_start": datetime(2024, 2, 8, 9), "session_end": datetime(2024, 2, 8, 10),
+                         "time_required": 30.0}]
+    assert files == {}
+    other = dict(SESSION, time_required=45)
+    spec = {"sessions": [SESSION], "files": {"week1.csv": [other], "b/week1.csv": []}}
+    sessions, files = load_spec(write_spec(tmp_path, spec))
+    assert files["week1.csv"][0]["time_required"] == 45.0
+    assert file_sessions_for("a/week1.csv", files, sessions) == files["week1.csv"]
+    assert file_sessions_for(os.path.join("b", ".", "week1.csv"), files, sessions) == []
+    assert file_sessions_for("week2.csv", files, sessions) == sessions
+
+
+@pytest.mark.parametrize("session, message", [
+    ({"start": "2024-02-08 09:00:00", "end": "2024-02-08 10:00:00"}, "missing 'time_required'"),
+    (dict(SESSION, end="2024-02-08 08:00:00"), "start must be before end"),
+    (dict(SESSION, start="8 February"), "Error in session 1"),
+    (dict(SESSION, time_required="half"), "Error in session 1"),
+])
+def test_parse_sessions_errors(session, message):
+    with pytest.raises(ValueError, match=message):
+        parse_sessions([session], "sessions")
+
+
+def test_load_spec_errors(tmp_path):
+    with pytest.raises(ValueError, match="must be a list of sessions or a dict"):
+        load_spec(write_spec(tmp_path, "sessions"))
+    with pytest.raises(ValueError, match="Error reading session spec"):
+        load_spec(write_file(tmp_path / "broken.json", "{"))
+
+
+def test_load_spec_yaml(tmp_path):
+    pytest.importorskip("yaml")
+    text = "sessions:\n  - start: 2024-02-08 09:00:00\n    end: 2024-02-08 10:00:00\n    time_required: 30\n"
+    sessions, _ = load_spec(write_file(tmp_path / "spec.yaml", text))
+    assert sessions[0]["session_end"] == datetime(2024, 2, 8, 10)
+
+
+# ---------------------------
+# Exit Codes
+# ---------------------------
+def test_main_ok(tmp_path, capsys):
+    log = write_file(tmp_path / "logs" / "week1.csv", LOG)
+    output_dir = tmp_path / "out"
+    assert main([write_spec(tmp_path, [SESSION]), log, "-w", "1", "-o", str(output_dir)]) == EXIT_OK
+    assert "Processed 1 of 1 files." in capsys.readouterr().out
+    report = pd.read_excel(output_dir / "week1_processed.xlsx", sheet_name="Attendance")
+    assert report["Name"].tolist() == ["Al", "Bo", "Cy"]
+    assert report.iloc[:, 4].tolist() == ["P", "A", "P"]
+
+
+def test_main_file_errors(tmp_path, capsys):
+    logs = tmp_path / "logs"
+    write_file(logs / "good.csv", LOG)
+    write_file(logs / "bad.csv", "Meeting ID\n1\n\nName,Email\nAl,al@x.com\n")
+    assert main([write_spec(tmp_path, [SESSION]), str(logs), "-w", "2", "-f", "csv"]) == EXIT_FILE_ERRORS
+    out, err = capsys.readouterr()
+    assert "Error: bad.csv:" in err
+    assert "Processed 1 of 2 files." in out
+    assert os.path.exists(logs / "good_processed.csv")
+
+
+def test_main_usage_errors(tmp_path, capsys):
+    log = write_file(tmp_path / "week1.csv", LOG)
+    spec = write_spec(tmp_path, [SESSION])
+    assert main([write_spec(tmp_path, [{"start": SESSION["start"]}], "bad.json"), log]) == EXIT_USAGE
+    assert "missing 'end'" in capsys.readouterr().err
+    (tmp_path / "empty").mkdir()
+    assert main([spec, str(tmp_path / "empty")]) == EXIT_USAGE
+    assert "no CSV files found" in capsys.readouterr().err
+    other = write_file(tmp_path / "other" / "week1.csv", LOG)
+    assert main([spec, log, other, "-o", str(tmp_path / "out")]) == EXIT_USAGE
+    assert "would be written to the same report" in capsys.readouterr().err
+    for argv in ([spec], ["--rates"], [spec, log, "--stream", "--merge-identities"]):
+        with pytest.raises(SystemExit) as exit_info:
+            main(argv)
+        assert exit_info.value.code == EXIT_USAGE
+
+
+# ---------------------------
+# Modes
+# ---------------------------
+def test_main_register(tmp_path, capsys):
+    first = write_file(tmp_path / "week1.csv", LOG)
+    second = write_file(tmp_path / "week2.csv", LOG.replace("Bo,bo@x.com", "Di,di@x.com"))
+    register_path = tmp_path / "register.csv"
+    assert main([write_spec(tmp_path, [SESSION]), first, second, "-w", "1", "-f", "csv",
+                 "--register", str(register_path)]) == EXIT_OK
+    assert "Register of 2 of 2 files" in capsys.readouterr().out
+    register = pd.read_csv(register_path)
+    assert register["Name"].tolist() == ["Al", "Bo", "Cy", "Di"]
+    assert register["Sessions"].tolist() == [2, 2, 2, 2]
+
+
+def test_main_suggest_sessions_keeps_files_with_the_same_name(tmp_path, capsys):
+    first = write_file(tmp_path / "a" / "week1.csv", LOG)
+    second = write_file(tmp_path / "b" / "week1.csv", LOG.replace("10:25:00", "10:45:00"))
+    assert main(["--suggest-sessions", first, second]) == EXIT_OK
+    files = json.loads(capsys.readouterr().out)["files"]
+    assert files == {first: [{"start": "2024-02-08 09:05:00", "end": "2024-02-08 10:25:00"}],
+                     second: [{"start": "2024-02-08 09:05:00", "end": "2024-02-08 10:30:00"}]}
+    # The printed spec selects each file's sessions by its path.
+    spec_files = {path: [dict(session, time_required=10) for session in sessions] for path, sessions in files.items()}
+    _, file_sessions = load_spec(write_spec(tmp_path, {"files": spec_files}))
+    assert file_sessions_for(second, file_sessions, []) == file_sessions[second]
+
+
+def test_main_database_queries(tmp_path, capsys):
+    log = write_file(tmp_path / "week1.csv", LOG)
+    database = str(tmp_path / "term.sqlite3")
+    assert main([write_spec(tmp_path, [SESSION]), log, "-w", "1", "-f", "csv", "--db", database]) == EXIT_OK
+    capsys.readouterr()
+    assert main(["--db", database, "--rates", "--below", "60"]) == EXIT_OK
+    out = capsys.readouterr().out
+    assert "Bo" in out and "Al" not in out
+    assert main(["--db", database, "--history", "al@x.com"]) == EXIT_OK
+    assert "present in 1 of 1 sessions" in capsys.readouterr().out
+    assert main(["--db", str(tmp_path / "missing" / "none.sqlite3"), "--rates"]) == EXIT_USAGE
+
+
+def test_main_exits_quietly_when_output_is_closed(tmp_path):
+    log = write_file(tmp_path / "week1.csv", LOG)
+    database = str(tmp_path / "term.sqlite3")
+    assert main([write_spec(tmp_path, [SESSION]), log, "-w", "1", "-f", "csv", "--db", database]) == EXIT_OK
+    cli = os.path.join(os.path.dirname(os.path.abspath(attendance_cli.__file__)), "attendance_cli.py")
+    # As with `--rates | head`: the reader closes the pipe before the report is printed.
+    process = subprocess.Popen([sys.executable, cli, "--db", database, "--rates"],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    process.stdout.close()
+    assert process.wait(timeout=60) == EXIT_BROKEN_PIPE
+    assert process.stderr.read() == b""
+    process.stderr.close()
+
+
+def test_main_clear_cache(tmp_path, capsys):
+    log = write_file(tmp_path / "week1.csv", LOG)
+    assert main([write_spec(tmp_path, [SESSION]), log, "-w", "1", "-f", "csv"]) == EXIT_OK
+    assert main(["--clear-cache"]) == EXIT_OK
+    assert "Cleared 1 cached logs" in capsys.readouterr().out
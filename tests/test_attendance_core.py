@@ -0,0 +1,939 @@
+from contextlib import closing
+from datetime import datetime, timedelta
+import io
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import attendance_core
+from attendance_core import (GenerationCancelled, IntervalIndex, LogCache, NO_PROFILE, NullProfile,
+                             SESSION_CACHE_SIZE, STORE_SCHEMA_VERSION, StageProfile, ThresholdPreview,
+                             attendance_rates, build_attendance, build_register, compute_total_duration,
+                             connect_store, detect_sessions, fold_totals, format_stage_profile, ingest_log,
+                             intersect_interval, load_log, log_occupancy, merge_intervals, merge_intervals_by_key,
+                             normalize_names, occupancy_timeline, parse_times, participant_history,
+                             process_csv_session, process_csv_sessions, process_file, process_files, read_log,
+                             read_table, resolve_identities, run_file_jobs, session_matrix, sniff_schema,
+                             store_attendance, suggest_sessions, write_report)
+
+# ---------------------------
+# Helpers
+# ---------------------------
+PREAMBLE = ("Meeting ID,Topic,Start Time,End Time,User Email,Duration (Minutes),Participants\n"
+            "123,Test,2024-02-08 09:00:00,2024-02-08 17:00:00,host@x.com,480,50\n"
+            "\n")
+BASE = datetime(2024, 2, 8, 9, 0)
+SESSIONS = [
+    {"session_start": datetime(2024, 2, 8, 9, 30), "session_end": datetime(2024, 2, 8, 11, 0), "time_required": 30},
+    {"session_start": datetime(2024, 2, 8, 11, 0), "session_end": datetime(2024, 2, 8, 13, 0), "time_required": 45.5},
+    {"session_start": datetime(2024, 2, 8, 14, 0), "session_end": datetime(2024, 2, 8, 17, 0), "time_required": 60},
+]
+
+
+def log_rows(seed=0, participants=25, rows=400):
+    """
+    Return [(name, email, join, leave, duration)] with random attendance plus every
+    edge case the interval merge has to handle. join/leave are datetimes or None.
+    """
+    rng = np.random.default_rng(seed)
+    result = []
+    for _ in range(rows):
+        person = int(rng.integers(participants))
+        join = BASE + timedelta(seconds=int(rng.integers(0, 8 * 3600)))
+        leave = join + timedelta(seconds=int(rng.integers(0, 3 * 3600)))
+        # Some records of a person use another case of the name.
+        name = f"Person {person}" if rng.random() < 0.8 else f"PERSON {person}"
+        result.append((name, f"p{person}@x.com", join, leave, int((leave - join).total_seconds() // 60)))
+    at = BASE + timedelta(hours=1)
+    result += [
+        # Overlapping and nested intervals.
+        ("Overlap", "o@x.com", at, at + timedelta(minutes=40), 40),
+        ("Overlap", "o@x.com", at + timedelta(minutes=20), at + timedelta(minutes=70), 50),
+        ("Overlap", "o@x.com", at + timedelta(minutes=30), at + timedelta(minutes=35), 5),
+        # Touching intervals, one ending exactly at a session boundary.
+        ("Touch", "t@x.com", at, at + timedelta(minutes=30), 30),
+        ("Touch", "t@x.com", at + timedelta(minutes=30), BASE + timedelta(hours=2), 30),
+        ("Touch", "t@x.com", BASE + timedelta(hours=2), BASE + timedelta(hours=2, minutes=50), 50),
+        # Zero-length intervals, alone and inside another interval.
+        ("Zero", "z@x.com", at, at, 0),
+        ("Zero Inside", "zi@x.com", at, at + timedelta(minutes=50), 50),
+        ("Zero Inside", "zi@x.com", at + timedelta(minutes=10), at + timedelta(minutes=10), 0),
+        # Records without a name are ignored.
+        ("", "nobody@x.com", at, at + timedelta(minutes=90), 90),
+        # Records without a join or leave time only count towards the raw totals.
+        ("Missing Time", "m@x.com", at, at + timedelta(minutes=35), 35),
+        ("Missing Time", "m@x.com", None, at + timedelta(minutes=80), 80),
+        ("Missing Time", "m@x.com", at + timedelta(minutes=40), None, 20),
+    ]
+    order = rng.permutation(len(result))
+    return [result[i] for i in order]
+
+
+def write_log(path, rows, time_format="%Y-%m-%d %H:%M:%S", preamble=PREAMBLE):
+    """Write rows (see log_rows) as a Zoom participant log."""
+    lines = ["Name (Original Name),User Email,Join Time,Leave Time,Duration,Guest"]
+    for name, email, join, leave, duration in rows:
+        times = [t.strftime(time_format) if t is not None else "" for t in (join, leave)]
+        lines.append(",".join([f'"{name}"' if "," in name else name, email, *times, str(duration), "No"]))
+    path.write_text(preamble + "\n".join(lines) + "\n")
+    return str(path)
+
+
+def reference_session(file_path, session_start, session_end, time_required):
+    """
+    process_csv_session as it was before the vectorized merge: an iterrows loop over
+    every participant with merge_intervals and intersect_interval. Rows without both
+    times are dropped first, as the current implementation does.
+    """
+    df = pd.read_csv(file_path, skiprows=3)
+    df.columns = df.columns.str.strip()
+    df["Join Time"] = pd.to_datetime(df["Join Time"])
+    df["Leave Time"] = pd.to_datetime(df["Leave Time"])
+    df["Name_lower"] = df["Name (Original Name)"].str.lower()
+    timed = df[df["Join Time"].notna() & df["Leave Time"].notna()]
+    session_results = {}
+    for name_lower, group in timed.groupby("Name_lower"):
+        first = df[df["Name_lower"] == name_lower].iloc[0]
+        intervals = [(row["Join Time"], row["Leave Time"]) for _, row in group.iterrows()]
+        merged = merge_intervals(intervals)
+        session_intervals = [intersect_interval(interval, (session_start, session_end)) for interval in merged
+                             if intersect_interval(interval, (session_start, session_end)) is not None]
+        session_intervals = merge_intervals(session_intervals)
+        if not session_intervals:
+            continue
+        session_duration = compute_total_duration(session_intervals)
+        session_results[name_lower] = {
+            "Name": first["Name (Original Name)"],
+            "Email": first["User Email"],
+            "session_min_join": min(i[0] for i in session_intervals),
+            "raw_max_leave": max(i[1] for i in session_intervals),
+            "session_duration": session_duration,
+            "status": "P" if session_duration >= time_required else "A"
+        }
+    return session_results
+
+
+def reference_report(file_path, sessions_info):
+    """The Attendance sheet as the original per-session loop assembled it."""
+    df = pd.read_csv(file_path, skiprows=3)
+    df.columns = df.columns.str.strip()
+    df["Name_lower"] = df["Name (Original Name)"].str.lower()
+    global_join = pd.to_datetime(df["Join Time"]).groupby(df["Name_lower"]).min()
+    global_leave = pd.to_datetime(df["Leave Time"]).groupby(df["Name_lower"]).max()
+    raw_durations = pd.to_numeric(df["Duration"], errors="coerce").groupby(df["Name_lower"]).sum()
+    participants = {}
+    labels = []
+    for index, session in enumerate(sessions_info, start=1):
+        results = reference_session(file_path, session["session_start"], session["session_end"],
+                                    session["time_required"])
+        for name_lower, details in results.items():
+            participant = participants.setdefault(name_lower, {"Name": details["Name"], "Email": details["Email"],
+                                                               "sessions": {}})
+            participant["sessions"][index] = details["status"]
+        labels.append(f"Session {index} ({session['session_start'].strftime('%Y-%m-%d %H:%M:%S')})")
+    records = []
+    for name_lower, participant in participants.items():
+        record = {"Name": participant["Name"], "Email": participant["Email"],
+                  "Join Time": global_join[name_lower].strftime('%Y-%m-%d %H:%M:%S'),
+                  "Leave Time": global_leave[name_lower].strftime('%Y-%m-%d %H:%M:%S')}
+        for index, label in enumerate(labels, start=1):
+            record[label] = participant["sessions"].get(index, "A")
+        record["Duration"] = round(raw_durations[name_lower], 2)
+        records.append(record)
+    return pd.DataFrame(records)
+
+
+def assert_reports_equal(actual, expected):
+    pd.testing.assert_frame_equal(actual.reset_index(drop=True).astype(object),
+                                  expected.reset_index(drop=True).astype(object), check_dtype=False)
+
+
+# ---------------------------
+# Deferred Imports
+# ---------------------------
+@pytest.mark.parametrize("module", ["attendance_core", "attendance_cli"])
+def test_import_defers_numpy_and_pandas(module):
+    code = (f"import {module}, sys; assert 'pandas' not in sys.modules and 'numpy' not in sys.modules; "
+            "import attendance_core; attendance_core.warm_up(); assert {'pandas', 'numpy'} <= set(sys.modules)")
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(os.path.abspath(attendance_core.__file__)))
+
+
+# ---------------------------
+# Interval Merge
+# ---------------------------
+@pytest.mark.parametrize("seed", range(5))
+def test_merge_intervals_by_key_matches_merge_intervals(seed):
+    rng = np.random.default_rng(seed)
+    codes = rng.integers(0, 20, 500)
+    starts = rng.integers(0, 10_000, 500)
+    # Many zero-length and touching intervals on a coarse grid.
+    ends = starts + rng.integers(0, 4, 500) * 100
+    merged_codes, merged_starts, merged_ends = merge_intervals_by_key(codes, starts, ends)
+    expected = []
+    for code in np.unique(codes):
+        mask = codes == code
+        expected += [(code, start, end) for start, end in merge_intervals(list(zip(starts[mask], ends[mask])))]
+    assert list(zip(merged_codes, merged_starts, merged_ends)) == expected
+
+
+def test_merge_intervals_by_key_touching_and_empty():
+    codes = np.array([0, 0, 0, 1, 1])
+    starts = np.array([10, 0, 20, 5, 5])
+    ends = np.array([20, 10, 20, 5, 7])
+    assert [list(a) for a in merge_intervals_by_key(codes, starts, ends)] == [[0, 1], [0, 5], [20, 7]]
+    empty = np.empty(0, dtype=np.int64)
+    assert all(len(a) == 0 for a in merge_intervals_by_key(empty, empty, empty))
+
+
+# ---------------------------
+# Interval Index
+# ---------------------------
+def assert_index_matches_session_matrix(codes, starts, ends, windows):
+    window_starts, window_ends = np.array(windows).T
+    expected_codes, expected_overlap, expected_join, expected_leave = session_matrix(codes, starts, ends,
+                                                                                     window_starts, window_ends)
+    index = IntervalIndex(codes, starts, ends)
+    overlap, join, leave = index.window_columns(windows)
+    assert list(index.participant_codes) == list(expected_codes)
+    np.testing.assert_array_equal(overlap, expected_overlap)
+    attended = expected_overlap > 0
+    np.testing.assert_array_equal(join[attended], expected_join[attended])
+    np.testing.assert_array_equal(leave[attended], expected_leave[attended])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_interval_index_matches_session_matrix(seed):
+    rng = np.random.default_rng(seed)
+    codes = rng.integers(0, 30, 600)
+    starts = rng.integers(0, 100, 600) * 100_000
+    # Many zero-length intervals, which neither source may count as attendance.
+    ends = starts + rng.integers(0, 3, 600) * rng.integers(0, 2_000_000, 600)
+    merged = merge_intervals_by_key(codes, starts, ends)
+    window_starts = rng.integers(-100, 120, 300) * 100_000
+    windows = list(zip(window_starts, window_starts + rng.integers(0, 60, 300) * 100_000))
+    assert_index_matches_session_matrix(*merged, windows)
+
+
+def test_interval_index_skips_zero_length_intervals():
+    codes = np.array([0, 0, 1])
+    starts = np.array([6_713_000, 9_076_000, 9_500_000])
+    ends = np.array([8_366_000, 9_076_000, 9_500_000])
+    windows = [(6_745_000, 10_275_000), (9_000_000, 10_000_000)]
+    assert_index_matches_session_matrix(codes, starts, ends, windows)
+    overlap, join, leave = IntervalIndex(codes, starts, ends).window_columns(windows)
+    assert (join[0, 0], leave[0, 0]) == (6_745_000, 8_366_000)
+    assert not overlap[:, 1].any()
+
+
+# ---------------------------
+# Identity Resolution
+# ---------------------------
+def test_normalize_names():
+    assert normalize_names(["Ravi Kumar (iPhone)", "kumar, ravi", "Ravi Kumar's iPad", "José Núñez", None, "iPhone"]) == [
+        "kumar ravi", "kumar ravi", "kumar ravi", "jose nunez", "", "iphone"]
+
+
+@pytest.mark.parametrize("names, emails, groups, rules", [
+    # Same email, in any case, whatever the names.
+    (["Ravi Kumar", "RK", "Asha"], ["ravi@x.com", " RAVI@x.com", None], [0, 0, 2], [None, "email", None]),
+    # Device suffixes.
+    (["Ravi Kumar", "Ravi Kumar (iPhone)", "Ravi Kumar's iPad"], [None] * 3, [0, 0, 0], [None, "name", "name"]),
+    # Different numbers keep names apart, also from the bare name.
+    (["Room 1", "Room 2", "Room", "room 1"], [None] * 4, [0, 1, 2, 0], [None, None, None, "name"]),
+    # Conflicting emails are never merged, not even through a record without one.
+    (["Ravi Kumar", "Ravi Kumar (iPhone)"], ["a@x.com", "b@x.com"], [0, 1], [None, None]),
+    (["Ravi Kumar", "ravi kumar (ipad)", "Ravi Kumar"], ["a@x.com", None, "b@x.com"], [0, 0, 2], [None, "name", None]),
+    # A name whose words are a subset of exactly one other name.
+    (["Ravi", "Ravi Kumar"], [None] * 2, [0, 0], [None, "similar name"]),
+    (["Ravi", "Ravi Kumar", "Ravi Shankar"], [None] * 3, [0, 1, 2], [None, None, None]),
+    # Similar, but not similar enough.
+    (["Jon Smith", "John Smith"], [None] * 2, [0, 1], [None, None]),
+    # Placeholder names are only joined by email.
+    (["Guest", "Guest (iPhone)", "guest's iPad", "Zoom User", "Guest"], [None, None, None, None, "g@x.com"],
+     [0, 1, 2, 3, 4], [None] * 5),
+    (["Guest", "Guest (iPhone)"], ["g@x.com", "g@x.com"], [0, 0], [None, "email"]),
+])
+def test_resolve_identities(names, emails, groups, rules):
+    actual_groups, actual_rules = resolve_identities(names, emails)
+    assert list(actual_groups) == groups
+    assert actual_rules == rules
+
+
+@pytest.mark.parametrize("names", [["", ""], ["", "Al", ""]])
+def test_merge_identities_with_unnamed_rows(tmp_path, names):
+    at = BASE + timedelta(hours=1)
+    rows = [(name, f"{index}@x.com", at, at + timedelta(minutes=40), 40) for index, name in enumerate(names)]
+    file_path = write_log(tmp_path / "log.csv", rows)
+    result = build_attendance(file_path, SESSIONS, merge_identities=True)
+    assert_reports_equal(result.to_frame(), build_attendance(file_path, SESSIONS).to_frame())
+    assert list(result.to_frame()["Name"]) == [name for name in names if name]
+
+
+# ---------------------------
+# Sessions and Reports
+# ---------------------------
+@pytest.mark.parametrize("session", SESSIONS)
+def test_process_csv_session_matches_reference(tmp_path, session):
+    file_path = write_log(tmp_path / "log.csv", log_rows())
+    args = (session["session_start"], session["session_end"], session["time_required"])
+    actual = process_csv_session(file_path, *args)
+    expected = reference_session(file_path, *args)
+    assert actual.keys() == expected.keys()
+    for key, details in expected.items():
+        for field in ("Name", "Email", "session_min_join", "raw_max_leave", "status"):
+            assert actual[key][field] == details[field], (key, field)
+        assert actual[key]["session_duration"] == pytest.approx(details["session_duration"])
+
+
+def test_edge_cases(tmp_path):
+    file_path = write_log(tmp_path / "log.csv", log_rows())
+    session = SESSIONS[0]
+    results = process_csv_session(file_path, session["session_start"], session["session_end"], 30)
+    assert results["overlap"]["session_duration"] == pytest.approx(60)
+    assert results["touch"]["session_duration"] == pytest.approx(60)
+    assert results["touch"]["raw_max_leave"] == pd.Timestamp(session["session_end"])
+    assert results["missing time"]["session_duration"] == pytest.approx(35)
+    assert results["zero inside"]["session_duration"] == pytest.approx(50)
+    assert "zero" not in results
+    assert "" not in results and not any(pd.isna(key) for key in results)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_build_attendance_matches_reference(tmp_path, seed):
+    file_path = write_log(tmp_path / "log.csv", log_rows(seed))
+    assert_reports_equal(build_attendance(file_path, SESSIONS).to_frame(), reference_report(file_path, SESSIONS))
+
+
+# The reference parses times as the original code did, without a format.
+@pytest.mark.filterwarnings("ignore:Could not infer format")
+def test_am_pm_times(tmp_path):
+    rows = log_rows(7)
+    iso_path = write_log(tmp_path / "iso.csv", rows)
+    am_pm_path = write_log(tmp_path / "am_pm.csv", rows, "%m/%d/%Y %I:%M:%S %p")
+    expected = reference_report(iso_path, SESSIONS)
+    assert_reports_equal(build_attendance(am_pm_path, SESSIONS).to_frame(), expected)
+    assert_reports_equal(reference_report(am_pm_path, SESSIONS), expected)
+
+
+@pytest.fixture
+def computed(monkeypatch):
+    """Record the number of windows of every session_matrix call of a parsed log."""
+    calls = []
+
+    def counting_session_matrix(codes, starts, ends, window_starts, window_ends):
+        calls.append(len(window_starts))
+        return session_matrix(codes, starts, ends, window_starts, window_ends)
+
+    monkeypatch.setattr(attendance_core, "session_matrix", counting_session_matrix)
+    return calls
+
+
+def test_session_columns_computes_only_new_windows(tmp_path, computed):
+    file_path = write_log(tmp_path / "log.csv", log_rows())
+    sessions = [(s["session_start"], s["session_end"], s["time_required"]) for s in SESSIONS]
+    process_csv_sessions(file_path, sessions[:2])
+    assert computed == [2]
+    # Adding a session computes only the new window.
+    process_csv_sessions(file_path, sessions)
+    assert computed == [2, 1]
+    # Changing a threshold computes nothing.
+    process_csv_sessions(file_path, [(start, end, 0) for start, end, _ in sessions])
+    assert computed == [2, 1]
+    # Moving a session computes only the moved window, with the same result as a fresh log.
+    moved = [sessions[0], (sessions[1][0], datetime(2024, 2, 8, 12, 0), 45.5), sessions[2]]
+    result = process_csv_sessions(file_path, moved)
+    assert computed == [2, 1, 1]
+    attendance_core._parsed_logs.clear()
+    fresh = process_csv_sessions(file_path, moved)
+    for field in ("keys", "session_duration", "session_min_join", "raw_max_leave", "present"):
+        np.testing.assert_array_equal(result[field], fresh[field])
+
+
+def test_session_columns_evicts_least_recently_used_windows(tmp_path, computed):
+    file_path = write_log(tmp_path / "log.csv", log_rows())
+    windows = [(BASE + timedelta(minutes=10 * i), BASE + timedelta(minutes=10 * i + 60), 30)
+               for i in range(SESSION_CACHE_SIZE + 1)]
+    for window in windows[:SESSION_CACHE_SIZE]:
+        process_csv_sessions(file_path, [window])
+    process_csv_sessions(file_path, windows[:1])
+    assert computed == [1] * SESSION_CACHE_SIZE
+    # A new window evicts the least recently used one, which is now the second.
+    process_csv_sessions(file_path, windows[-1:])
+    process_csv_sessions(file_path, windows[:1])
+    assert len(computed) == SESSION_CACHE_SIZE + 1
+    process_csv_sessions(file_path, windows[1:2])
+    assert len(computed) == SESSION_CACHE_SIZE + 2
+    # A request for more windows than the cache holds keeps all of them.
+    process_csv_sessions(file_path, windows)
+    process_csv_sessions(file_path, windows)
+    assert computed[SESSION_CACHE_SIZE + 2:] == [1]
+
+
+# ---------------------------
+# Stage Profile
+# ---------------------------
+PROFILE_STAGES = ["read_log", "convert_times", "merge_intervals", "session_matrix", "global_times",
+                  "total_durations", "attendance_result", "write_report"]
+
+
+def test_stage_profile_records_pipeline_stages(tmp_path):
+    file_path = write_log(tmp_path / "log.csv", log_rows(15))
+    log_path = str(tmp_path / "profile.jsonl")
+    profile = StageProfile(log_path)
+    summary, _ = process_file(file_path, SESSIONS, str(tmp_path / "profiled.xlsx"), profile=profile)
+    assert [entry["stage"] for entry in profile.entries] == PROFILE_STAGES
+    with open(log_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert records == profile.entries
+    for record in records:
+        assert {"run", "file", "stage", "seconds", "peak_rss_mb", "rss_growth_mb"} <= set(record)
+        assert (record["run"], record["file"]) == (profile.run, "log.csv") and record["seconds"] >= 0
+    assert records[0]["rows"] == len(log_rows(15))
+    assert records[3]["sessions"] == len(SESSIONS)
+    line = format_stage_profile(profile.entries)
+    assert line.startswith("Stage timings: ") and all(stage in line for stage in PROFILE_STAGES)
+    assert format_stage_profile([]) == "Stage timings: none recorded"
+    # Profiling off records nothing and writes the same report.
+    assert process_file(file_path, SESSIONS, str(tmp_path / "plain.xlsx"), profile=NullProfile())[0] == summary
+    assert NO_PROFILE.entries == ()
+    pd.testing.assert_frame_equal(pd.read_excel(tmp_path / "plain.xlsx", sheet_name="Attendance"),
+                                  pd.read_excel(tmp_path / "profiled.xlsx", sheet_name="Attendance"))
+
+
+def test_stage_profile_collects_worker_entries(tmp_path):
+    files = {write_log(tmp_path / f"week{i}.csv", log_rows(i, rows=50)): SESSIONS for i in range(2)}
+    log_path = str(tmp_path / "profile.jsonl")
+    profile = StageProfile(log_path)
+    results = process_files(files, max_workers=2, profile=profile, output_format="csv")
+    assert all(error is None for _, _, error, _ in results)
+    for name in ("week0.csv", "week1.csv"):
+        assert [entry["stage"] for entry in profile.entries if entry["file"] == name] == PROFILE_STAGES
+    with open(log_path, encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == profile.entries
+    with pytest.raises(ValueError, match="Error opening profile log"):
+        StageProfile(str(tmp_path / "missing" / "profile.jsonl"))
+
+
+# ---------------------------
+# Log Schema
+# ---------------------------
+HEADER = "Name (Original Name),User Email,Join Time,Leave Time,Duration,Guest"
+
+
+@pytest.mark.parametrize("preamble, bom, newline", [
+    ("", False, "\n"), (PREAMBLE, True, "\n"), ("", True, "\n"), (PREAMBLE, False, "\r\n"), ("", True, "\r\n")])
+def test_sniff_schema_layouts(tmp_path, preamble, bom, newline):
+    rows = log_rows(10, rows=60) + [("Kumar, Ravi", "ravi@x.com", BASE + timedelta(hours=1),
+                                     BASE + timedelta(hours=2), 60)]
+    expected = build_attendance(write_log(tmp_path / "plain.csv", rows), SESSIONS).to_frame()
+    file_path = write_log(tmp_path / "log.csv", rows, preamble=preamble)
+    content = (tmp_path / "log.csv").read_text().replace("\n", newline).encode()
+    (tmp_path / "log.csv").write_bytes(b"\xef\xbb\xbf" * bom + content)
+    schema = sniff_schema((tmp_path / "log.csv").read_bytes())
+    # A header on the first line is read from the start of the file, BOM included.
+    assert schema.table_start == (3 * bom + len(preamble.replace("\n", newline)) if preamble else 0)
+    assert [column.strip() for column in schema.columns] == HEADER.split(",")
+    assert (schema.name_col, schema.email_col) == ("Name (Original Name)", "User Email")
+    assert schema.time_format == "%Y-%m-%d %H:%M:%S"
+    actual = build_attendance(file_path, SESSIONS).to_frame()
+    assert "Kumar, Ravi" in set(actual["Name"])
+    assert_reports_equal(actual, expected)
+
+
+def test_sniff_schema_without_header_reads_below_preamble():
+    head = (PREAMBLE + "Name,Email,Joined,Left\nAl,al@x.com,2024-02-08 09:00:00,2024-02-08 10:00:00\n").encode()
+    schema = sniff_schema(head)
+    assert schema.table_start == len(PREAMBLE)
+    assert schema.columns == ["Name", "Email", "Joined", "Left"]
+    assert (schema.name_col, schema.email_col, schema.time_format) == ("Name", "Email", None)
+    assert sniff_schema(b"Meeting ID,Topic\n").table_start == len("Meeting ID,Topic\n")
+
+
+@pytest.mark.parametrize("time_format", ["%Y-%m-%d %H:%M:%S", "%m/%d/%Y %I:%M:%S %p"])
+@pytest.mark.parametrize("named", [True, False])
+def test_pyarrow_engine_matches_c_parser(tmp_path, time_format, named):
+    pytest.importorskip("pyarrow")
+    rows = [(name if named else "", email, join, leave, duration)
+            for name, email, join, leave, duration in log_rows(11, rows=200)]
+    write_log(tmp_path / "log.csv", rows, time_format)
+    content = (tmp_path / "log.csv").read_bytes()
+    schema = sniff_schema(content)
+    table = content[schema.table_start:]
+    actual = read_table(memoryview(table), schema)
+    expected = pd.read_csv(io.BytesIO(table), engine="c", usecols=schema.usecols(), dtype=schema.dtypes())
+    expected.columns = expected.columns.str.strip()
+    # pyarrow converts ISO times itself; other formats are left to parse_times.
+    assert pd.api.types.is_datetime64_dtype(actual["Join Time"]) == (time_format == "%Y-%m-%d %H:%M:%S")
+    for frame in (actual, expected):
+        for column in ("Join Time", "Leave Time"):
+            frame[column] = parse_times(frame[column], schema.time_format)
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+# ---------------------------
+# Persistent Log Cache
+# ---------------------------
+@pytest.fixture
+def parse_count(monkeypatch):
+    """Count the participant tables parsed from CSV, with the on-disk cache on."""
+    monkeypatch.setattr(attendance_core, "LOG_CACHE_ENABLED", True)
+    parsed = []
+    read_table = attendance_core.read_table
+
+    def counting_read_table(*args, **kwargs):
+        parsed.append(args)
+        return read_table(*args, **kwargs)
+
+    monkeypatch.setattr(attendance_core, "read_table", counting_read_table)
+    return parsed
+
+
+def test_log_cache_hit_for_same_content_at_another_path(tmp_path, parse_count):
+    rows = log_rows(12)
+    first = read_log(write_log(tmp_path / "a.csv", rows))
+    moved = read_log(write_log(tmp_path / "b.csv", rows))
+    assert len(parse_count) == 1 and len(LogCache().entries()) == 1
+    assert moved.file_path.endswith("b.csv")
+    pd.testing.assert_frame_equal(moved.convert_times(), first.convert_times())
+
+
+def test_log_cache_feather_entry_matches_parsed_log(tmp_path, parse_count):
+    pytest.importorskip("pyarrow")
+    file_path = write_log(tmp_path / "log.csv", log_rows(14))
+    parsed = read_log(file_path)
+    assert [os.path.splitext(path)[1] for path, _, _ in LogCache().entries()] == [".feather"]
+    restored = read_log(file_path)
+    assert len(parse_count) == 1
+    pd.testing.assert_frame_equal(restored.convert_times(), parsed.convert_times())
+    assert_reports_equal(build_attendance(file_path, SESSIONS).to_frame(),
+                         reference_report(file_path, SESSIONS))
+
+
+def test_log_cache_miss_after_change(tmp_path, parse_count):
+    rows = log_rows(12)
+    file_path = write_log(tmp_path / "log.csv", rows)
+    read_log(file_path)
+    write_log(tmp_path / "log.csv", rows + [("Late", "late@x.com", BASE, BASE + timedelta(minutes=5), 5)])
+    log = read_log(file_path)
+    assert len(parse_count) == 2 and len(LogCache().entries()) == 2
+    assert "late" in set(log.df["Name_lower"])
+
+
+def test_log_cache_corrupted_entry_is_read_again(tmp_path, parse_count):
+    file_path = write_log(tmp_path / "log.csv", log_rows(12))
+    expected = read_log(file_path).convert_times()
+    [(entry, _, _)] = LogCache().entries()
+    with open(entry, "wb") as f:
+        f.write(b"not a table")
+    pd.testing.assert_frame_equal(read_log(file_path).convert_times(), expected)
+    assert len(parse_count) == 2
+    # The full re-read replaced the entry.
+    pd.testing.assert_frame_equal(read_log(file_path).convert_times(), expected)
+    assert len(parse_count) == 2
+
+
+def test_log_cache_evicts_least_recently_used(tmp_path):
+    cache = LogCache(str(tmp_path / "lru"), max_bytes=10**9)
+    tables = {key: pd.DataFrame({"Name_lower": [key] * 50, "Duration": np.arange(50.0)}) for key in "abcd"}
+    for mtime, key in enumerate("abc", start=1):
+        cache.store(key, tables[key])
+        path = next(path for path, _, _ in cache.entries() if os.path.basename(path).startswith(key))
+        os.utime(path, (mtime, mtime))
+    sizes = [size for _, size, _ in cache.entries()]
+    cache.max_bytes = sum(sizes) + max(sizes) // 2
+    # Loading "a" makes "b" the least recently used entry.
+    pd.testing.assert_frame_equal(cache.load("a"), tables["a"])
+    cache.store("d", tables["d"])
+    assert cache.load("b") is None
+    for key in "acd":
+        pd.testing.assert_frame_equal(cache.load(key), tables[key])
+
+
+def test_log_cache_clear(tmp_path):
+    cache = LogCache(str(tmp_path / "clear"))
+    for key in "ab":
+        cache.store(key, pd.DataFrame({"Duration": [1.0, 2.0]}))
+    sizes = sum(size for _, size, _ in cache.entries())
+    assert cache.clear() == (2, sizes)
+    assert cache.entries() == [] and cache.load("a") is None
+    assert cache.clear() == (0, 0)
+
+
+# ---------------------------
+# Streaming
+# ---------------------------
+@pytest.mark.parametrize("chunksize, rows", [(1, 300), (997, 2500)])
+def test_streaming_matches_whole_log(tmp_path, chunksize, rows):
+    file_path = write_log(tmp_path / "log.csv", log_rows(3, rows=rows))
+    expected = build_attendance(file_path, SESSIONS).to_frame()
+    assert_reports_equal(build_attendance(file_path, SESSIONS, chunksize=chunksize).to_frame(), expected)
+
+
+def test_streamed_raw_sheet_matches_copy(tmp_path):
+    file_path = write_log(tmp_path / "log.csv", log_rows(4, rows=2500))
+    result = build_attendance(file_path, SESSIONS)
+    whole = write_report(str(tmp_path / "whole.xlsx"), result, file_path)
+    streamed = write_report(str(tmp_path / "streamed.xlsx"), result, file_path, chunksize=997)
+    assert (whole["writer"], streamed["writer"]) == ("xlsx", "xlsx-stream")
+    expected = pd.read_excel(tmp_path / "whole.xlsx", sheet_name=None)
+    actual = pd.read_excel(tmp_path / "streamed.xlsx", sheet_name=None)
+    assert list(actual) == list(expected)
+    for sheet in expected:
+        pd.testing.assert_frame_equal(actual[sheet], expected[sheet])
+
+
+# ---------------------------
+# Report Formats
+# ---------------------------
+def read_report(path, output_format):
+    """Read the Attendance table of a report written in output_format."""
+    if output_format == "csv":
+        return pd.read_csv(path)
+    if output_format == "parquet":
+        return pd.read_parquet(path)
+    return pd.read_excel(path, sheet_name="Attendance")
+
+
+@pytest.mark.parametrize("output_format", ["csv", "parquet", "xlsx-stream"])
+def test_report_formats_match_xlsx(tmp_path, output_format):
+    if output_format == "parquet":
+        pytest.importorskip("pyarrow")
+    file_path = write_log(tmp_path / "log.csv", log_rows(8))
+    result = build_attendance(file_path, SESSIONS)
+    write_report(str(tmp_path / "report.xlsx"), result, file_path)
+    output_file = str(tmp_path / f"report.{output_format}")
+    assert write_report(output_file, result, file_path, output_format)["writer"] == output_format
+    expected = pd.read_excel(tmp_path / "report.xlsx", sheet_name=None)
+    if output_format == "xlsx-stream":
+        assert list(pd.read_excel(output_file, sheet_name=None)) == list(expected) == ["Sheet1", "Attendance"]
+    actual = read_report(output_file, output_format)
+    assert list(actual.columns) == list(expected["Attendance"].columns)
+    pd.testing.assert_frame_equal(actual.astype(str), expected["Attendance"].astype(str))
+
+
+@pytest.mark.parametrize("raw_sheet", ["copy", "reference", "skip"])
+def test_raw_sheet_modes(tmp_path, raw_sheet):
+    file_path = write_log(tmp_path / "log.csv", log_rows(9))
+    result = build_attendance(file_path, SESSIONS)
+    write_report(str(tmp_path / "copy.xlsx"), result, file_path)
+    write_report(str(tmp_path / "report.xlsx"), result, file_path, raw_sheet=raw_sheet)
+    expected = pd.read_excel(tmp_path / "copy.xlsx", sheet_name=None)
+    actual = pd.read_excel(tmp_path / "report.xlsx", sheet_name=None)
+    pd.testing.assert_frame_equal(actual["Attendance"], expected["Attendance"])
+    if raw_sheet == "copy":
+        pd.testing.assert_frame_equal(actual["Sheet1"], pd.read_csv(file_path))
+    elif raw_sheet == "reference":
+        assert actual["Sheet1"]["Raw log"].tolist() == [os.path.abspath(file_path)]
+        assert actual["Sheet1"]["Size (bytes)"].tolist() == [os.path.getsize(file_path)]
+    else:
+        assert list(actual) == ["Attendance"]
+    # CSV reports hold the Attendance table whatever the raw sheet mode.
+    write_report(str(tmp_path / "report.csv"), result, file_path, "csv", raw_sheet=raw_sheet)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "report.csv").astype(str), expected["Attendance"].astype(str))
+
+
+def test_parsed_log_keeps_no_copy_of_the_file(tmp_path):
+    file_path = write_log(tmp_path / "log.csv", log_rows(16))
+    result = build_attendance(file_path, SESSIONS, merge_identities=True)
+    write_report(str(tmp_path / "report.xlsx"), result, file_path)
+    for log in (load_log(file_path), load_log(file_path, merge_identities=True)):
+        assert not any(isinstance(value, (bytes, bytearray, memoryview)) for value in vars(log).values())
+    pd.testing.assert_frame_equal(pd.read_excel(tmp_path / "report.xlsx", sheet_name="Sheet1"), pd.read_csv(file_path))
+
+
+# ---------------------------
+# Growing Logs
+# ---------------------------
+def test_incremental_prefix_then_full_export(tmp_path):
+    rows = log_rows(5, rows=600)
+    file_path = write_log(tmp_path / "live.csv", rows[:350])
+    assert ingest_log(file_path)[1] == 350
+    assert_reports_equal(build_attendance(file_path, SESSIONS, incremental=True).to_frame(),
+                         build_attendance(write_log(tmp_path / "prefix.csv", rows[:350]), SESSIONS).to_frame())
+    # The next export extends the table; the meeting summary above it may change.
+    write_log(tmp_path / "live.csv", rows, preamble=PREAMBLE.replace(",50\n", ",61\n"))
+    checkpoint, new_rows = ingest_log(file_path)
+    assert (new_rows, checkpoint.rows) == (len(rows) - 350, len(rows))
+    assert_reports_equal(build_attendance(file_path, SESSIONS, incremental=True).to_frame(),
+                         build_attendance(write_log(tmp_path / "full.csv", rows), SESSIONS).to_frame())
+
+
+def test_incremental_rereads_export_that_does_not_extend(tmp_path):
+    rows = log_rows(6, rows=600)
+    file_path = write_log(tmp_path / "live.csv", rows[:350])
+    ingest_log(file_path)
+    # An earlier row changed, so the new export is not the old one plus new rows.
+    name, email, join, leave, duration = rows[10]
+    rows[10] = (name, email, join, BASE + timedelta(hours=8, minutes=59), duration)
+    write_log(tmp_path / "live.csv", rows)
+    checkpoint, new_rows = ingest_log(file_path)
+    assert (new_rows, checkpoint.rows) == (len(rows), len(rows))
+    assert_reports_equal(build_attendance(file_path, SESSIONS, incremental=True).to_frame(),
+                         build_attendance(write_log(tmp_path / "full.csv", rows), SESSIONS).to_frame())
+
+
+@pytest.mark.parametrize("first_export", ["", PREAMBLE, PREAMBLE + HEADER + "\n"])
+def test_incremental_empty_first_export(tmp_path, first_export):
+    file_path = str(tmp_path / "live.csv")
+    (tmp_path / "live.csv").write_text(first_export)
+    result = build_attendance(file_path, SESSIONS, incremental=True)
+    assert len(result) == 0
+    write_report(str(tmp_path / "live.xlsx"), result, file_path, raw_sheet="reference", incremental=True)
+    assert len(pd.read_excel(tmp_path / "live.xlsx", sheet_name="Attendance")) == 0
+    rows = log_rows(13, rows=100)
+    write_log(tmp_path / "live.csv", rows)
+    assert_reports_equal(build_attendance(file_path, SESSIONS, incremental=True).to_frame(),
+                         build_attendance(write_log(tmp_path / "full.csv", rows), SESSIONS).to_frame())
+
+
+def test_fold_totals_keeps_participant_positions():
+    def chunk(names, minutes):
+        join = pd.Series(pd.to_datetime([BASE + timedelta(minutes=m) for m in minutes]))
+        return pd.DataFrame({"Name": names, "Email": [f"{n}@x.com" for n in names], "Join Time": join,
+                             "Leave Time": join + pd.Timedelta(minutes=10), "Duration": 10.0,
+                             "Name_lower": [n.lower() for n in names]})
+
+    first = fold_totals(None, chunk(["Cy", "Al", "Bo"], [30, 0, 10]), "Name", "Email")
+    folded = fold_totals(first, chunk(["Di", "bo", "Al", "Ed"], [0, 50, 5, 20]), "Name", "Email")
+    # Interval codes of earlier chunks are positions in the totals, so they must not move.
+    assert list(folded.index.get_indexer(first.index)) == [0, 1, 2]
+    assert list(folded.index) == ["cy", "al", "bo", "di", "ed"]
+    assert folded.loc["bo", "Name"] == "Bo"
+    assert folded.loc["bo", "global_leave"] == pd.Timestamp(BASE + timedelta(minutes=60))
+    assert folded.loc["al", "global_join"] == pd.Timestamp(BASE)
+    assert list(folded["duration"]) == [10.0, 20.0, 20.0, 10.0, 10.0]
+
+
+# ---------------------------
+# Threshold Preview
+# ---------------------------
+@pytest.mark.parametrize("merge_identities", [False, True])
+def test_threshold_preview_counts_match_sessions(tmp_path, merge_identities):
+    file_path = write_log(tmp_path / "log.csv", log_rows(11))
+    preview = ThresholdPreview(file_path, merge_identities)
+    preview.set_windows([(session["session_start"], session["session_end"]) for session in SESSIONS])
+    report = build_attendance(file_path, SESSIONS, merge_identities=merge_identities).to_frame()
+    for index, label in enumerate(report.columns[4:4 + len(SESSIONS)]):
+        present = int((report[label] == "P").sum())
+        assert preview.counts(index, SESSIONS[index]["time_required"]) == (present, len(report) - present)
+
+
+def test_threshold_preview_thresholds(tmp_path):
+    file_path = write_log(tmp_path / "log.csv", log_rows(11))
+    preview = ThresholdPreview(file_path)
+    preview.set_windows([(session["session_start"], session["session_end"]) for session in SESSIONS])
+    attendees = len(build_attendance(file_path, SESSIONS))
+    results = process_csv_session(file_path, SESSIONS[0]["session_start"], SESSIONS[0]["session_end"], 0)
+    minutes = sorted(details["session_duration"] for details in results.values())
+    for required in (0, minutes[5], minutes[5] + 0.01, minutes[-1], minutes[-1] + 1):
+        present = sum(minute >= required for minute in minutes)
+        assert preview.counts(0, required) == (present, attendees - present)
+
+
+# ---------------------------
+# Register
+# ---------------------------
+def register_part(people, sessions):
+    """Return a register part for people [(name, email, statuses)] with session labels sessions."""
+    part = pd.DataFrame([statuses for _, _, statuses in people], columns=sessions, dtype=np.int8,
+                        index=pd.Index([name.lower() for name, _, _ in people], name="key"))
+    part.insert(0, "Name", [name for name, _, _ in people])
+    part.insert(1, "Email", [email for _, email, _ in people])
+    return part
+
+
+def test_build_register_joins_partly_overlapping_files():
+    parts = [("term/week1.csv", register_part([("Al", "al@x.com", [1, 1]), ("Bo", "bo@x.com", [1, 0])], ["S1", "S2"])),
+             ("term/week2.csv", register_part([("Cy", "cy@x.com", [1]), ("BO", "bo2@x.com", [1])], ["S1"])),
+             ("other/week1.csv", register_part([("al", "al@x.com", [1]), ("Cy", "cy@x.com", [0])], ["S1"]))]
+    register = build_register(parts)
+    assert list(register.columns) == [
+        "Name", "Email", "week1 | S1", "week1 | S2", "week1 | Cumulative %", "week2 | S1", "week2 | Cumulative %",
+        "week1 (2) | S1", "week1 (2) | Cumulative %", "Present", "Sessions", "Attendance %"]
+    assert register["Name"].tolist() == ["Al", "Bo", "Cy"]
+    assert register["Email"].tolist() == ["al@x.com", "bo@x.com", "cy@x.com"]
+    assert register.iloc[:, [2, 3, 5, 7]].astype(str).values.tolist() == [
+        ["P", "P", "A", "P"], ["P", "A", "P", "A"], ["A", "A", "P", "A"]]
+    assert register["week1 | Cumulative %"].tolist() == [100, 50, 0]
+    assert register["week2 | Cumulative %"].tolist() == [66.67, 66.67, 33.33]
+    assert register["week1 (2) | Cumulative %"].tolist() == [75, 50, 25]
+    assert register["Present"].tolist() == [3, 2, 1]
+    assert register["Sessions"].tolist() == [4, 4, 4]
+    assert register["Attendance %"].tolist() == [75, 50, 25]
+
+
+def test_build_register_numbers_repeated_file_names():
+    parts = [(f"{folder}/x.csv", register_part([("Al", "al@x.com", [1])], ["S1"])) for folder in "abcd"]
+    register = build_register(parts)
+    assert [column for column in register.columns if column.endswith("S1")] == [
+        "x | S1", "x (2) | S1", "x (3) | S1", "x (4) | S1"]
+
+
+def test_build_register_merges_identities_across_files():
+    parts = [("week1.csv", register_part([("Ravi Kumar", "ravi@x.com", [1, 0]), ("Bo", None, [1, 1])], ["S1", "S2"])),
+             ("week2.csv", register_part([("Kumar, Ravi (iPhone)", None, [1]), ("bo", "bo@x.com", [0])], ["S1"])),
+             ("week3.csv", register_part([("R. Kumar", "ravi@x.com", [0]), ("RAVI KUMAR", None, [1])], ["S1"]))]
+    assert len(build_register(parts)) == 4
+    register = build_register(parts, merge_identities=True)
+    assert register["Name"].tolist() == ["Bo", "Ravi Kumar"]
+    sessions = ["week1 | S1", "week1 | S2", "week2 | S1", "week3 | S1"]
+    # Rows of one file that resolve to the same person are present when either was.
+    assert register[sessions].to_numpy().tolist() == [["P", "P", "A", "A"], ["P", "A", "P", "P"]]
+    assert register["Present"].tolist() == [2, 3]
+
+
+# ---------------------------
+# Occupancy Timeline
+# ---------------------------
+def occupancy_log(tmp_path):
+    """
+    Write a log whose occupancy steps are known: 1 from 09:00, 2 from 09:02:10, 1 from
+    09:02:40, 2 from 09:05, 3 from 09:10, 2 from 09:25, 0 from 09:30, 1 from 09:35 and
+    0 from 10:00. C's overlapping records count once.
+    """
+    def at(minutes):
+        return BASE + timedelta(minutes=minutes)
+
+    rows = [("A", "a@x.com", at(0), at(30), 30), ("A", "a@x.com", at(35), at(60), 25),
+            ("B", "b@x.com", at(5), at(30), 25),
+            ("C", "c@x.com", at(10), at(20), 10), ("C", "c@x.com", at(15), at(25), 10),
+            ("E", "e@x.com", at(2 + 1 / 6), at(2 + 4 / 6), 0)]
+    return write_log(tmp_path / "occupancy.csv", rows)
+
+
+def minutes_after_base(windows):
+    return [tuple((pd.Timestamp(t) - pd.Timestamp(BASE)) / pd.Timedelta(minutes=1) for t in window)
+            for window in windows]
+
+
+def test_occupancy_timeline(tmp_path):
+    times, counts = log_occupancy(occupancy_log(tmp_path))
+    assert list(counts) == [1, 2, 1, 2, 3, 2, 0, 1, 0]
+    minutes = occupancy_timeline(times, counts, "1min")
+    assert len(minutes) == 60 and minutes["Time"].iloc[0] == "2024-02-08 09:00:00"
+    assert list(minutes["Participants"].iloc[[0, 2, 5, 10, 25, 30, 34, 35, 59]]) == [1, 1, 2, 3, 2, 0, 0, 1, 1]
+    assert minutes["Peak"].iloc[2] == 2
+    coarse = occupancy_timeline(times, counts, "10min")
+    assert list(coarse["Time"]) == [f"2024-02-08 09:{m}0:00" for m in range(6)]
+    assert list(coarse["Participants"]) == [1, 3, 3, 0, 1, 1]
+    assert list(coarse["Peak"]) == [2, 3, 3, 1, 1, 1]
+    with pytest.raises(ValueError):
+        occupancy_timeline(times, counts, "0s")
+
+
+@pytest.mark.parametrize("options, expected", [
+    # Two or more present; the 2:20 dip to one does not split the session.
+    ({}, [(2 + 1 / 6, 30)]),
+    ({"gap_minutes": 2}, [(5, 30)]),
+    ({"min_minutes": 30}, []),
+    ({"fraction": 1}, [(10, 25)]),
+    # Anyone present; the 5 minutes empty room splits the session unless gaps that long are joined.
+    ({"fraction": 0.3}, [(0, 30), (35, 60)]),
+    ({"fraction": 0.3, "gap_minutes": 6}, [(0, 60)]),
+])
+def test_detect_sessions(tmp_path, options, expected):
+    curve = log_occupancy(occupancy_log(tmp_path))
+    assert minutes_after_base(detect_sessions(*curve, **options)) == pytest.approx(expected)
+
+
+def test_suggest_sessions_whole_minutes(tmp_path):
+    assert minutes_after_base(suggest_sessions(occupancy_log(tmp_path))) == [(2, 30)]
+
+
+# ---------------------------
+# Multiple File Processing
+# ---------------------------
+def sleepy_task(file_path, delay, progress, profile):
+    """A job for run_file_jobs: reports progress for delay seconds, then returns the file name."""
+    if "bad" in file_path:
+        raise ValueError(f"bad file {file_path}")
+    for step in range(10):
+        progress("step", step, 10)
+        time.sleep(delay / 10)
+    with open(file_path, "w") as f:
+        f.write("done")
+    return os.path.basename(file_path)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_run_file_jobs_keeps_order_and_isolates_errors(tmp_path, max_workers):
+    # Later jobs finish first on the pool.
+    jobs = [(str(tmp_path / "a.txt"), 1.0), (str(tmp_path / "bad.txt"), 0), (str(tmp_path / "c.txt"), 0.1),
+            (str(tmp_path / "d.txt"), 0)]
+    stages = []
+    results = run_file_jobs(sleepy_task, jobs, max_workers, progress=lambda stage, done, total: stages.append(stage))
+    assert [file_path for file_path, _, _ in results] == [file_path for file_path, _ in jobs]
+    assert [result for _, result, _ in results] == ["a.txt", None, "c.txt", "d.txt"]
+    assert [error for _, _, error in results] == [None, f"bad file {jobs[1][0]}", None, None]
+    assert any(stage.startswith("File 1/4 (a.txt): step") for stage in stages)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_run_file_jobs_cancel(tmp_path, max_workers):
+    jobs = [(str(tmp_path / f"{index}.txt"), 5.0) for index in range(4)]
+
+    def cancel_on_first_step(stage, done, total):
+        if "step" in stage:
+            raise GenerationCancelled()
+
+    with pytest.raises(GenerationCancelled):
+        run_file_jobs(sleepy_task, jobs, max_workers, progress=cancel_on_first_step)
+    # Running workers stopped at their next step and queued jobs never started.
+    assert not any(os.path.exists(file_path) for file_path, _ in jobs)
+
+
+# ---------------------------
+# Attendance Store
+# ---------------------------
+def test_attendance_rates_file_filter(tmp_path):
+    database = str(tmp_path / "term.sqlite3")
+    course = write_log(tmp_path / "cs101_week1.csv", log_rows(8))
+    other = write_log(tmp_path / "ma201_week1.csv", log_rows(9, rows=50))
+    for file_path, sessions in ((course, SESSIONS), (other, SESSIONS[:1])):
+        store_attendance(database, file_path, sessions, build_attendance(file_path, sessions))
+    assert set(attendance_rates(database)["Sessions"]) == {4}
+    rates = attendance_rates(database, files="cs101_*").set_index("Name")
+    expected = build_attendance(course, SESSIONS).to_frame().set_index("Name")
+    assert set(rates["Sessions"]) == {3}
+    assert (rates["Present"] == (expected.iloc[:, 3:6] == "P").sum(axis=1).reindex(rates.index)).all()
+    assert len(participant_history(database, "overlap", files=course)) == 3
+
+
+def test_participant_history_strips_name_and_email(tmp_path):
+    database = str(tmp_path / "term.sqlite3")
+    file_path = write_log(tmp_path / "log.csv", log_rows(8))
+    store_attendance(database, file_path, SESSIONS, build_attendance(file_path, SESSIONS))
+    expected = participant_history(database, "overlap")
+    for participant in (" Overlap ", "OVERLAP\t", " O@x.com "):
+        pd.testing.assert_frame_equal(participant_history(database, participant), expected)
+    with pytest.raises(ValueError, match="No participant"):
+        participant_history(database, "nobody")
+
+
+def test_store_schema_upgrade(tmp_path):
+    database = str(tmp_path / "term.sqlite3")
+    file_path = write_log(tmp_path / "log.csv", log_rows(8))
+    store_attendance(database, file_path, SESSIONS, build_attendance(file_path, SESSIONS))
+    expected = participant_history(database, "o@x.com")
+    # A database written before the email index existed.
+    with closing(sqlite3.connect(database)) as connection:
+        connection.execute("DROP INDEX participants_email")
+        connection.execute("PRAGMA user_version=1")
+    with closing(connect_store(database)) as connection:
+        assert connection.execute("PRAGMA user_version").fetchone()[0] == STORE_SCHEMA_VERSION
+        plan = connection.execute("EXPLAIN QUERY PLAN SELECT id FROM participants WHERE lower(email) = ?",
+                                  ("o@x.com",)).fetchall()
+        assert "participants_email" in str(plan)
+        connection.execute(f"PRAGMA user_version={STORE_SCHEMA_VERSION + 1}")
+    with pytest.raises(ValueError, match="has schema version"):
+        participant_history(database, "o@x.com")
+    with closing(sqlite3.connect(database)) as connection:
+        connection.execute(f"PRAGMA user_version={STORE_SCHEMA_VERSION}")
+    pd.testing.assert_frame_equal(participant_history(database, "o@x.com"), expected)